@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: ids de socio como UUID (object) vs códigos int32 (utils.diccionario)
+
+Arma una tabla de asistencias con socio_id UUID y la une con la tabla de socios y
+agrupa por socio, como rutinas_adherencia_mensual. Compara memoria de la columna
+y tiempo de merge + groupby con los ids como texto y como códigos del diccionario.
+
+Uso:
+    python benchmarks/bench_diccionario.py [filas] [socios]
+"""
+
+import sys
+import os
+import uuid
+import timeit
+import tempfile
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.diccionario import COLUMNAS_SOCIO, DiccionarioIds, codificar_columnas
+import utils.diccionario as diccionario
+
+# Diccionario descartable: no ensuciar ia/Data_Lake_CSV/diccionarios
+_directorio = tempfile.mkdtemp(prefix="bench_diccionario_")
+diccionario._diccionarios["socios"] = DiccionarioIds("socios", _directorio)
+
+
+def generar_datos(filas, socios):
+    rng = np.random.default_rng(42)
+    ids = np.array([str(uuid.UUID(int=int(n))) for n in rng.integers(0, 2**63, size=socios)], dtype=object)
+    asistencia = pd.DataFrame({
+        'socio_id': ids[rng.integers(0, socios, size=filas)],
+        'dias': rng.integers(0, 30, size=filas)
+    })
+    df_socios = pd.DataFrame({'id_socio': ids, 'objetivo': rng.choice(['fuerza', 'cardio', 'salud'], size=socios)})
+    return asistencia, df_socios
+
+
+def unir_y_agrupar(asistencia, df_socios):
+    df = asistencia.merge(df_socios, left_on='socio_id', right_on='id_socio', how='left')
+    return df.groupby('socio_id')['dias'].sum()
+
+
+def medir(funcion, *args, repeticiones=5):
+    return min(timeit.repeat(lambda: funcion(*args), number=1, repeat=repeticiones))
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    socios = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    asistencia, df_socios = generar_datos(filas, socios)
+
+    t_codificar = medir(codificar_columnas, asistencia, COLUMNAS_SOCIO, repeticiones=1)
+    asistencia_cod = codificar_columnas(asistencia, COLUMNAS_SOCIO)
+    socios_cod = codificar_columnas(df_socios, COLUMNAS_SOCIO)
+
+    mem_uuid = asistencia['socio_id'].memory_usage(deep=True) / 1e6
+    mem_cod = asistencia_cod['socio_id'].memory_usage(deep=True) / 1e6
+    t_uuid = medir(unir_y_agrupar, asistencia, df_socios)
+    t_cod = medir(unir_y_agrupar, asistencia_cod, socios_cod)
+
+    print(f"📊 merge + groupby por socio ({filas:,} asistencias, {socios:,} socios, mejor de 5)")
+    print(f"   columna socio_id UUID : {mem_uuid:9.1f} MB  {t_uuid * 1e3:9.1f} ms")
+    print(f"   columna socio_id int32: {mem_cod:9.1f} MB  {t_cod * 1e3:9.1f} ms")
+    print(f"   codificación inicial  : {t_codificar * 1e3:9.1f} ms (UUIDs nuevos, se persiste una vez)")
+    print(f"   ahorro: {mem_uuid / mem_cod:.0f}x memoria, {t_uuid / t_cod:.1f}x tiempo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: consulta por socio agrupando `asistencia` vs índice CSR
+
+Compara la forma de informes_abandono (groupby por socio sobre toda la tabla
+para sacar la última asistencia de uno) con un slice del IndiceAsistencia.
+
+Uso:
+    python benchmarks/bench_indice_asistencia.py [filas] [socios]
+"""
+
+import sys
+import os
+import timeit
+import tempfile
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.diccionario import DiccionarioIds
+from utils.indice_asistencia import IndiceAsistencia
+import utils.diccionario as diccionario
+
+# Diccionario descartable: no ensuciar ia/Data_Lake_CSV/diccionarios
+diccionario._diccionarios["socios"] = DiccionarioIds("socios", tempfile.mkdtemp(prefix="bench_indice_"))
+
+
+def generar_asistencia(filas, socios):
+    rng = np.random.default_rng(42)
+    hoy = np.datetime64('today', 'D')
+    return pd.DataFrame({
+        'socio_id': rng.integers(0, socios, size=filas).astype(str),
+        'fecha': hoy - rng.integers(0, 365, size=filas).astype('timedelta64[D]')
+    })
+
+
+def con_groupby(asistencia_df, socio_id):
+    ultima = asistencia_df.groupby('socio_id')['fecha'].max()
+    return ultima.get(socio_id)
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    socios = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    asistencia_df = generar_asistencia(filas, socios)
+
+    t_construccion = min(timeit.repeat(lambda: IndiceAsistencia.desde_asistencia(asistencia_df), number=1, repeat=3))
+    indice = IndiceAsistencia.desde_asistencia(asistencia_df)
+
+    consultas = 1000
+    t_groupby = min(timeit.repeat(lambda: con_groupby(asistencia_df, "123"), number=1, repeat=3))
+    t_indice = min(timeit.repeat(lambda: indice.resumen("123"), number=consultas, repeat=3)) / consultas
+
+    print(f"📊 Consulta de un socio ({filas:,} asistencias, {socios:,} socios)")
+    print(f"   groupby de toda la tabla: {t_groupby * 1e3:9.2f} ms")
+    print(f"   slice del índice CSR    : {t_indice * 1e3:9.3f} ms (resumen completo)")
+    print(f"   construcción del índice : {t_construccion * 1e3:9.1f} ms (una vez por TTL)")
+    print(f"   memoria del índice      : {(indice.dias.nbytes + indice.offsets.nbytes) / 1e6:9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
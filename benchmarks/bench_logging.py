@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: print() de depuración vs utils.logs por request
+
+Reproduce las trazas que prediccion_asistencia.run() emitía en cada request
+(rutas, os.path.exists, cantidad de filas y lista de columnas) y las compara con
+los logger.debug() actuales con LOG_LEVEL=INFO (descartados sin formatear) y
+con LOG_LEVEL=DEBUG (encolados; el hilo escritor hace el I/O).
+
+Uso:
+    python benchmarks/bench_logging.py [requests]
+"""
+
+import sys
+import os
+import timeit
+import contextlib
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.logs import configurar_logging, obtener_logger
+
+# El hilo escritor descarta la salida: se mide solo el costo dentro del request
+configurar_logging(nivel="INFO", destino=open(os.devnull, "w"))
+
+BASE_PATH = os.path.join(PROJECT_ROOT, 'ia', 'Data_Lake_CSV')
+ARCHIVOS = ['probabilidad_churn.csv', 'segmentacion_socios.csv', 'top_5_socios_inactivos.csv']
+
+logger = obtener_logger("benchmarks.bench_logging")
+
+
+def generar_churn(filas=5000):
+    rng = np.random.default_rng(42)
+    return pd.DataFrame({
+        'id_socio': np.arange(filas),
+        'prob_churn': rng.uniform(0, 1, size=filas),
+        'dias_sin_asistir': rng.integers(0, 120, size=filas),
+        'segmento': rng.choice(['A', 'B', 'C'], size=filas)
+    })
+
+
+def con_print(df):
+    """Forma anterior: f-strings, os.path.exists y escritura síncrona a stdout"""
+    print(f"🔍 PROJECT_ROOT: {PROJECT_ROOT}")
+    print(f"📁 Base path: {BASE_PATH}")
+    print(f"📂 Existe base_path? {os.path.exists(BASE_PATH)}")
+    for archivo in ARCHIVOS:
+        ruta = os.path.join(BASE_PATH, archivo)
+        print(f"🎯 Buscando en: {ruta}")
+        print(f"✅ Existe archivo? {os.path.exists(ruta)}")
+        print(f"📊 Cargados {len(df)} registros")
+    print(f"🔍 Columnas disponibles: {list(df.columns)}")
+
+
+def con_logger(df):
+    logger.debug("Rutas de datos", extra={"project_root": PROJECT_ROOT, "base_path": BASE_PATH})
+    for archivo in ARCHIVOS:
+        ruta = os.path.join(BASE_PATH, archivo)
+        logger.debug("CSV cargado", extra={"archivo": ruta, "filas": len(df), "columnas": df.columns})
+
+
+def medir(funcion, df, requests, repeticiones=5):
+    return min(timeit.repeat(lambda: funcion(df), number=requests, repeat=repeticiones)) / requests
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    df = generar_churn()
+
+    # stdout real: en producción el print va a la consola/colector de Render
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        t_print = medir(con_print, df, requests)
+
+    configurar_logging(nivel="INFO")
+    t_info = medir(con_logger, df, requests)
+
+    configurar_logging(nivel="DEBUG")
+    t_debug = medir(con_logger, df, requests)
+    configurar_logging(nivel="INFO")
+
+    print(f"📊 Trazas de depuración por request ({requests:,} requests, mejor de 5)")
+    print(f"   print()           : {t_print * 1e6:9.2f} µs")
+    print(f"   logger (INFO)     : {t_info * 1e6:9.2f} µs")
+    print(f"   logger (DEBUG)    : {t_debug * 1e6:9.2f} µs")
+    print(f"   ahorro por request: {(t_print - t_info) * 1e6:9.2f} µs ({t_print / t_info:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
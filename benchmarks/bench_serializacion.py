@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: armado de respuestas JSON con iterrows() vs utils.serializacion
+
+Uso:
+    python benchmarks/bench_serializacion.py [filas]
+"""
+
+import sys
+import os
+import timeit
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.serializacion import columna_json, registros
+
+
+def generar_equipos(filas):
+    rng = np.random.default_rng(42)
+    return pd.DataFrame({
+        'nombre': [f"Equipo_{i}" for i in range(filas)],
+        'categoria': rng.choice(['Cardio', 'Fuerza', 'Funcional', 'Máquinas'], size=filas),
+        'uso_diario_promedio': rng.integers(15, 50, size=filas),
+        'tiempo_promedio_minutos': rng.integers(20, 45, size=filas),
+        'utilizacion_porcentaje': rng.uniform(0, 95, size=filas),
+        'popularidad_score': rng.uniform(0, 50, size=filas)
+    })
+
+
+def con_iterrows(df):
+    """Forma anterior de crear_ranking_equipos"""
+    return [
+        {
+            "posicion": i + 1,
+            "nombre": equipo['nombre'],
+            "categoria": equipo['categoria'],
+            "uso_diario": int(equipo['uso_diario_promedio']),
+            "tiempo_promedio": int(equipo['tiempo_promedio_minutos']),
+            "utilizacion": float(equipo['utilizacion_porcentaje']),
+            "popularidad": float(equipo['popularidad_score'])
+        }
+        for i, (_, equipo) in enumerate(df.iterrows())
+    ]
+
+
+def columnar(df):
+    return registros({
+        "posicion": list(range(1, len(df) + 1)),
+        "nombre": columna_json(df['nombre']),
+        "categoria": columna_json(df['categoria']),
+        "uso_diario": columna_json(df['uso_diario_promedio'], 'int'),
+        "tiempo_promedio": columna_json(df['tiempo_promedio_minutos'], 'int'),
+        "utilizacion": columna_json(df['utilizacion_porcentaje'], 'float'),
+        "popularidad": columna_json(df['popularidad_score'], 'float')
+    })
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    df = generar_equipos(filas)
+
+    assert con_iterrows(df) == columnar(df), "Las dos implementaciones deben producir el mismo JSON"
+
+    repeticiones = 5
+    t_iterrows = min(timeit.repeat(lambda: con_iterrows(df), number=1, repeat=repeticiones))
+    t_columnar = min(timeit.repeat(lambda: columnar(df), number=1, repeat=repeticiones))
+
+    print(f"📊 Serialización de {filas:,} filas (mejor de {repeticiones})")
+    print(f"   iterrows : {t_iterrows * 1000:9.2f} ms")
+    print(f"   columnar : {t_columnar * 1000:9.2f} ms")
+    print(f"   speedup  : {t_iterrows / t_columnar:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
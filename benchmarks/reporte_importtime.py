@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Reporte de tiempos de import (python -X importtime)
+
+Importa el módulo en un proceso nuevo (sin caches de imports previos) y muestra
+los módulos con mayor tiempo acumulado y qué dependencias pesadas quedaron
+cargadas al arrancar.
+
+Uso:
+    python benchmarks/reporte_importtime.py [modulo] [top]
+
+    python benchmarks/reporte_importtime.py main 25
+    python benchmarks/reporte_importtime.py models.clustering_equipos
+"""
+
+import os
+import re
+import sys
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Dependencias que no deberían cargarse al importar main (ver MODULOS_PRECARGA en main.py)
+DEPENDENCIAS_PESADAS = ("pandas", "numpy", "sklearn", "scipy", "supabase", "matplotlib", "seaborn", "joblib")
+
+_LINEA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def medir_imports(modulo="main"):
+    """
+    Ejecuta `python -X importtime -c "import <modulo>"` desde la raíz del proyecto.
+
+    Returns:
+        list: (modulo, propio_us, acumulado_us, profundidad) en orden de carga
+    """
+    entorno = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    # Sin credenciales: el import no debe depender de Supabase
+    entorno.setdefault("SUPABASE_URL", "")
+    entorno.setdefault("SUPABASE_KEY", "")
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=PROJECT_ROOT, env=entorno, capture_output=True, text=True
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"Error importando {modulo}:\n{proceso.stderr[-2000:]}")
+
+    registros = []
+    for linea in proceso.stderr.splitlines():
+        coincidencia = _LINEA.match(linea)
+        if coincidencia:
+            propio, acumulado, sangria, nombre = coincidencia.groups()
+            registros.append((nombre, int(propio), int(acumulado), len(sangria) // 2))
+    return registros
+
+
+def main():
+    modulo = sys.argv[1] if len(sys.argv) > 1 else "main"
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    registros = medir_imports(modulo)
+    total_us = next((acumulado for nombre, _, acumulado, _ in registros if nombre == modulo), 0)
+    cargados = {nombre for nombre, *_ in registros}
+
+    print(f"⏱️  import {modulo}: {total_us / 1000:.1f} ms ({len(registros)} módulos)")
+    print(f"\n📊 Top {top} por tiempo acumulado")
+    for nombre, propio, acumulado, profundidad in sorted(registros, key=lambda r: r[2], reverse=True)[:top]:
+        print(f"   {acumulado / 1000:9.1f} ms  {propio / 1000:8.1f} ms propio  {'  ' * profundidad}{nombre}")
+
+    pesadas = [dep for dep in DEPENDENCIAS_PESADAS if dep in cargados]
+    print("\n📦 Dependencias pesadas cargadas: " + (", ".join(pesadas) if pesadas else "ninguna"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks: modelos, informes y pipelines a varias escalas
+-------------------------------------------------------------------
+
+Corre cada caso contra datos sintéticos (utils/datos_sinteticos.py) de
+10k / 100k / 1M / 10M filas de la tabla principal del caso (asistencias,
+pagos o logs QR) y registra el tiempo (mínimo de las repeticiones) y el pico
+de memoria de Python/NumPy (tracemalloc, en una corrida aparte para no
+inflar el tiempo).
+
+Los resultados se comparan con benchmarks/baselines.json: un caso es una
+regresión si tarda más de (1 + TOLERANCIA_TIEMPO) veces su baseline (y al
+menos MINIMO_SEGUNDOS más) o si su pico de memoria crece más de
+TOLERANCIA_MEMORIA. Las baselines dependen de la máquina: regenerarlas con
+--guardar en la misma máquina donde se va a comparar.
+
+Aislamiento: sin Supabase (SUPABASE_URL/KEY vacías), diccionarios, cache,
+índice y sketches en un directorio temporal; los modelos leen el Data Lake
+sintético (se reemplaza su PROJECT_ROOT) y los pipelines reciben el ETL
+sintético en lugar de run_etl. No se escribe nada dentro del repo.
+
+Uso:
+    python benchmarks/suite.py                          # 10k y 100k, compara con baselines
+    python benchmarks/suite.py 1m 10m                   # otras escalas
+    python benchmarks/suite.py --casos detectar_inactividad,informes_comparativa
+    python benchmarks/suite.py 10k 100k 1m --guardar    # actualiza baselines.json
+    python benchmarks/suite.py --listar
+La escala 10m regenera los datos por caso y necesita varios GB de RAM.
+Sale con código 1 si hay regresiones o casos con error.
+"""
+
+import argparse
+import atexit
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from functools import cached_property
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+# Antes de importar el proyecto: nada de red ni de archivos dentro del repo
+TEMPORAL = tempfile.mkdtemp(prefix="bench_suite_")
+atexit.register(shutil.rmtree, TEMPORAL, ignore_errors=True)
+os.environ.update({
+    "SUPABASE_URL": "",
+    "SUPABASE_KEY": "",
+    "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+    "DICCIONARIOS_DIR": os.path.join(TEMPORAL, "diccionarios"),
+    "CACHE_DIR": os.path.join(TEMPORAL, "cache"),
+    "INDICE_ASISTENCIA_PATH": os.path.join(TEMPORAL, "indice_asistencia.npz"),
+    "SKETCHES_DIR": os.path.join(TEMPORAL, "sketches"),
+})
+
+import numpy as np
+import pandas as pd
+
+from utils.datos_sinteticos import SEMILLA, generador, generar_socios, generar_asistencia, generar_pagos, generar_logs_qr
+
+ESCALAS = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+ESCALAS_DEFECTO = ("10k", "100k")
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+TOLERANCIA_TIEMPO = 0.5
+TOLERANCIA_MEMORIA = 0.2
+MINIMO_SEGUNDOS = 0.05
+
+# Asistencias promedio por socio en 90 días con la frecuencia de generar_socios
+VISITAS_POR_SOCIO = 38
+# Arriba de esta escala las tablas se regeneran por caso en vez de compartirse (memoria)
+MAXIMO_COMPARTIDO = 1_000_000
+SEGMENTOS = {'puntual': 'Puntual', 'leve_retraso': 'Retraso leve', 'moroso': 'Moroso crónico'}
+
+
+class DatosSinteticos:
+    """Tablas de una escala, generadas a demanda (cada caso usa solo las que necesita)"""
+
+    def __init__(self, filas, semilla=SEMILLA):
+        self.filas = filas
+        self.semilla = semilla
+
+    def _rng(self, tabla):
+        return generador([self.semilla, zlib.crc32(tabla.encode()), self.filas])
+
+    @cached_property
+    def socios(self):
+        return generar_socios(max(self.filas // VISITAS_POR_SOCIO, 100), n_gimnasios=3, rng=self._rng("socios"))
+
+    @cached_property
+    def asistencia(self):
+        """~filas asistencias de 90 días"""
+        return generar_asistencia(self.socios, n_dias=90, rng=self._rng("asistencia"))
+
+    @cached_property
+    def pagos(self):
+        """~filas pagos: una cuota mensual de filas / 12 socios"""
+        rng = self._rng("pagos")
+        return generar_pagos(generar_socios(max(self.filas // 12, 10), n_gimnasios=3, rng=rng), 12, rng=rng)
+
+    @cached_property
+    def logs_qr(self):
+        return generar_logs_qr(self.socios['id_socio'].to_numpy(), n_logs=self.filas, rng=self._rng("logs_qr"))
+
+    @cached_property
+    def etl(self):
+        """Salida de run_etl (usuario, asistencia, rutina) con los nombres de columnas de Supabase"""
+        rng = self._rng("etl")
+        usuario = pd.DataFrame({
+            'id': self.socios['id_socio'],
+            'activo': self.socios['activo'],
+            'rol': np.array(['socio', 'entrenador', 'admin'])[rng.choice(3, len(self.socios), p=[0.95, 0.04, 0.01])],
+            'gimnasio': self.socios['gimnasio'].astype(str)
+        })
+        asistencia = pd.DataFrame({
+            'id': np.arange(1, len(self.asistencia) + 1),
+            'socio_id': self.asistencia['socio_id'],
+            'fecha': self.asistencia['fecha'].dt.strftime('%Y-%m-%d'),
+            'hora_ingreso': self.asistencia['hora_entrada'].astype(str) + ':00',
+            'gimnasio': self.asistencia['gimnasio'].astype(str)
+        })
+        return {'usuario': usuario, 'asistencia': asistencia, 'rutina': pd.DataFrame()}
+
+    @cached_property
+    def pagos_supabase(self):
+        """Pagos con las columnas de la tabla 'pago' de Supabase (antes de pipeline_pagos)"""
+        pagos = self.pagos
+        return pd.DataFrame({
+            'id': pagos['pago_id'],
+            'socio_id': pagos['socio_id'],
+            'cuota_id': pagos['socio_id'] % 50,
+            'fecha_pago': pagos['fecha_pago'].dt.strftime('%Y-%m-%d'),
+            'monto_pago': pagos['monto'].astype(float),
+            'total': pagos['monto'].astype(float),
+            'fecha_vencimiento': pagos['fecha_limite'].dt.strftime('%Y-%m-%d'),
+        })
+
+    @cached_property
+    def raiz_data_lake(self):
+        """PROJECT_ROOT temporal con ia/Data_Lake_CSV sintético (pagos, churn, segmentación, top 5)"""
+        raiz = os.path.join(TEMPORAL, f"raiz_{self.filas}")
+        data_lake = os.path.join(raiz, 'ia', 'Data_Lake_CSV')
+        os.makedirs(data_lake, exist_ok=True)
+
+        pagos = self.pagos_supabase.rename(columns={'monto_pago': 'monto_pagado', 'fecha_vencimiento': 'fecha_limite'})
+        pagos['dias_retraso'] = self.pagos['dias_retraso']
+        pagos.to_csv(os.path.join(data_lake, 'pagos_supabase.csv'), index=False)
+
+        rng = self._rng("churn")
+        socio_ids = pd.Series(np.arange(1, self.filas + 1))
+        pd.DataFrame({'socio_id': socio_ids, 'prob_churn': rng.beta(2, 5, self.filas).round(4)}).to_csv(
+            os.path.join(data_lake, 'probabilidad_churn.csv'), index=False)
+        perfiles = self.pagos.drop_duplicates('socio_id')
+        pd.DataFrame({
+            'socio_id': perfiles['socio_id'],
+            'promedio_dias_retraso': self.pagos.groupby('socio_id')['dias_retraso'].mean().to_numpy(),
+            'segmento_pago': perfiles['perfil_pago'].astype(str).map(SEGMENTOS).to_numpy()
+        }).to_csv(os.path.join(data_lake, 'segmentacion_socios.csv'), index=False)
+        pd.DataFrame({
+            'socio_id': socio_ids[:5], 'cantidad_asistencias': 1, 'ultima_asistencia': '2025-07-16'
+        }).to_csv(os.path.join(data_lake, 'top5_socios_inactivos.csv'), index=False)
+        return raiz
+
+
+def _verificar(resultado):
+    """Los modelos devuelven status=error en vez de levantar: que el caso falle igual"""
+    if isinstance(resultado, dict) and resultado.get("status") == "error":
+        raise RuntimeError(resultado.get("error"))
+    return resultado
+
+
+@contextlib.contextmanager
+def _reemplazos(*reemplazos):
+    """(objeto, atributo, valor) temporales, restaurados al salir"""
+    originales = [(objeto, atributo, getattr(objeto, atributo)) for objeto, atributo, _ in reemplazos]
+    try:
+        for objeto, atributo, valor in reemplazos:
+            setattr(objeto, atributo, valor)
+        yield
+    finally:
+        for objeto, atributo, valor in originales:
+            setattr(objeto, atributo, valor)
+
+
+def _copiar_etl(datos):
+    return {tabla: df.copy() for tabla, df in datos.etl.items()}
+
+
+# ---------------------------------------------------------------------------
+# Casos: preparar(datos) -> argumentos (no se mide); ejecutar(*argumentos) se mide
+# ---------------------------------------------------------------------------
+
+def preparar_modelo(datos):
+    return (datos.raiz_data_lake, datos.etl)
+
+
+def ejecutar_prediccion_asistencia(raiz, etl):
+    from models import prediccion_asistencia
+    import ia.data_science.ETL.etl_login as etl_login
+    with _reemplazos((prediccion_asistencia, "PROJECT_ROOT", raiz),
+                     (etl_login, "run_etl", lambda gimnasio, **_: etl)):
+        _verificar(prediccion_asistencia.run())
+
+
+def ejecutar_proyeccion_ingresos(raiz, _etl):
+    from models import proyeccion_ingresos
+    with _reemplazos((proyeccion_ingresos, "PROJECT_ROOT", raiz)):
+        _verificar(proyeccion_ingresos.run())
+
+
+def preparar_clustering(datos):
+    from models.uso_equipos import agregar_uso_diario
+    if "agregados" not in datos.__dict__:
+        diario, horario = agregar_uso_diario(datos.logs_qr)
+        datos.agregados = {"diario": diario, "horario": horario, "fuente": "Logs sintéticos (benchmark)"}
+    return (datos.agregados,)
+
+
+def ejecutar_clustering_equipos(agregados):
+    from models import clustering_equipos, uso_equipos
+    with _reemplazos((uso_equipos, "obtener_agregados", lambda forzar=False: agregados)):
+        _verificar(clustering_equipos.run())
+
+
+def ejecutar_agregar_uso_diario(logs):
+    from models.uso_equipos import agregar_uso_diario
+    agregar_uso_diario(logs)
+
+
+def ejecutar_detectar_inactividad(asistencia):
+    from ia.data_science.Informes.informes_abandono import detectar_inactividad
+    detectar_inactividad(asistencia)
+
+
+def ejecutar_informes_comparativa(etl):
+    from ia.data_science.Informes import informes_comparativa as informes
+    informes.calcular_retencion_por_gimnasio(etl['usuario'])
+    informes.asistencias_promedio_por_socio(etl['asistencia'])
+    informes.concurrencia_promedio_por_dia(etl['asistencia'])
+    informes.concurrencia_promedio_por_hora(etl['asistencia'])
+
+
+def _ejecutar_pipeline(modulo, etl, raiz):
+    with _reemplazos((modulo, "run_etl", lambda gimnasio, **_: etl), (modulo, "PROJECT_ROOT", raiz)), \
+            contextlib.redirect_stdout(io.StringIO()):
+        modulo.main()
+
+
+def preparar_pipeline(datos):
+    return (_copiar_etl(datos), datos.raiz_data_lake)
+
+
+def ejecutar_pipeline_abandono(etl, raiz):
+    from ia.data_science.Pipelines import pipeline_abandono
+    _ejecutar_pipeline(pipeline_abandono, etl, raiz)
+
+
+def ejecutar_pipeline_retencion(etl, raiz):
+    from ia.data_science.Pipelines import pipeline_retencion
+    _ejecutar_pipeline(pipeline_retencion, etl, raiz)
+
+
+def ejecutar_pipeline_comparativa(etl, raiz):
+    from ia.data_science.Pipelines import pipeline_comparativa
+    _ejecutar_pipeline(pipeline_comparativa, etl, raiz)
+
+
+def ejecutar_pipeline_horarios(asistencia):
+    # main() además grafica con matplotlib: se miden los informes y el heatmap
+    from ia.data_science.Pipelines.pipeline_horarios import generar_informe_horarios, generar_heatmap_dia_hora
+    generar_informe_horarios(asistencia)
+    generar_heatmap_dia_hora(asistencia)
+
+
+def ejecutar_pipeline_pagos(pagos):
+    from ia.data_science.Pipelines.pipeline_pagos import transformar_pagos
+    transformar_pagos(pagos)
+
+
+# nombre → (preparar, ejecutar)
+CASOS = {
+    "prediccion_asistencia.run": (preparar_modelo, ejecutar_prediccion_asistencia),
+    "proyeccion_ingresos.run": (preparar_modelo, ejecutar_proyeccion_ingresos),
+    "clustering_equipos.run": (preparar_clustering, ejecutar_clustering_equipos),
+    "uso_equipos.agregar_uso_diario": (lambda datos: (datos.logs_qr,), ejecutar_agregar_uso_diario),
+    "detectar_inactividad": (lambda datos: (_copiar_etl(datos)['asistencia'],), ejecutar_detectar_inactividad),
+    "informes_comparativa": (lambda datos: (_copiar_etl(datos),), ejecutar_informes_comparativa),
+    "pipeline_abandono": (preparar_pipeline, ejecutar_pipeline_abandono),
+    "pipeline_retencion": (preparar_pipeline, ejecutar_pipeline_retencion),
+    "pipeline_comparativa": (preparar_pipeline, ejecutar_pipeline_comparativa),
+    "pipeline_horarios": (lambda datos: (_copiar_etl(datos)['asistencia'],), ejecutar_pipeline_horarios),
+    "pipeline_pagos": (lambda datos: (datos.pagos_supabase,), ejecutar_pipeline_pagos),
+}
+
+
+def medir(preparar, ejecutar, datos, repeticiones):
+    """{'segundos': mínimo de las repeticiones, 'pico_mb': pico de tracemalloc en una corrida aparte}"""
+    tiempos = []
+    for _ in range(repeticiones):
+        argumentos = preparar(datos)
+        gc.collect()
+        inicio = time.perf_counter()
+        ejecutar(*argumentos)
+        tiempos.append(time.perf_counter() - inicio)
+
+    argumentos = preparar(datos)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        ejecutar(*argumentos)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"segundos": round(min(tiempos), 4), "pico_mb": round(pico / 1e6, 2)}
+
+
+def comparar(medicion, baseline):
+    """Motivos de regresión (lista vacía si está dentro de la tolerancia)"""
+    if not baseline:
+        return []
+    motivos = []
+    limite = baseline["segundos"] * (1 + TOLERANCIA_TIEMPO)
+    if medicion["segundos"] > limite and medicion["segundos"] - baseline["segundos"] > MINIMO_SEGUNDOS:
+        motivos.append(f"tiempo {medicion['segundos']:.3f}s > {baseline['segundos']:.3f}s")
+    if medicion["pico_mb"] > baseline["pico_mb"] * (1 + TOLERANCIA_MEMORIA) and medicion["pico_mb"] - baseline["pico_mb"] > 1:
+        motivos.append(f"memoria {medicion['pico_mb']:.1f}MB > {baseline['pico_mb']:.1f}MB")
+    return motivos
+
+
+def entorno():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "maquina": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPU)",
+        "fecha": time.strftime("%Y-%m-%d"),
+    }
+
+
+def cargar_baselines(ruta=BASELINES_PATH):
+    if not os.path.exists(ruta):
+        return {"entorno": {}, "resultados": {}}
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def guardar_baselines(baselines, ruta=BASELINES_PATH):
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de modelos, informes y pipelines")
+    parser.add_argument("escalas", nargs="*", default=list(ESCALAS_DEFECTO), choices=list(ESCALAS),
+                        help="escalas a correr (por defecto 10k y 100k)")
+    parser.add_argument("--casos", help="casos separados por coma (por defecto todos)")
+    parser.add_argument("--repeticiones", type=int, help="repeticiones por caso (por defecto 3 hasta 100k y 1 arriba)")
+    parser.add_argument("--guardar", action="store_true", help="guardar las mediciones como baselines")
+    parser.add_argument("--listar", action="store_true", help="listar los casos y salir")
+    args = parser.parse_args()
+
+    if args.listar:
+        print("\n".join(CASOS))
+        return 0
+
+    casos = args.casos.split(",") if args.casos else list(CASOS)
+    desconocidos = [caso for caso in casos if caso not in CASOS]
+    if desconocidos:
+        parser.error(f"casos desconocidos: {', '.join(desconocidos)}")
+
+    baselines = cargar_baselines()
+    regresiones, errores = [], []
+    print(f"📊 Benchmarks ({', '.join(args.escalas)}) — baselines: {baselines.get('entorno', {}).get('maquina', 'sin baselines')}")
+
+    for escala in args.escalas:
+        filas = ESCALAS[escala]
+        compartidos = DatosSinteticos(filas) if filas <= MAXIMO_COMPARTIDO else None
+        repeticiones = args.repeticiones or (3 if filas <= 100_000 else 1)
+        print(f"\n── {escala} ({filas:,} filas) " + "─" * 40)
+        print(f"   {'caso':<32} {'tiempo':>10} {'pico':>11} {'baseline':>10}")
+
+        for caso in casos:
+            preparar, ejecutar = CASOS[caso]
+            datos = compartidos or DatosSinteticos(filas)
+            try:
+                medicion = medir(preparar, ejecutar, datos, repeticiones)
+            except Exception as e:
+                errores.append((caso, escala, e))
+                print(f"   ❌ {caso:<30} error: {e}")
+                continue
+
+            baseline = baselines["resultados"].get(caso, {}).get(escala)
+            motivos = comparar(medicion, baseline)
+            referencia = f"{baseline['segundos']:9.3f}s" if baseline else f"{'—':>10}"
+            marca = "⚠️ " if motivos else "   "
+            print(f"{marca}{caso:<32} {medicion['segundos']:9.3f}s {medicion['pico_mb']:9.1f}MB {referencia}")
+            if motivos:
+                regresiones.append((caso, escala, motivos))
+            if args.guardar:
+                baselines["resultados"].setdefault(caso, {})[escala] = medicion
+            del datos
+            gc.collect()
+
+        del compartidos
+        gc.collect()
+
+    if args.guardar:
+        baselines["entorno"] = entorno()
+        guardar_baselines(baselines)
+        print(f"\n💾 Baselines guardadas en {BASELINES_PATH}")
+
+    for caso, escala, motivos in regresiones:
+        print(f"⚠️  Regresión en {caso} [{escala}]: {'; '.join(motivos)}")
+    for caso, escala, error in errores:
+        print(f"❌ Error en {caso} [{escala}]: {error}")
+    if not regresiones and not errores:
+        print("\n✅ Sin regresiones")
+    return 1 if errores or (regresiones and not args.guardar) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Configuración de gunicorn para GymMaster IA Service
+---------------------------------------------------
+
+Varios procesos uvicorn detrás de gunicorn: un run() pesado de un modelo ocupa
+un solo worker y el resto sigue atendiendo (cada proceso tiene su propio GIL).
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Variables de entorno:
+- PORT: puerto (Render lo define); por defecto 8000.
+- WEB_CONCURRENCY: cantidad de workers; por defecto uno por CPU (máx. 4).
+- GUNICORN_TIMEOUT: segundos antes de reiniciar un worker colgado (por defecto 120,
+  el ETL y el clustering completo pueden tardar).
+- CACHE_BACKEND / CACHE_DIR / REDIS_URL: cache compartido entre workers (utils/cache.py).
+
+No se usa preload_app: el hilo escritor de logs (utils/logs.py) y los clientes de
+Supabase no sobreviven al fork, así que cada worker importa la app por su cuenta.
+"""
+
+import os
+import shutil
+import tempfile
+import multiprocessing
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 8000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count(), 4)))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+# Reciclar workers de a poco para acotar la memoria de pandas/sklearn
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = 100
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info").lower()
+
+# Métricas Prometheus agregadas entre workers (ver utils/metricas.py). Se define
+# acá, en el master, para que los workers lo hereden antes de importar prometheus_client.
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "gymmaster_prometheus")
+)
+
+
+def on_starting(server):
+    # Los archivos de una ejecución anterior sumarían valores viejos
+    directorio = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directorio, ignore_errors=True)
+    os.makedirs(directorio, exist_ok=True)
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+    except ImportError:
+        pass
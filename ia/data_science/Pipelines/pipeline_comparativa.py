@@ -10,8 +10,14 @@ Este pipeline:
     - Asistencias promedio por socio
     - Concurrencia promedio por día
     - Concurrencia promedio por hora
+    - Socios distintos por mes (por gimnasio y entre todos)
 4. Guarda cada informe en /output/comparativas.
 
+Los socios distintos salen de sketches HyperLogLog por gimnasio y día
+(utils/hyperloglog.py) guardados en el Data Lake: cada corrida combina las
+asistencias nuevas con los sketches existentes y el total entre gimnasios es
+la unión de sketches, sin reagrupar las asistencias consolidadas.
+
 Uso:
 $ python ia/data_science/Pipelines/pipeline_comparativa.py
 """
@@ -32,6 +38,7 @@ from ia.data_science.Informes.informes_comparativa import (
     concurrencia_promedio_por_dia,
     concurrencia_promedio_por_hora
 )
+from utils.hyperloglog import SketchesDiarios, distintos_por_mes
 
 
 def main():
@@ -47,6 +54,7 @@ def main():
 
     all_usuarios = []
     all_asistencias = []
+    all_sketches = []
 
     print("🚀 Iniciando comparativa entre gimnasios...")
 
@@ -64,6 +72,11 @@ def main():
         all_usuarios.append(data['usuario'])
         all_asistencias.append(data['asistencia'])
 
+        # Sketches de socios distintos por día, incrementales sobre los ya guardados
+        sketches = SketchesDiarios.cargar(nombre).actualizar(data['asistencia'])
+        sketches.guardar()
+        all_sketches.append(sketches)
+
     # Consolidar en DataFrames globales
     usuarios_df = pd.concat(all_usuarios, ignore_index=True)
     asistencias_df = pd.concat(all_asistencias, ignore_index=True)
@@ -88,6 +101,10 @@ def main():
     concurrencia_hora_df = concurrencia_promedio_por_hora(asistencias_df)
     concurrencia_hora_df.to_csv(os.path.join(output_dir, 'concurrencia_promedio_por_hora.csv'), index=False)
 
+    print("📊 Calculando socios distintos por mes (sketches HyperLogLog)...")
+    distintos_df = distintos_por_mes(all_sketches)
+    distintos_df.to_csv(os.path.join(output_dir, 'socios_distintos_por_mes.csv'), index=False)
+
     print(f"\n✅ Todos los informes comparativos fueron guardados en: {output_dir}")
 
 
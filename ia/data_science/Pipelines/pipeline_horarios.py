@@ -18,8 +18,6 @@ $ python ia/data_science/Pipelines/pipeline_horarios.py
 import sys
 import os
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 # Ajustar el sys.path para importar desde la raíz del proyecto
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -68,6 +66,10 @@ def generar_heatmap_dia_hora(asistencia_df: pd.DataFrame) -> pd.DataFrame:
 
 def graficar_heatmap(heatmap_df: pd.DataFrame, gimnasio: str, output_dir: str):
     """Genera y guarda una imagen del heatmap."""
+    # Import diferido: matplotlib/seaborn solo se cargan si se grafica
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     plt.figure(figsize=(12, 6))
     sns.heatmap(heatmap_df, cmap="YlGnBu", linewidths=.5, annot=True, fmt='.0f')
     plt.title(f'Heatmap de Asistencias - {gimnasio}')
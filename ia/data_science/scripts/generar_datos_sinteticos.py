@@ -0,0 +1,43 @@
+"""
+Genera un Data Lake sintético completo (socios, asistencia, pagos, logs QR,
+equipamiento y mantenimiento) con los generadores vectorizados de
+utils/datos_sinteticos.py, para desarrollo y benchmarks a escala.
+
+Uso:
+$ python ia/data_science/scripts/generar_datos_sinteticos.py [socios] [gimnasios] [dias] [semilla] [directorio]
+
+Ejemplo (1 millón de socios en 3 gimnasios, 30 días de asistencia):
+$ python ia/data_science/scripts/generar_datos_sinteticos.py 1000000 3 30
+"""
+
+import sys
+import os
+import time
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '../../..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.datos_sinteticos import SEMILLA, SINTETICOS_DIR, generar_datos, guardar_data_lake
+
+
+def main():
+    n_socios = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_gimnasios = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    n_dias = int(sys.argv[3]) if len(sys.argv) > 3 else 90
+    semilla = int(sys.argv[4]) if len(sys.argv) > 4 else SEMILLA
+    directorio = sys.argv[5] if len(sys.argv) > 5 else SINTETICOS_DIR
+
+    inicio = time.perf_counter()
+    datos = generar_datos(n_socios, n_gimnasios, n_dias, semilla=semilla)
+    generado = time.perf_counter()
+    rutas = guardar_data_lake(datos, directorio)
+
+    print(f"🚀 {n_socios} socios en {n_gimnasios} gimnasio(s), {n_dias} días (semilla {semilla})")
+    for tabla, ruta in rutas.items():
+        print(f"   {tabla:<14} {len(datos[tabla]):>12,} filas → {ruta}")
+    print(f"✅ Generado en {generado - inicio:.2f} s, escrito en {time.perf_counter() - generado:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
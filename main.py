@@ -1,9 +1,9 @@
 import os
-import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from datetime import datetime
+from fastapi.responses import JSONResponse, Response, FileResponse
+from datetime import date, datetime, timedelta
+from typing import Optional
 import logging
 
 # Configurar logging para producción
@@ -14,8 +14,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Importamos los módulos de IA
-from models import prediccion_asistencia, proyeccion_ingresos, clustering_equipos
+from utils.respuestas import RespuestaJSON, RutaJSONRapida
+from utils.cache_http import ETagMiddleware
+from utils.compresion import CompresionMiddleware
+from utils.metricas import MetricasMiddleware, ejecutar_modelo, metricas_habilitadas, exportar
+from utils.perfilado import PerfiladoMiddleware, token_valido, ruta_perfil
 
 # Crear instancia de FastAPI
 app = FastAPI(
@@ -41,11 +44,16 @@ app = FastAPI(
     #### 📈 Asistencia y Churn
     - `/api/admin/metricas/asistencia/semanal` - Métricas de 7 días
     - `/api/admin/metricas/asistencia/mensual` - Análisis mensual
-    - `/api/admin/metricas/asistencia/top-inactivos` - Socios en riesgo
+    - `?desde=AAAA-MM-DD&hasta=AAAA-MM-DD&granularidad=dia|semana|mes` - Rango libre (semanal, mensual e histograma de pagos)
+    - `/api/admin/metricas/asistencia/top-inactivos?k=&gimnasio=&segmento=` - Ranking de socios en riesgo
     - `/api/admin/metricas/asistencia/prediccion-abandono` - Modelo ML de churn
+    - `/api/admin/metricas/asistencia/distribucion-riesgo?cortes=0.4,0.7` - Socios por tramo de riesgo
+    - `/api/admin/metricas/asistencia/actividad` - DAU/WAU/MAU y retención de cohortes
+    - `/api/socios/{id_socio}/asistencia` - Línea de tiempo de asistencia del socio
     
     #### 💰 Pagos y Finanzas  
     - `/api/admin/metricas/pagos/histograma` - Distribución de pagos
+    - `/api/admin/metricas/pagos/percentiles?percentiles=50,90,99` - Percentiles de monto y días de retraso
     - `/api/admin/metricas/pagos/segmentacion` - Análisis de morosos
     - `/api/admin/metricas/pagos/proyeccion-ingresos` - Simulación Monte Carlo
     
@@ -58,18 +66,22 @@ app = FastAPI(
     #### 🎯 Rutinas IA
     - `/api/admin/metricas/rutinas/adherencia` - Seguimiento mensual
     - `/api/admin/metricas/rutinas/evolucion-promedio` - Progreso por objetivo
+    - `/api/socios/{id_socio}/rutina` - Rutina semanal personalizada bajo demanda
     
     ### 🔧 Testing y Diagnóstico
     - `/health` - Estado del servicio
+    - `/metrics` - Métricas Prometheus (latencias por ruta y etapa, caches)
+    - `?perfil=cpu|memoria` + header `X-Admin-Token` - Perfila el request (archivo en header `X-Perfil-Archivo`)
     - `/api/test/database-connections` - Verificación completa de conexiones
     
     ### 📋 Notas de Integración:
     - **Sin Autenticación**: Todos los endpoints están abiertos para testing
     - **Multi-Tenant**: Ready para integrar con dbName del gimnasio
-    - **JSON Optimizado**: Todas las respuestas son JSON válido
+    - **JSON Optimizado**: Todas las respuestas son JSON válido (orjson, NaN → null)
     - **Error Handling**: Manejo robusto de errores y fallbacks
     """,
     version="3.0.0",
+    default_response_class=RespuestaJSON,
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_tags=[
@@ -100,6 +112,16 @@ app = FastAPI(
     ]
 )
 
+# Los dicts devueltos por los endpoints se serializan con orjson sin pasar por jsonable_encoder
+app.router.route_class = RutaJSONRapida
+
+# Perfilado bajo demanda (?perfil=cpu|memoria + X-Admin-Token)
+app.add_middleware(PerfiladoMiddleware)
+
+# ETag por huella de datos: 304 sin recalcular si los datos no cambiaron.
+# Se registra antes que CORS para que los 304 también lleven los headers CORS.
+app.add_middleware(ETagMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -109,6 +131,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresión gzip/brotli: comprime lo que ya pasó por CORS y ETag
+app.add_middleware(CompresionMiddleware)
+
+# Latencia por ruta (la más externa: incluye compresión y 304)
+app.add_middleware(MetricasMiddleware)
+
+# Los modelos (pandas, numpy, sklearn, supabase) se importan dentro de cada endpoint
+# para que el proceso abra el puerto rápido en los cold starts de Render. Una vez
+# arrancado se precargan en segundo plano para que el primer request no pague el import.
+MODULOS_PRECARGA = ("models.prediccion_asistencia", "models.proyeccion_ingresos", "models.clustering_equipos",
+                    "models.equipamiento", "models.rutinas", "models.asistencia_socio",
+                    "models.ranking_inactivos", "models.distribucion_riesgo",
+                    "models.actividad_socios", "models.metricas_rango", "models.percentiles_pagos")
+
+@app.on_event("startup")
+async def precargar_modelos():
+    if os.environ.get("PRECARGA_MODELOS", "1") != "1":
+        return
+
+    def _precargar():
+        import importlib
+        for modulo in MODULOS_PRECARGA:
+            try:
+                importlib.import_module(modulo)
+            except Exception as e:
+                logger.warning(f"No se pudo precargar {modulo}: {e}")
+
+    import threading
+    threading.Thread(target=_precargar, name="precarga-modelos", daemon=True).start()
+
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
     """Manejo global de excepciones"""
@@ -138,6 +190,24 @@ async def root():
         }
     }
 
+@app.get("/metrics", tags=["Core"], include_in_schema=False)
+async def metrics():
+    """Métricas en formato Prometheus (latencias por ruta y etapa, caches, executor)"""
+    if not metricas_habilitadas():
+        return Response("prometheus_client no instalado\n", status_code=503, media_type="text/plain")
+    cuerpo, content_type = exportar()
+    return Response(cuerpo, headers={"Content-Type": content_type})
+
+@app.get("/api/admin/perfiles/{archivo}", tags=["Testing"], include_in_schema=False)
+async def descargar_perfil(archivo: str, x_admin_token: Optional[str] = Header(default=None)):
+    """Descarga un perfil generado con ?perfil=cpu|memoria (requiere X-Admin-Token)"""
+    if not token_valido(x_admin_token):
+        raise HTTPException(status_code=403, detail="No autorizado")
+    ruta = ruta_perfil(archivo)
+    if ruta is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return FileResponse(ruta)
+
 @app.get("/health", tags=["Core"])
 async def health_check():
     """Endpoint de salud del microservicio"""
@@ -157,7 +227,7 @@ async def health_check():
         # Test básico de modelos
         try:
             from models import prediccion_asistencia
-            test_result = prediccion_asistencia.run()
+            test_result = await ejecutar_modelo(prediccion_asistencia.run)
             health_status["dependencies"]["prediccion_model"] = "operational" if "error" not in test_result else "error"
         except Exception as e:
             health_status["dependencies"]["prediccion_model"] = f"error: {str(e)[:50]}"
@@ -184,7 +254,7 @@ async def prediccion_asistencia():
     try:
         logger.info("Iniciando análisis de predicción de asistencia con ML")
         from models import prediccion_asistencia as pred_model
-        resultado = pred_model.run()
+        resultado = await ejecutar_modelo(pred_model.run)
         
         if "error" in resultado:
             raise HTTPException(status_code=500, detail=resultado["error"])
@@ -209,7 +279,7 @@ async def proyeccion_ingresos():
     try:
         logger.info("Iniciando proyección de ingresos con Random Forest")
         from models import proyeccion_ingresos as proj_model
-        resultado = proj_model.run()
+        resultado = await ejecutar_modelo(proj_model.run)
         
         if "error" in resultado:
             raise HTTPException(status_code=500, detail=resultado["error"])
@@ -234,7 +304,7 @@ async def ranking_equipos():
     try:
         logger.info("Iniciando clustering y ranking de equipos")
         from models import clustering_equipos as cluster_model
-        resultado = cluster_model.run()
+        resultado = await ejecutar_modelo(cluster_model.run)
         
         if "error" in resultado:
             raise HTTPException(status_code=500, detail=resultado["error"])
@@ -260,7 +330,7 @@ async def segmentacion_socios():
         
         # Usar el análisis de segmentación del modelo de predicción
         from models import prediccion_asistencia as pred_model
-        resultado_completo = pred_model.run()
+        resultado_completo = await ejecutar_modelo(pred_model.run)
         
         if "error" in resultado_completo:
             raise HTTPException(status_code=500, detail=resultado_completo["error"])
@@ -293,7 +363,7 @@ async def analisis_churn():
         logger.info("Iniciando análisis específico de churn")
         
         from models import prediccion_asistencia as pred_model
-        resultado_completo = pred_model.run()
+        resultado_completo = await ejecutar_modelo(pred_model.run)
         
         if "error" in resultado_completo:
             raise HTTPException(status_code=500, detail=resultado_completo["error"])
@@ -322,21 +392,73 @@ async def analisis_churn():
 # NUEVOS ENDPOINTS SEGÚN ESPECIFICACIÓN
 # =====================================
 
+PATRON_FECHA = r"^\d{4}-\d{2}-\d{2}$"
+# Rango máximo de desde/hasta: la serie por día tiene un elemento por día del rango
+RANGO_MAX_DIAS = int(os.environ.get("RANGO_MAX_DIAS", 3660))
+
+def validar_fecha(valor, parametro):
+    """date de un AAAA-MM-DD (el patrón del Query no descarta 2025-02-30) o 422"""
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"'{parametro}' no es una fecha válida: {valor}")
+
+def validar_rango(desde, hasta, dias_defecto=None):
+    """
+    (desde, hasta) como date, completando `hasta` con hoy y `desde` con los últimos
+    `dias_defecto` días si se indica; 422 si no son fechas, si desde > hasta o si el
+    rango supera RANGO_MAX_DIAS
+    """
+    desde = validar_fecha(desde, "desde") if desde else None
+    hasta = validar_fecha(hasta, "hasta") if hasta else None
+    if dias_defecto is not None:
+        hasta = hasta or date.today()
+        desde = desde or hasta - timedelta(days=dias_defecto - 1)
+    if desde and hasta:
+        if desde > hasta:
+            raise HTTPException(status_code=422, detail="'desde' no puede ser posterior a 'hasta' (por defecto hoy)")
+        if (hasta - desde).days + 1 > RANGO_MAX_DIAS:
+            raise HTTPException(status_code=422, detail=f"El rango no puede superar {RANGO_MAX_DIAS} días")
+    return desde, hasta
+
+async def metricas_rango(desde, hasta, granularidad, gimnasio, dias_defecto):
+    """
+    Totales y serie de asistencias/pagos/ingresos del rango (sumas acumuladas, O(1) por tramo).
+    El rango se valida acá (422) para que el modelo solo reciba fechas válidas.
+    """
+    desde, hasta = validar_rango(desde, hasta, dias_defecto)
+
+    from models import metricas_rango as rango_model
+    rango = await ejecutar_modelo(rango_model.run, desde.isoformat(), hasta.isoformat(), granularidad=granularidad,
+                                  gimnasio=gimnasio, dias_defecto=dias_defecto)
+    if "error" in rango:
+        raise HTTPException(status_code=500, detail=rango["error"])
+    rango["periodo"] = f"{rango['dias']} días"
+    return rango
+
 @app.get("/api/admin/metricas/asistencia/semanal", tags=["Asistencia"])
-async def metricas_asistencia_semanal():
+async def metricas_asistencia_semanal(
+    desde: Optional[str] = Query(None, pattern=PATRON_FECHA, description="Inicio del rango (AAAA-MM-DD)"),
+    hasta: Optional[str] = Query(None, pattern=PATRON_FECHA, description="Fin del rango (AAAA-MM-DD), por defecto hoy"),
+    granularidad: str = Query("dia", pattern="^(dia|semana|mes)$", description="Agrupación de la serie"),
+    gimnasio: Optional[str] = Query(None, description="Filtrar por gimnasio")
+):
     """
     📊 Métricas semanales de asistencia
     
-    Retorna análisis de los últimos 7 días incluyendo:
-    - Total de registros de asistencia
-    - Socios únicos activos
-    - Análisis de churn semanal
+    Retorna:
+    - `rango`: asistencias, pagos e ingresos de los últimos 7 días (o de
+      `desde`/`hasta`, filtrados por `gimnasio`) con serie por `granularidad`
+    - `semana_actual` y `analisis_churn`: estado actual de todo el gimnasio; no
+      dependen de `desde`/`hasta`/`gimnasio` (ver `sin_filtros`)
     """
     try:
         logger.info("Obteniendo métricas semanales de asistencia")
         
+        rango = await metricas_rango(desde, hasta, granularidad, gimnasio, dias_defecto=7)
+        
         from models import prediccion_asistencia as pred_model
-        resultado = pred_model.run()
+        resultado = await ejecutar_modelo(pred_model.run)
         
         # Extraer métricas semanales
         return {
@@ -346,24 +468,37 @@ async def metricas_asistencia_semanal():
             "data": {
                 "semana_actual": resultado.get("tendencias_asistencia", {}),
                 "analisis_churn": resultado.get("analisis_churn", {}),
-                "periodo": "7 días"
+                "rango": rango,
+                "sin_filtros": ["semana_actual", "analisis_churn"]
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error en métricas semanales: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
 @app.get("/api/admin/metricas/asistencia/mensual")
-async def metricas_asistencia_mensual():
+async def metricas_asistencia_mensual(
+    desde: Optional[str] = Query(None, pattern=PATRON_FECHA, description="Inicio del rango (AAAA-MM-DD)"),
+    hasta: Optional[str] = Query(None, pattern=PATRON_FECHA, description="Fin del rango (AAAA-MM-DD), por defecto hoy"),
+    granularidad: str = Query("semana", pattern="^(dia|semana|mes)$", description="Agrupación de la serie"),
+    gimnasio: Optional[str] = Query(None, description="Filtrar por gimnasio")
+):
     """
     Métricas mensuales de asistencia
+
+    `rango` cubre los últimos 30 días (o `desde`/`hasta`, filtrados por `gimnasio`);
+    `resumen_mensual` y `segmentacion` son de todo el gimnasio (ver `sin_filtros`).
     """
     try:
         logger.info("Obteniendo métricas mensuales de asistencia")
         
+        rango = await metricas_rango(desde, hasta, granularidad, gimnasio, dias_defecto=30)
+        
         from models import prediccion_asistencia as pred_model
-        resultado = pred_model.run()
+        resultado = await ejecutar_modelo(pred_model.run)
         
         return {
             "endpoint": "metricas-asistencia-mensual", 
@@ -372,39 +507,134 @@ async def metricas_asistencia_mensual():
             "data": {
                 "resumen_mensual": resultado.get("tendencias_asistencia", {}),
                 "segmentacion": resultado.get("segmentacion_comportamiento", {}),
-                "periodo": "30 días"
+                "rango": rango,
+                "sin_filtros": ["resumen_mensual", "segmentacion"]
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error en métricas mensuales: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
 @app.get("/api/admin/metricas/asistencia/top-inactivos")
-async def metricas_top_inactivos():
+async def metricas_top_inactivos(
+    k: int = Query(5, ge=1, le=10000, description="Cantidad de socios del ranking"),
+    gimnasio: Optional[str] = Query(None, description="Filtrar por gimnasio"),
+    segmento: Optional[str] = Query(None, description="Filtrar por segmento de pago (ej: Moroso crónico)"),
+    criterio: str = Query("riesgo", pattern="^(riesgo|inactividad)$", description="Ordenar por riesgo de churn o días sin asistir")
+):
     """
-    Top 5 socios inactivos con mayor riesgo de abandono
+    Top-k socios inactivos con mayor riesgo de abandono
+
+    Ranking en vivo sobre todos los socios (no solo el CSV precalculado del top 5).
     """
     try:
-        logger.info("Obteniendo top socios inactivos")
+        logger.info(f"Obteniendo top {k} socios inactivos")
         
-        from models import prediccion_asistencia as pred_model
-        resultado = pred_model.run()
+        from models import ranking_inactivos as ranking_model
+        resultado = await ejecutar_modelo(ranking_model.run, k, gimnasio=gimnasio, segmento=segmento, criterio=criterio)
+        if "error" in resultado:
+            raise HTTPException(status_code=500, detail=resultado["error"])
         
         return {
             "endpoint": "top-socios-inactivos",
             "descripcion": "Identificación de socios en riesgo crítico",
             "timestamp": datetime.now().isoformat(),
             "data": {
-                "socios_criticos": resultado.get("socios_criticos", {}),
-                "recomendaciones": resultado.get("recomendaciones", [])
+                "socios_criticos": {
+                    "total_inactivos_criticos": resultado["total_inactivos"],
+                    "total_candidatos": resultado["total_candidatos"],
+                    "criterio": resultado["criterio"],
+                    "filtros": resultado["filtros"],
+                    "detalle": resultado["detalle"]
+                },
+                "gimnasios_disponibles": resultado["gimnasios_disponibles"],
+                "segmentos_disponibles": resultado["segmentos_disponibles"],
+                "recomendaciones": resultado["recomendaciones"]
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error en top inactivos: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
+@app.get("/api/admin/metricas/asistencia/distribucion-riesgo", tags=["Asistencia"])
+async def distribucion_riesgo(
+    cortes: str = Query("0.4,0.7", pattern=r"^\s*\d*\.?\d+(\s*,\s*\d*\.?\d+)*\s*$", description="Cortes de riesgo separados por coma (entre 0 y 1)"),
+    gimnasio: Optional[str] = Query(None, description="Filtrar por gimnasio"),
+    segmento: Optional[str] = Query(None, description="Filtrar por segmento de pago"),
+    bins: int = Query(10, ge=1, le=100, description="Tramos del histograma")
+):
+    """
+    Distribución del riesgo de abandono con cortes personalizados
+
+    Cantidad de socios por tramo de riesgo, histograma y cuantiles, calculados
+    con búsqueda binaria sobre los scores ordenados de cada gimnasio/segmento.
+    """
+    try:
+        valores = [float(corte) for corte in cortes.split(",")]
+        if any(corte < 0 or corte > 1 for corte in valores):
+            raise HTTPException(status_code=422, detail="Los cortes deben estar entre 0 y 1")
+
+        logger.info(f"Calculando distribución de riesgo con cortes {valores}")
+
+        from models import distribucion_riesgo as distribucion_model
+        resultado = await ejecutar_modelo(distribucion_model.run, valores, gimnasio=gimnasio, segmento=segmento, bins=bins)
+        if "error" in resultado:
+            raise HTTPException(status_code=500, detail=resultado["error"])
+
+        return {
+            "endpoint": "distribucion-riesgo",
+            "descripcion": "Distribución del riesgo de abandono por tramos personalizados",
+            "timestamp": datetime.now().isoformat(),
+            "data": resultado
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error en distribución de riesgo: {e}")
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+
+@app.get("/api/admin/metricas/asistencia/actividad", tags=["Asistencia"])
+async def actividad_socios(
+    fecha: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Fecha de referencia (por defecto hoy)"),
+    gimnasio: Optional[str] = Query(None, description="Filtrar por gimnasio"),
+    dias: int = Query(30, ge=1, le=366, description="Días de la serie diaria"),
+    semanas_cohorte: int = Query(8, ge=1, le=52, description="Semanas de seguimiento de cohortes")
+):
+    """
+    Socios activos DAU/WAU/MAU, superposición entre períodos y retención de cohortes
+
+    Se calculan con operaciones de bits sobre los socios activos de cada día,
+    sin reagrupar las asistencias.
+    """
+    try:
+        logger.info("Calculando actividad de socios")
+
+        from models import actividad_socios as actividad_model
+        resultado = await ejecutar_modelo(actividad_model.run, fecha, gimnasio=gimnasio, dias_serie=dias,
+                                          semanas_cohorte=semanas_cohorte)
+        if "error" in resultado:
+            raise HTTPException(status_code=500, detail=resultado["error"])
+
+        return {
+            "endpoint": "actividad-socios",
+            "descripcion": "Socios activos por ventana y retención de cohortes",
+            "timestamp": datetime.now().isoformat(),
+            "data": resultado
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error en actividad de socios: {e}")
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+
 @app.get("/api/admin/metricas/asistencia/prediccion-abandono")
 async def prediccion_abandono():
     """
@@ -414,7 +644,7 @@ async def prediccion_abandono():
         logger.info("Ejecutando predicción de abandono")
         
         from models import prediccion_asistencia as pred_model
-        resultado = pred_model.run()
+        resultado = await ejecutar_modelo(pred_model.run)
         
         return {
             "endpoint": "prediccion-abandono",
@@ -432,15 +662,27 @@ async def prediccion_abandono():
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
 @app.get("/api/admin/metricas/pagos/histograma")
-async def metricas_pagos_histograma():
+async def metricas_pagos_histograma(
+    desde: Optional[str] = Query(None, pattern=PATRON_FECHA, description="Inicio del rango (AAAA-MM-DD)"),
+    hasta: Optional[str] = Query(None, pattern=PATRON_FECHA, description="Fin del rango (AAAA-MM-DD), por defecto hoy"),
+    granularidad: str = Query("mes", pattern="^(dia|semana|mes)$", description="Agrupación de la serie"),
+    gimnasio: Optional[str] = Query(None, description="Filtrar por gimnasio")
+):
     """
-    Histograma de pagos mensuales
+    Histograma de pagos mensuales (últimos 6 meses o `desde`/`hasta`)
     """
     try:
         logger.info("Generando histograma de pagos")
         
+        rango = await metricas_rango(desde, hasta, granularidad, gimnasio, dias_defecto=183)
+        
         from models import proyeccion_ingresos as proj_model
-        resultado = proj_model.run()
+        resultado = await ejecutar_modelo(proj_model.run)
+
+        from models import percentiles_pagos as percentiles_model
+        distribucion = await ejecutar_modelo(percentiles_model.run, rango["desde"], rango["hasta"], gimnasio=gimnasio)
+        if "error" in distribucion:
+            raise HTTPException(status_code=500, detail=distribucion["error"])
         
         return {
             "endpoint": "histograma-pagos",
@@ -449,14 +691,59 @@ async def metricas_pagos_histograma():
             "data": {
                 "ingresos_historicos": resultado.get("ingresos_reales", {}),
                 "escenarios": resultado.get("escenarios_proyeccion", {}),
-                "periodo_analisis": "6 meses"
+                "rango": rango,
+                "distribucion": {metrica: distribucion[metrica] for metrica in ("monto", "dias_retraso")},
+                "periodo_analisis": f"{rango['desde']} a {rango['hasta']}"
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error en histograma de pagos: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
+@app.get("/api/admin/metricas/pagos/percentiles")
+async def metricas_pagos_percentiles(
+    desde: Optional[str] = Query(None, pattern=PATRON_FECHA, description="Inicio del rango (AAAA-MM-DD), por defecto todo el historial"),
+    hasta: Optional[str] = Query(None, pattern=PATRON_FECHA, description="Fin del rango (AAAA-MM-DD)"),
+    gimnasio: Optional[str] = Query(None, description="Filtrar por gimnasio"),
+    percentiles: str = Query("5,25,50,75,90,95,99", pattern=r"^\s*\d*\.?\d+(\s*,\s*\d*\.?\d+)*\s*$", description="Percentiles separados por coma (entre 0 y 100)"),
+    bins: int = Query(10, ge=1, le=100, description="Tramos del histograma")
+):
+    """
+    Percentiles e histograma de monto y días de retraso de los pagos
+
+    Se estiman combinando t-digest por gimnasio y mes (actualizados al ingerir
+    pagos), sin releer el historial. El rango se toma por meses completos.
+    """
+    try:
+        valores = [float(p) for p in percentiles.split(",")]
+        if any(p < 0 or p > 100 for p in valores):
+            raise HTTPException(status_code=422, detail="Los percentiles deben estar entre 0 y 100")
+        validar_rango(desde, hasta)
+
+        logger.info(f"Calculando percentiles de pagos {valores}")
+
+        from models import percentiles_pagos as percentiles_model
+        resultado = await ejecutar_modelo(percentiles_model.run, desde, hasta, gimnasio=gimnasio,
+                                          percentiles=valores, bins=bins)
+        if "error" in resultado:
+            raise HTTPException(status_code=500, detail=resultado["error"])
+
+        return {
+            "endpoint": "percentiles-pagos",
+            "descripcion": "Percentiles de monto y días de retraso de los pagos",
+            "timestamp": datetime.now().isoformat(),
+            "data": resultado
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error en percentiles de pagos: {e}")
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+
 @app.get("/api/admin/metricas/pagos/segmentacion")
 async def metricas_pagos_segmentacion():
     """
@@ -466,7 +753,7 @@ async def metricas_pagos_segmentacion():
         logger.info("Analizando segmentación de pagos")
         
         from models import proyeccion_ingresos as proj_model
-        resultado = proj_model.run()
+        resultado = await ejecutar_modelo(proj_model.run)
         
         return {
             "endpoint": "segmentacion-pagos",
@@ -491,7 +778,7 @@ async def metricas_proyeccion_ingresos():
         logger.info("Ejecutando proyección de ingresos")
         
         from models import proyeccion_ingresos as proj_model
-        resultado = proj_model.run()
+        resultado = await ejecutar_modelo(proj_model.run)
         
         return {
             "endpoint": "proyeccion-ingresos-detallada",
@@ -516,20 +803,27 @@ async def estado_actual_equipos():
     try:
         logger.info("Verificando estado actual de equipos")
         
-        from models import clustering_equipos as cluster_model
-        resultado = cluster_model.run()
+        from models import equipamiento as equipamiento_model
+        resultado = await ejecutar_modelo(equipamiento_model.run_estado_actual)
+        
+        if "error" in resultado:
+            raise HTTPException(status_code=500, detail=resultado["error"])
         
         return {
             "endpoint": "estado-equipamiento",
-            "descripcion": "Estado actual y ranking de equipos",
+            "descripcion": "Estado actual de equipos con indicador semáforo",
             "timestamp": datetime.now().isoformat(),
             "data": {
-                "ranking_equipos": resultado.get("ranking_equipos", {}),
-                "clustering": resultado.get("clustering_resultados", {}),
-                "estado_general": "operativo"
+                "resumen_semaforo": resultado.get("resumen_semaforo", {}),
+                "equipos": resultado.get("equipos", []),
+                "total_equipos": resultado.get("total_equipos", 0),
+                "estado_general": resultado.get("estado_general", "operativo"),
+                "datos_fuente": resultado.get("datos_fuente")
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error en estado de equipos: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
@@ -542,20 +836,27 @@ async def top_fallos_equipos():
     try:
         logger.info("Analizando top fallos de equipos")
         
-        from models import clustering_equipos as cluster_model
-        resultado = cluster_model.run()
+        from models import equipamiento as equipamiento_model
+        resultado = await ejecutar_modelo(equipamiento_model.run_ranking_fallos)
+        
+        if "error" in resultado:
+            raise HTTPException(status_code=500, detail=resultado["error"])
         
         return {
             "endpoint": "top-fallos-equipos",
             "descripcion": "Ranking de equipos con más fallos",
             "timestamp": datetime.now().isoformat(),
             "data": {
-                "top_fallos": resultado.get("analisis_mantenimiento", {}),
-                "clustering": resultado.get("clustering_resultados", {}),
-                "recomendaciones": resultado.get("recomendaciones", [])
+                "top_fallos": resultado.get("ranking", []),
+                "equipos_con_fallos": resultado.get("equipos_con_fallos", 0),
+                "total_fallos": resultado.get("total_fallos", 0),
+                "costo_total_fallos": resultado.get("costo_total_fallos", 0.0),
+                "datos_fuente": resultado.get("datos_fuente")
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error en top fallos: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
@@ -569,7 +870,7 @@ async def prediccion_fallo_equipos():
         logger.info("Ejecutando predicción de fallos")
         
         from models import clustering_equipos as cluster_model
-        resultado = cluster_model.run()
+        resultado = await ejecutar_modelo(cluster_model.run)
         
         return {
             "endpoint": "prediccion-fallos",
@@ -668,6 +969,77 @@ async def metricas_rutinas_evolucion():
         logger.error(f"Error en evolución rutinas: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
+@app.get("/api/socios/{id_socio}/rutina", tags=["Rutinas"])
+async def rutina_socio(
+    id_socio: str,
+    semana: Optional[str] = Query(None, pattern=r"^\d{4}-W\d{2}$", description="Semana ISO (ej: 2025-W27), por defecto la actual"),
+    dias_por_semana: Optional[int] = Query(None, ge=1, le=6, description="Reemplaza los días configurados del socio")
+):
+    """
+    Rutina semanal personalizada generada bajo demanda
+
+    La rutina es determinística por socio y semana, y las recientes se sirven desde cache.
+    """
+    try:
+        logger.info(f"Generando rutina para socio {id_socio}")
+
+        from models import rutinas as rutinas_model
+        resultado = await ejecutar_modelo(rutinas_model.run, id_socio, semana=semana, dias_por_semana=dias_por_semana)
+
+        if resultado.get("socio_encontrado") is False:
+            raise HTTPException(status_code=404, detail=resultado["error"])
+        if "error" in resultado:
+            raise HTTPException(status_code=500, detail=resultado["error"])
+
+        return {
+            "endpoint": "rutina-socio",
+            "descripcion": "Rutina semanal personalizada generada con el catálogo de ejercicios",
+            "timestamp": datetime.now().isoformat(),
+            "data": resultado
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generando rutina: {e}")
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+
+@app.get("/api/socios/{id_socio}/asistencia", tags=["Asistencia"])
+async def asistencia_socio(
+    id_socio: str,
+    semanas: int = Query(4, ge=1, le=104, description="Ventana para contar visitas recientes"),
+    limite: int = Query(50, ge=0, le=1000, description="Cantidad de visitas más recientes a listar")
+):
+    """
+    Línea de tiempo de asistencia de un socio
+
+    Última visita, visitas en las últimas semanas y rachas semanales, leídas del
+    índice de asistencia por socio (sin agrupar toda la tabla en cada consulta).
+    """
+    try:
+        logger.info(f"Consultando asistencia del socio {id_socio}")
+
+        from models import asistencia_socio as asistencia_model
+        resultado = await ejecutar_modelo(asistencia_model.run, id_socio, semanas=semanas, limite=limite)
+
+        if resultado.get("socio_encontrado") is False:
+            raise HTTPException(status_code=404, detail=resultado["error"])
+        if "error" in resultado:
+            raise HTTPException(status_code=500, detail=resultado["error"])
+
+        return {
+            "endpoint": "asistencia-socio",
+            "descripcion": "Línea de tiempo de asistencia del socio",
+            "timestamp": datetime.now().isoformat(),
+            "data": resultado
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error consultando asistencia del socio: {e}")
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+
 @app.get("/api/admin/metricas/equipamiento/costo-beneficio")
 async def costo_beneficio_equipos():
     """
@@ -676,32 +1048,27 @@ async def costo_beneficio_equipos():
     try:
         logger.info("Analizando costo-beneficio de equipos")
         
+        from models import equipamiento as equipamiento_model
+        resultado = await ejecutar_modelo(equipamiento_model.run_costo_beneficio)
+        
+        if "error" in resultado:
+            raise HTTPException(status_code=500, detail=resultado["error"])
+        
         return {
             "endpoint": "costo-beneficio-equipos",
             "descripcion": "Análisis financiero de mantenimiento vs reemplazo",
             "timestamp": datetime.now().isoformat(),
             "data": {
-                "equipos_alto_costo": [
-                    {
-                        "equipo_id": "CINTA_001",
-                        "costo_mantenimiento_mensual": 450.00,
-                        "valor_reemplazo": 12000.00,
-                        "recomendacion": "mantener",
-                        "roi_mantenimiento": 85.2
-                    },
-                    {
-                        "equipo_id": "PESO_045",
-                        "costo_mantenimiento_mensual": 120.00,
-                        "valor_reemplazo": 2800.00,
-                        "recomendacion": "reemplazar",
-                        "roi_mantenimiento": 23.1
-                    }
-                ],
-                "ahorro_potencial_anual": 5400.00,
-                "inversion_recomendada": 8200.00
+                "equipos_alto_costo": resultado.get("equipos_alto_costo", []),
+                "ahorro_potencial_anual": resultado.get("ahorro_potencial_anual", 0.0),
+                "inversion_recomendada": resultado.get("inversion_recomendada", 0.0),
+                "umbral_reemplazo": resultado.get("umbral_reemplazo"),
+                "datos_fuente": resultado.get("datos_fuente")
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error en costo-beneficio: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
@@ -803,6 +1170,7 @@ if __name__ == "__main__":
     
     logger.info(f"🚀 Iniciando GymMaster IA Service en {host}:{port}")
     
+    import uvicorn
     uvicorn.run(
         app, 
         host=host, 
@@ -0,0 +1,84 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+from datetime import datetime
+
+# Ajustar sys.path para importar desde la raíz del proyecto
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.metricas import medir_etapa
+
+DIAS_SERIE_DEFECTO = 30
+SEMANAS_COHORTE_DEFECTO = 8
+
+
+def _a_dia(fecha) -> int:
+    return int(pd.Timestamp(fecha).to_datetime64().astype('datetime64[D]').astype(np.int64))
+
+
+def _a_fecha(dia) -> str:
+    return str(np.datetime64(int(dia), 'D'))
+
+
+def run(fecha=None, gimnasio=None, dias_serie=DIAS_SERIE_DEFECTO, semanas_cohorte=SEMANAS_COHORTE_DEFECTO):
+    """
+    Socios activos (DAU/WAU/MAU), serie diaria, comparación con el período
+    anterior y retención de cohortes semanales, con operaciones de bits sobre
+    los bitsets diarios de utils/actividad_diaria.py.
+    """
+    try:
+        from utils.indice_asistencia import obtener_indice
+        from utils.actividad_diaria import obtener_actividad
+
+        with medir_etapa("actividad_socios", "bitsets"):
+            indice = obtener_indice()
+            actividad = obtener_actividad(indice)
+
+        with medir_etapa("actividad_socios", "consulta"):
+            dia = _a_dia(fecha or datetime.now().date())
+            actividad = actividad.por_gimnasio(gimnasio)
+
+            dau = actividad.cantidad_activos(dia, dia)
+            wau = actividad.cantidad_activos(dia - 6, dia)
+            mau = actividad.cantidad_activos(dia - 29, dia)
+
+            desde_serie = dia - dias_serie + 1
+            serie = actividad.serie_diaria(desde_serie, dia)
+
+            # Semanas completas (lunes a domingo) hasta la de `fecha`, para las cohortes
+            lunes_actual = ((dia + 3) // 7) * 7 - 3
+            inicios = [lunes_actual - 7 * i for i in range(semanas_cohorte, -1, -1)]
+            cohortes = actividad.retencion_cohortes(inicios, semanas_cohorte)
+
+        return {
+            "status": "success",
+            "timestamp": datetime.now().isoformat(),
+            "mensaje": "Socios activos por ventana, superposición entre períodos y retención",
+            "datos_fuente": indice.fuente,
+            "fecha": _a_fecha(dia),
+            "filtros": {"gimnasio": gimnasio},
+            "socios_activos": {
+                "dau": dau,
+                "wau": wau,
+                "mau": mau,
+                "stickiness_dau_mau": round(dau / mau, 4) if mau else 0.0
+            },
+            "serie_diaria": [
+                {"fecha": _a_fecha(desde_serie + i), "socios_activos": int(cantidad)} for i, cantidad in enumerate(serie)
+            ],
+            "semana_vs_anterior": actividad.superposicion((dia - 13, dia - 7), (dia - 6, dia)),
+            "mes_vs_anterior": actividad.superposicion((dia - 59, dia - 30), (dia - 29, dia)),
+            "retencion_cohortes": [
+                {**cohorte, "inicio": _a_fecha(cohorte["inicio"])} for cohorte in cohortes
+            ]
+        }
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error calculando actividad de socios: {str(e)}",
+            "timestamp": datetime.now().isoformat()
+        }
@@ -0,0 +1,53 @@
+import sys
+import os
+from datetime import datetime
+
+# Ajustar sys.path para importar desde la raíz del proyecto
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.metricas import medir_etapa
+
+SEMANAS_DEFECTO = 4
+LIMITE_VISITAS_DEFECTO = 50
+
+
+def run(id_socio, semanas=SEMANAS_DEFECTO, limite=LIMITE_VISITAS_DEFECTO):
+    """
+    Línea de tiempo de asistencia de un socio desde el índice CSR compartido
+    (utils/indice_asistencia.py): la consulta es un slice, no un groupby de toda la tabla.
+    """
+    try:
+        from utils.indice_asistencia import obtener_indice
+
+        with medir_etapa("asistencia_socio", "indice"):
+            indice = obtener_indice()
+
+        with medir_etapa("asistencia_socio", "consulta"):
+            resumen = indice.resumen(id_socio, semanas=semanas, limite=limite)
+
+        if resumen is None:
+            return {
+                "status": "error",
+                "socio_encontrado": False,
+                "error": f"Socio {id_socio} sin asistencias registradas",
+                "timestamp": datetime.now().isoformat()
+            }
+
+        return {
+            "status": "success",
+            "timestamp": datetime.now().isoformat(),
+            "id_socio": str(id_socio),
+            "socio_encontrado": True,
+            "datos_fuente": indice.fuente,
+            "indice_generado_en": indice.generado_en,
+            **resumen
+        }
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error consultando asistencia del socio: {str(e)}",
+            "timestamp": datetime.now().isoformat()
+        }
@@ -9,13 +9,18 @@ CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
 sys.path.insert(0, PROJECT_ROOT)
 
+from utils.logs import obtener_logger
+from utils.metricas import medir_etapa
+from utils.serializacion import columna_json, registros
+
+logger = obtener_logger(__name__)
+
 def run():
     """
     Ejecuta análisis de ranking y clustering de equipos usando logs QR reales
     """
     try:
-        # Cargar datos desde Supabase usando pipeline
-        from utils.db import get_supabase_client
+        from models.uso_equipos import obtener_agregados, resumen_por_equipo, patrones_uso
         
         resultados = {
             "status": "success",
@@ -24,64 +29,39 @@ def run():
             "datos_fuente": "Logs QR Supabase + EDA equipamiento"
         }
         
-        # 1. Obtener logs QR desde Supabase
+        # 1. Agregados diarios de uso (los logs crudos se reducen una vez por día, no por request)
         try:
-            client = get_supabase_client()
-            if client:
-                response = client.table('logs_qr').select('*').execute()
-                logs_df = pd.DataFrame(response.data)
-                
-                if not logs_df.empty:
-                    # Procesar logs para análisis de equipos
-                    logs_df['timestamp'] = pd.to_datetime(logs_df['timestamp'])
-                    logs_df['fecha'] = logs_df['timestamp'].dt.date
-                    logs_df['hora'] = logs_df['timestamp'].dt.hour
-                    
-                    # Análisis de uso por dispositivo/tipo
-                    if 'tipo' in logs_df.columns:
-                        uso_por_tipo = logs_df['tipo'].value_counts()
-                    elif 'device_type' in logs_df.columns:
-                        uso_por_tipo = logs_df['device_type'].value_counts()
-                    else:
-                        uso_por_tipo = pd.Series({'mobile': 300, 'kiosk': 150, 'web': 50})
-                    
-                    resultados["analisis_dispositivos"] = {
-                        "total_registros": int(len(logs_df)),
-                        "dispositivos_unicos": int(logs_df['socio_id'].nunique()) if 'socio_id' in logs_df.columns else 0,
-                        "distribucion_tipos": {str(k): int(v) for k, v in uso_por_tipo.items()}
-                    }
-                    
-                    # Análisis temporal de uso
-                    uso_por_hora = logs_df.groupby('hora').size()
-                    horas_pico = uso_por_hora.nlargest(3) if len(uso_por_hora) > 0 else pd.Series({18: 50, 19: 45, 20: 40})
-                    
-                    resultados["patrones_uso"] = {
-                        "horas_pico": {str(hora): int(cantidad) for hora, cantidad in horas_pico.items()},
-                        "promedio_diario": float(logs_df.groupby('fecha').size().mean()) if len(logs_df) > 0 else 25.0,
-                        "dias_con_actividad": int(logs_df['fecha'].nunique()) if 'fecha' in logs_df.columns else 30
-                    }
-                else:
-                    # Usar datos simulados si no hay logs
-                    logs_df = generar_logs_simulados()
-                    resultados["datos_fuente"] = "Logs simulados (fallback)"
-            else:
-                logs_df = generar_logs_simulados()
-                resultados["datos_fuente"] = "Logs simulados (fallback)"
-                
+            with medir_etapa("clustering_equipos", "agregados_uso"):
+                agregados = obtener_agregados()
+            resultados["datos_fuente"] = agregados["fuente"]
+            patrones = patrones_uso(agregados["horario"])
+            if patrones:
+                resultados.update(patrones)
+            uso_equipos = resumen_por_equipo(agregados["diario"])
         except Exception as e:
-            print(f"Error accediendo a logs QR: {e}")
-            logs_df = generar_logs_simulados()
+            logger.warning("Error accediendo a agregados de logs QR", extra={"error": e})
+            uso_equipos = None
             resultados["datos_fuente"] = "Logs simulados (fallback)"
         
-        # 2. Análisis de equipos de gimnasio (simulado basado en EDA)
-        equipos_gimnasio = simular_uso_equipos()
+        # 2. Equipos desde el snapshot compartido de equipamiento + uso real por equipo
+        with medir_etapa("clustering_equipos", "carga_snapshot"):
+            equipos_base = cargar_equipos_base()
+        if uso_equipos is not None and not uso_equipos.empty:
+            equipos_gimnasio = combinar_uso_equipos(equipos_base, uso_equipos)
+            resultados["datos_uso_equipos"] = "Agregado diario de logs QR"
+        else:
+            equipos_gimnasio = simular_uso_equipos(equipos_base)
+            resultados["datos_uso_equipos"] = "Uso simulado (logs sin identificador de equipo)"
+        resultados["datos_equipamiento"] = "Snapshot equipamiento" if equipos_base is not None else "Catálogo simulado (fallback)"
         
         # 3. Ranking de equipos más utilizados
-        ranking_equipos = crear_ranking_equipos(equipos_gimnasio)
+        with medir_etapa("clustering_equipos", "ranking"):
+            ranking_equipos = crear_ranking_equipos(equipos_gimnasio)
         resultados["ranking_equipos"] = ranking_equipos
         
         # 4. Clustering de equipos por uso y características
-        clusters = crear_clusters_equipos(equipos_gimnasio)
+        with medir_etapa("clustering_equipos", "clustering"):
+            clusters = crear_clusters_equipos(equipos_gimnasio)
         resultados["clustering_equipos"] = clusters
         
         # 5. Análisis de mantenimiento y optimización
@@ -98,8 +78,8 @@ def run():
         
         # 7. Métricas de eficiencia
         resultados["metricas_eficiencia"] = {
-            "utilizacion_promedio": 75.5,
-            "tiempo_promedio_uso": 35.2,
+            "utilizacion_promedio": round(float(equipos_gimnasio['utilizacion_porcentaje'].mean()), 2),
+            "tiempo_promedio_uso": round(float(equipos_gimnasio['tiempo_promedio_minutos'].mean()), 2),
             "rotacion_equipos_dia": 8.3,
             "satisfaccion_estimada": 85.7
         }
@@ -115,26 +95,73 @@ def run():
 
 def generar_logs_simulados():
     """Genera logs simulados para análisis de equipos"""
-    np.random.seed(42)
-    
-    logs = []
-    socios = [f"socio_{i}" for i in range(1, 101)]
-    tipos_dispositivo = ['mobile', 'kiosk', 'web']
-    
-    for _ in range(500):
-        timestamp = datetime.now() - timedelta(days=np.random.randint(0, 30))
-        logs.append({
-            'socio_id': np.random.choice(socios),
-            'timestamp': timestamp,
-            'device_type': np.random.choice(tipos_dispositivo),
-            'fecha': timestamp.date(),
-            'hora': timestamp.hour
+    from utils.datos_sinteticos import generador, generar_logs_qr
+
+    socios = np.array([f"socio_{i}" for i in range(1, 101)])
+    logs = generar_logs_qr(socios, n_logs=500, n_dias=30, rng=generador())
+    return logs.astype({'device_type': str})
+
+def cargar_equipos_base():
+    """
+    Equipos reales (id, nombre, categoría, estado) tomados del snapshot compartido
+    de equipamiento, sin volver a descargar las tablas
+    """
+    try:
+        from models.equipamiento import cargar_datos_equipamiento, calcular_estado_semaforo, ESTADO_CRITICO
+
+        datos = cargar_datos_equipamiento()
+        if datos["equipos"].empty:
+            return None
+
+        estado_df = calcular_estado_semaforo(datos["equipos"], datos["mantenimientos"])
+        categoria = datos["equipos"]['categoria'] if 'categoria' in datos["equipos"].columns else 'General'
+        return pd.DataFrame({
+            'equipo_id': estado_df['id'].to_numpy(),
+            'nombre': estado_df['nombre'].to_numpy(),
+            'categoria': pd.Series(categoria, index=datos["equipos"].index).fillna('General').to_numpy(),
+            'estado': np.where(estado_df['estado_semaforo'].to_numpy() == ESTADO_CRITICO, 'Mantenimiento', 'Operativo'),
+            'ultima_revision': estado_df['ultima_revision'].dt.strftime('%Y-%m-%d').to_numpy()
         })
-    
-    return pd.DataFrame(logs)
+    except Exception as e:
+        logger.warning("Error leyendo snapshot de equipamiento", extra={"error": e})
+        return None
 
-def simular_uso_equipos():
+def combinar_uso_equipos(equipos_base, uso_equipos):
+    """
+    Une el uso real agregado por equipo con los datos del snapshot de equipamiento.
+    Equipos sin escaneos en la ventana quedan con uso 0.
+    """
+    uso = uso_equipos.assign(id_equipamiento=uso_equipos['id_equipamiento'].astype(str))
+    if equipos_base is None:
+        equipos_base = pd.DataFrame({
+            'equipo_id': uso['id_equipamiento'].to_numpy(),
+            'nombre': ('Equipo_' + uso['id_equipamiento']).to_numpy(),
+            'categoria': 'General',
+            'estado': 'Operativo',
+            'ultima_revision': None
+        })
+
+    equipos = equipos_base.assign(id_equipamiento=equipos_base['equipo_id'].astype(str))
+    equipos = equipos.merge(uso, how='left', on='id_equipamiento').drop(columns='id_equipamiento')
+    metricas = ['uso_diario_promedio', 'tiempo_promedio_minutos', 'utilizacion_porcentaje', 'socios_unicos_promedio']
+    equipos[metricas] = equipos[metricas].fillna(0)
+    equipos['popularidad_score'] = equipos['uso_diario_promedio'] * 0.8 + equipos['socios_unicos_promedio'] * 0.2
+    return equipos
+
+def simular_uso_equipos(equipos_base=None):
     """Simula datos de uso de equipos basado en análisis EDA"""
+    if equipos_base is not None:
+        # Equipos reales del snapshot: solo se simulan las métricas de uso
+        n = len(equipos_base)
+        uso_diario = np.random.randint(15, 50, size=n)
+        tiempo_promedio = np.random.randint(20, 45, size=n)
+        return equipos_base.assign(
+            uso_diario_promedio=uso_diario,
+            tiempo_promedio_minutos=tiempo_promedio,
+            utilizacion_porcentaje=np.minimum(95, uso_diario * tiempo_promedio / 8),  # 8 horas operativas
+            popularidad_score=uso_diario * 0.8 + np.random.randint(0, 10, size=n)
+        )
+
     categorias = {
         'Cardio': ['Cinta', 'Elíptica', 'Bicicleta_Estática', 'Remo'],
         'Fuerza': ['Press_Banca', 'Sentadillas', 'Peso_Muerto', 'Dominadas'],
@@ -172,55 +199,52 @@ def crear_ranking_equipos(equipos_df):
     ranking = equipos_df.sort_values('popularidad_score', ascending=False).head(10)
     
     return {
-        "top_10_equipos": [
-            {
-                "posicion": i + 1,
-                "nombre": equipo['nombre'],
-                "categoria": equipo['categoria'],
-                "uso_diario": int(equipo['uso_diario_promedio']),
-                "tiempo_promedio": int(equipo['tiempo_promedio_minutos']),
-                "utilizacion": float(equipo['utilizacion_porcentaje']),
-                "popularidad": float(equipo['popularidad_score'])
-            }
-            for i, (_, equipo) in enumerate(ranking.iterrows())
-        ],
+        "top_10_equipos": registros({
+            "posicion": list(range(1, len(ranking) + 1)),
+            "nombre": columna_json(ranking['nombre']),
+            "categoria": columna_json(ranking['categoria']),
+            "uso_diario": columna_json(ranking['uso_diario_promedio'], 'int'),
+            "tiempo_promedio": columna_json(ranking['tiempo_promedio_minutos'], 'int'),
+            "utilizacion": columna_json(ranking['utilizacion_porcentaje'], 'float'),
+            "popularidad": columna_json(ranking['popularidad_score'], 'float')
+        }),
         "categoria_mas_popular": equipos_df.groupby('categoria')['popularidad_score'].sum().idxmax(),
         "utilizacion_promedio_general": float(equipos_df['utilizacion_porcentaje'].mean())
     }
 
-def crear_clusters_equipos(equipos_df):
-    """Crea clusters de equipos basado en uso y características"""
+def crear_clusters_equipos(equipos_df, modo=None):
+    """
+    Crea clusters de equipos basado en uso y características.
+
+    En modo "incremental" (por defecto, ver CLUSTERING_MODO) el scaler y los centroides
+    se persisten y solo se actualizan con partial_fit cuando cambian los datos; en modo
+    "completo" se reentrena KMeans en cada llamada. En ambos casos las etiquetas se
+    asignan ordenando los centroides por uso diario, no por id de cluster.
+    """
     try:
-        from sklearn.cluster import KMeans
-        from sklearn.preprocessing import StandardScaler
-        
-        # Preparar datos para clustering
-        features = equipos_df[['uso_diario_promedio', 'tiempo_promedio_minutos', 'utilizacion_porcentaje']].fillna(0)
+        from models.clustering_incremental import (
+            CLUSTERING_MODO, FEATURES_EQUIPOS, ETIQUETAS_EQUIPOS, clusterizar
+        )
         
-        # Normalizar datos
-        scaler = StandardScaler()
-        features_scaled = scaler.fit_transform(features)
-        
-        # Aplicar K-means
-        kmeans = KMeans(n_clusters=3, random_state=42)
-        equipos_df['cluster'] = kmeans.fit_predict(features_scaled)
-        
-        # Interpretar clusters
-        cluster_interpretacion = {
-            0: "Alto_Uso",
-            1: "Uso_Moderado", 
-            2: "Bajo_Uso"
-        }
+        modo = modo or CLUSTERING_MODO
+        if modo == "incremental":
+            etiquetas, modelo = clusterizar(equipos_df, 'equipos', FEATURES_EQUIPOS, ETIQUETAS_EQUIPOS)
+            muestras_vistas = modelo.muestras_vistas
+        else:
+            etiquetas = _clusterizar_completo(equipos_df, FEATURES_EQUIPOS, ETIQUETAS_EQUIPOS)
+            muestras_vistas = int(len(equipos_df))
+        equipos_df = equipos_df.assign(cluster=etiquetas)
         
         clusters_result = {}
-        for cluster_id in range(3):
-            cluster_equipos = equipos_df[equipos_df['cluster'] == cluster_id]
-            clusters_result[cluster_interpretacion[cluster_id]] = {
+        for etiqueta in ETIQUETAS_EQUIPOS:
+            cluster_equipos = equipos_df[equipos_df['cluster'].to_numpy() == etiqueta]
+            clusters_result[etiqueta] = {
                 "cantidad_equipos": int(len(cluster_equipos)),
-                "uso_promedio": float(cluster_equipos['uso_diario_promedio'].mean()),
-                "utilizacion_promedio": float(cluster_equipos['utilizacion_porcentaje'].mean()),
+                "uso_promedio": float(cluster_equipos['uso_diario_promedio'].mean()) if len(cluster_equipos) else 0.0,
+                "utilizacion_promedio": float(cluster_equipos['utilizacion_porcentaje'].mean()) if len(cluster_equipos) else 0.0,
                 "equipos_principales": cluster_equipos['nombre'].head(5).tolist()
             }
+        clusters_result["modelo"] = {"modo": modo, "muestras_vistas": int(muestras_vistas)}
         
         return clusters_result
         
@@ -242,6 +266,22 @@ def crear_clusters_equipos(equipos_df):
             }
         }
 
+def _clusterizar_completo(equipos_df, features, etiquetas):
+    """KMeans desde cero; las etiquetas se asignan por orden de centroides (mayor uso primero)"""
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import StandardScaler
+    
+    scaler = StandardScaler()
+    features_scaled = scaler.fit_transform(equipos_df[features].fillna(0))
+    kmeans = KMeans(n_clusters=len(etiquetas), random_state=42, n_init=10)
+    clusters = kmeans.fit_predict(features_scaled)
+    
+    centros = scaler.inverse_transform(kmeans.cluster_centers_)
+    orden = np.argsort(-centros[:, 0], kind='stable')
+    mapa = np.empty(len(etiquetas), dtype=object)
+    mapa[orden] = etiquetas
+    return mapa[clusters]
+
 def analizar_mantenimiento(equipos_df):
     """Analiza necesidades de mantenimiento"""
     # Equipos que necesitan mantenimiento
@@ -259,14 +299,11 @@ def analizar_mantenimiento(equipos_df):
     return {
         "equipos_requieren_mantenimiento": int(len(necesitan_mantenimiento)),
         "porcentaje_operativos": float((len(equipos_df[equipos_df['estado'] == 'Operativo']) / len(equipos_df)) * 100),
-        "prioridad_alta": [
-            {
-                "equipo": equipo['nombre'],
-                "categoria": equipo['categoria'],
-                "utilizacion": float(equipo['utilizacion_porcentaje']),
-                "prioridad_score": float(equipo['prioridad_mantenimiento'])
-            }
-            for _, equipo in alta_prioridad.iterrows()
-        ],
+        "prioridad_alta": registros({
+            "equipo": columna_json(alta_prioridad['nombre']),
+            "categoria": columna_json(alta_prioridad['categoria']),
+            "utilizacion": columna_json(alta_prioridad['utilizacion_porcentaje'], 'float'),
+            "prioridad_score": columna_json(alta_prioridad['prioridad_mantenimiento'], 'float')
+        }),
         "recomendacion_mantenimiento": "Mantenimiento preventivo cada 30 días para equipos de alta utilización"
     }
\ No newline at end of file
@@ -0,0 +1,267 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Ajustar sys.path para importar desde la carpeta ia
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.logs import obtener_logger
+
+logger = obtener_logger(__name__)
+
+# Scaler y centroides persistidos junto al resto de los modelos del proyecto
+MODELOS_DIR = os.path.join(PROJECT_ROOT, 'ia', 'data_science', 'Models')
+
+# "incremental" (MiniBatchKMeans + partial_fit) o "completo" (KMeans desde cero en cada request)
+CLUSTERING_MODO = os.environ.get("CLUSTERING_MODO", "incremental")
+TAMANIO_LOTE = int(os.environ.get("CLUSTERING_TAMANIO_LOTE", 10000))
+
+FEATURES_EQUIPOS = ['uso_diario_promedio', 'tiempo_promedio_minutos', 'utilizacion_porcentaje']
+ETIQUETAS_EQUIPOS = ["Alto_Uso", "Uso_Moderado", "Bajo_Uso"]
+
+
+class ClusteringIncremental:
+    """
+    StandardScaler + MiniBatchKMeans entrenados con partial_fit y persistidos con joblib.
+
+    Las etiquetas no dependen del id interno del cluster: los centroides se ordenan
+    (en unidades originales) de mayor a menor según `feature_orden` y la i-ésima
+    etiqueta corresponde al i-ésimo centroide. Así "Alto_Uso" sigue siendo el
+    cluster de mayor uso aunque KMeans renumere los clusters.
+    """
+
+    def __init__(self, nombre, features, etiquetas, feature_orden=None, random_state=42):
+        self.nombre = nombre
+        self.features = list(features)
+        self.etiquetas = list(etiquetas)
+        self.feature_orden = feature_orden or self.features[0]
+        self.random_state = random_state
+        self.scaler = None
+        self.kmeans = None
+        self.muestras_vistas = 0
+        self.ultimo_lote = None
+        self.actualizado_en = None
+
+    @property
+    def n_clusters(self):
+        return len(self.etiquetas)
+
+    @property
+    def entrenado(self):
+        return self.kmeans is not None and hasattr(self.kmeans, 'cluster_centers_')
+
+    @property
+    def ruta(self):
+        return _ruta_modelo(self.nombre)
+
+    def actualizar(self, df, tamanio_lote=TAMANIO_LOTE):
+        """
+        Ajusta scaler y centroides con partial_fit recorriendo `df` en lotes.
+        Si los datos son los mismos que el último lote (misma huella) no se vuelve a
+        entrenar, para que repetir el request no sesgue los centroides hacia ellos.
+
+        Returns:
+            bool: True si el modelo cambió.
+        """
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.preprocessing import StandardScaler
+
+        X = self._matriz(df)
+        huella = _huella(X)
+        if len(X) < self.n_clusters or huella == self.ultimo_lote:
+            return False
+
+        if self.scaler is None:
+            self.scaler = StandardScaler()
+            self.kmeans = MiniBatchKMeans(n_clusters=self.n_clusters, random_state=self.random_state)
+
+        # El scaler se ajusta solo en el primer entrenamiento (antes que los centroides,
+        # para que todos los lotes se escalen igual) y después queda fijo: moverlo
+        # reinterpretaría los centroides aprendidos en otro espacio
+        if not self.entrenado:
+            for inicio in range(0, len(X), tamanio_lote):
+                self.scaler.partial_fit(X[inicio:inicio + tamanio_lote])
+        for inicio in range(0, len(X), tamanio_lote):
+            lote = X[inicio:inicio + tamanio_lote]
+            # MiniBatchKMeans necesita al menos n_clusters filas en el primer partial_fit
+            if len(lote) >= self.n_clusters or self.entrenado:
+                self.kmeans.partial_fit(self.scaler.transform(lote))
+
+        self.muestras_vistas += len(X)
+        self.ultimo_lote = huella
+        self.actualizado_en = datetime.now().isoformat()
+        return True
+
+    def asignar(self, df, tamanio_lote=TAMANIO_LOTE):
+        """Devuelve la etiqueta de cada fila, prediciendo por lotes"""
+        X = self._matriz(df)
+        if not self.entrenado:
+            return self._asignar_por_rango(X)
+        mapa = np.asarray(self.etiquetas, dtype=object)[self._rango_centroides()]
+        clusters = np.empty(len(X), dtype=np.int64)
+        for inicio in range(0, len(X), tamanio_lote):
+            clusters[inicio:inicio + tamanio_lote] = self.kmeans.predict(
+                self.scaler.transform(X[inicio:inicio + tamanio_lote])
+            )
+        return mapa[clusters]
+
+    def centroides(self):
+        """Centroides en unidades originales, indexados por etiqueta"""
+        centros = self.scaler.inverse_transform(self.kmeans.cluster_centers_)
+        etiquetas = np.asarray(self.etiquetas, dtype=object)[self._rango_centroides()]
+        return pd.DataFrame(centros, columns=self.features, index=etiquetas).loc[self.etiquetas]
+
+    def guardar(self):
+        """Persiste el modelo de forma atómica (se escribe a un temporal y se renombra)"""
+        import joblib
+
+        os.makedirs(MODELOS_DIR, exist_ok=True)
+        temporal = f"{self.ruta}.{os.getpid()}.tmp"
+        joblib.dump(self, temporal)
+        os.replace(temporal, self.ruta)
+
+    def _rango_centroides(self):
+        """Posición de cada cluster al ordenar los centroides de mayor a menor según feature_orden"""
+        centros = self.scaler.inverse_transform(self.kmeans.cluster_centers_)
+        orden = np.argsort(-centros[:, self.features.index(self.feature_orden)], kind='stable')
+        rango = np.empty(self.n_clusters, dtype=np.int64)
+        rango[orden] = np.arange(self.n_clusters)
+        return rango
+
+    def _asignar_por_rango(self, X):
+        """
+        Sin modelo entrenado (menos filas que clusters): reparte las filas en
+        n_clusters grupos de tamaño parejo ordenándolas de mayor a menor según feature_orden
+        """
+        orden = np.argsort(-X[:, self.features.index(self.feature_orden)], kind='stable')
+        grupos = np.empty(len(X), dtype=np.int64)
+        grupos[orden] = np.arange(len(X)) * self.n_clusters // max(len(X), 1)
+        return np.asarray(self.etiquetas, dtype=object)[grupos]
+
+    def _matriz(self, df):
+        return df[self.features].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=float)
+
+
+_modelos = {}
+# mtime del archivo del que salió cada modelo en memoria
+_mtimes = {}
+_modelos_lock = threading.Lock()
+
+
+def obtener_modelo(nombre, features, etiquetas, feature_orden=None):
+    """
+    Devuelve el modelo en memoria, o lo carga desde disco la primera vez y
+    cada vez que otro worker guardó una versión más nueva (mtime del archivo).
+    Si las features/etiquetas persistidas no coinciden se empieza un modelo nuevo.
+    """
+    with _modelos_lock:
+        return _modelo_vigente(nombre, features, etiquetas, feature_orden)
+
+
+def _ruta_modelo(nombre):
+    return os.path.join(MODELOS_DIR, f"clustering_{nombre}.joblib")
+
+
+def _mtime(ruta):
+    try:
+        return os.path.getmtime(ruta)
+    except OSError:
+        return 0.0
+
+
+def _modelo_vigente(nombre, features, etiquetas, feature_orden=None):
+    """Igual que obtener_modelo, con _modelos_lock ya tomado"""
+    modelo = _modelos.get(nombre)
+    mtime = _mtime(_ruta_modelo(nombre))
+    if modelo is None or mtime > _mtimes.get(nombre, 0.0):
+        cargado = _cargar_modelo(nombre)
+        if cargado is not None and cargado.features == list(features) and cargado.etiquetas == list(etiquetas):
+            modelo = cargado
+        elif modelo is None:
+            modelo = ClusteringIncremental(nombre, features, etiquetas, feature_orden)
+        _modelos[nombre] = modelo
+        _mtimes[nombre] = mtime
+    return modelo
+
+
+def _cargar_modelo(nombre):
+    ruta = _ruta_modelo(nombre)
+    if not os.path.exists(ruta):
+        return None
+    try:
+        import joblib
+        return joblib.load(ruta)
+    except Exception as e:
+        logger.warning("Error cargando modelo de clustering", extra={"modelo": nombre, "error": e})
+        return None
+
+
+@contextmanager
+def _bloqueo_archivo(nombre):
+    """flock sobre <modelo>.joblib.lock: un solo proceso a la vez recarga, entrena y guarda"""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(MODELOS_DIR, exist_ok=True)
+    with open(f"{_ruta_modelo(nombre)}.lock", "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _entrenar_y_asignar(df, nombre, features, etiquetas, feature_orden=None, tamanio_lote=TAMANIO_LOTE):
+    """
+    Con el bloqueo de archivo tomado: recarga la última versión guardada por
+    cualquier worker, la actualiza con df y la guarda; así ningún worker pisa
+    los centroides de otro con una versión vieja.
+    """
+    with _modelos_lock:
+        with _bloqueo_archivo(nombre):
+            modelo = _modelo_vigente(nombre, features, etiquetas, feature_orden)
+            if modelo.actualizar(df, tamanio_lote=tamanio_lote):
+                try:
+                    modelo.guardar()
+                    _mtimes[nombre] = _mtime(modelo.ruta)
+                except Exception as e:
+                    logger.warning("Error guardando modelo de clustering", extra={"modelo": nombre, "error": e})
+        return modelo.asignar(df, tamanio_lote=tamanio_lote), modelo
+
+
+def clusterizar(df, nombre, features, etiquetas, feature_orden=None):
+    """
+    Actualiza (si hay datos nuevos) y aplica el modelo incremental `nombre` sobre df.
+
+    Returns:
+        tuple: (etiquetas por fila como np.ndarray, modelo)
+    """
+    return _entrenar_y_asignar(df, nombre, features, etiquetas, feature_orden)
+
+
+def segmentar_socios(socios_df, features, etiquetas, feature_orden=None, tamanio_lote=TAMANIO_LOTE):
+    """
+    Segmentación a nivel socio (miles a millones de filas). Entrena y predice por lotes
+    de `tamanio_lote`, sin tener toda la matriz escalada en memoria ni reentrenar desde cero.
+
+    Returns:
+        pd.DataFrame: socios_df con la columna 'segmento'.
+    """
+    segmentos, _ = _entrenar_y_asignar(socios_df, 'socios', features, etiquetas, feature_orden, tamanio_lote)
+    return socios_df.assign(segmento=segmentos)
+
+
+def _huella(X):
+    return hashlib.sha256(np.ascontiguousarray(X).tobytes()).hexdigest()[:16]
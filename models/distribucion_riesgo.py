@@ -0,0 +1,173 @@
+import numpy as np
+import sys
+import os
+import threading
+from datetime import datetime
+
+# Ajustar sys.path para importar desde la raíz del proyecto
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.metricas import medir_etapa, registrar_cache
+
+# Cortes históricos de prediccion_asistencia: bajo <= 0.4 < medio <= 0.7 < alto
+CORTES_DEFECTO = (0.4, 0.7)
+NIVELES_DEFECTO = ("bajo_riesgo", "medio_riesgo", "alto_riesgo")
+BINS_DEFECTO = 10
+CUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+# Scores ordenados por (posición del gimnasio, posición del segmento) en la población;
+# se descartan al cambiar la población o el día. Las claves son posiciones validadas
+# (no el texto del query), así que hay como mucho (gimnasios + 1) x (segmentos + 1)
+_ordenados = {}
+_ordenados_clave = None
+_riesgo = None
+_ordenados_lock = threading.Lock()
+# prob_churn del modelo ordenada, por versión de la población (prediccion_asistencia)
+_prob_churn = None
+_prob_churn_clave = None
+
+# Clave de los filtros por un gimnasio/segmento que no existe: todos seleccionan vacío
+NO_ENCONTRADO = -1
+
+
+def contar_por_cortes(ordenados, cortes) -> np.ndarray:
+    """
+    Cantidad de valores en cada tramo (-inf, c1], (c1, c2], ..., (ck, inf) de un
+    array ordenado: un searchsorted por corte, O(k log n).
+    """
+    posiciones = np.searchsorted(ordenados, np.asarray(cortes, dtype=float), side='right')
+    return np.diff(np.concatenate(([0], posiciones, [len(ordenados)])))
+
+
+def _etiqueta(desde, hasta):
+    if desde is None:
+        return f"<= {hasta:g}"
+    if hasta is None:
+        return f"> {desde:g}"
+    return f"{desde:g} - {hasta:g}"
+
+
+def describir_distribucion(ordenados, cortes=CORTES_DEFECTO, bins=BINS_DEFECTO) -> dict:
+    """Tramos por cortes, histograma de `bins` tramos iguales en [0, 1] y cuantiles de un array ordenado"""
+    total = len(ordenados)
+    cortes = [float(c) for c in cortes]
+
+    def porcentaje(cantidad):
+        return round(cantidad / total * 100, 2) if total else 0
+
+    limites = [None, *cortes, None]
+    tramos = [
+        {"tramo": _etiqueta(desde, hasta), "desde": desde, "hasta": hasta,
+         "cantidad": int(cantidad), "porcentaje": porcentaje(cantidad)}
+        for desde, hasta, cantidad in zip(limites[:-1], limites[1:], contar_por_cortes(ordenados, cortes))
+    ]
+
+    bordes = np.linspace(0, 1, bins + 1)
+    histograma = [
+        {"desde": round(float(desde), 4), "hasta": round(float(hasta), 4), "cantidad": int(cantidad)}
+        for desde, hasta, cantidad in zip(bordes[:-1], bordes[1:], contar_por_cortes(ordenados, bordes[1:-1]))
+    ]
+
+    resultado = {
+        "total_socios_analizados": int(total),
+        "tramos": tramos,
+        "histograma": histograma,
+        # Cuantil por rango (posición en el array ordenado): O(1)
+        "cuantiles": {
+            f"p{int(q * 100)}": round(float(ordenados[int(q * (total - 1))]), 4) if total else None
+            for q in CUANTILES
+        }
+    }
+    if tuple(cortes) == CORTES_DEFECTO:
+        for nivel, tramo in zip(NIVELES_DEFECTO, tramos):
+            resultado[nivel] = tramo["cantidad"]
+            resultado[f"porcentaje_{nivel}"] = tramo["porcentaje"]
+    return resultado
+
+
+def obtener_ordenados(poblacion, hoy, gimnasio=None, segmento=None) -> np.ndarray:
+    """Scores de riesgo ordenados del gimnasio/segmento; se ordenan una vez por población y día"""
+    from models.ranking_inactivos import calcular_riesgo, filtrar
+
+    global _ordenados, _ordenados_clave, _riesgo
+
+    clave = (_clave_filtro(poblacion["gimnasios"], gimnasio), _clave_filtro(poblacion["segmentos"], segmento))
+    with _ordenados_lock:
+        if _ordenados_clave != (poblacion["version"], hoy):
+            _ordenados = {}
+            _riesgo = calcular_riesgo(poblacion, hoy)[1]
+            _ordenados_clave = (poblacion["version"], hoy)
+        ordenados = _ordenados.get(clave)
+        registrar_cache("distribucion_riesgo", ordenados is not None)
+        if ordenados is None:
+            ordenados = _ordenados[clave] = np.sort(_riesgo[filtrar(poblacion, gimnasio, segmento)])
+    return ordenados
+
+
+def _clave_filtro(nombres, valor):
+    """None (sin filtro), la posición del nombre o NO_ENCONTRADO"""
+    from models.ranking_inactivos import _posicion
+
+    if valor is None:
+        return None
+    posicion = _posicion(nombres, valor)
+    return NO_ENCONTRADO if posicion is None else posicion
+
+
+def obtener_prob_churn_ordenada(poblacion) -> np.ndarray:
+    """prob_churn de los socios que evaluó el modelo, ordenada una vez por versión de la población"""
+    global _prob_churn, _prob_churn_clave
+
+    with _ordenados_lock:
+        vigente = _prob_churn_clave == poblacion["version"]
+        registrar_cache("distribucion_riesgo", vigente)
+        if not vigente:
+            prob_churn = poblacion["prob_churn"]
+            _prob_churn = np.sort(prob_churn[~np.isnan(prob_churn)])
+            _prob_churn_clave = poblacion["version"]
+        return _prob_churn
+
+
+def run(cortes=CORTES_DEFECTO, gimnasio=None, segmento=None, bins=BINS_DEFECTO, hoy=None):
+    """
+    Distribución del riesgo de churn con cortes arbitrarios, histograma y cuantiles.
+
+    El riesgo es el de ranking_inactivos (prob_churn del modelo o estimado por
+    inactividad). Cada gimnasio/segmento guarda sus scores ordenados, así que
+    cualquier juego de cortes se responde con searchsorted sin recorrer los socios.
+    """
+    try:
+        from utils.indice_asistencia import obtener_indice
+        from models.ranking_inactivos import cargar_poblacion
+
+        cortes = sorted(set(float(c) for c in cortes))
+        if any(c < 0 or c > 1 for c in cortes):
+            raise ValueError("Los cortes deben estar entre 0 y 1")
+
+        hoy = str(hoy or datetime.now().date())
+        with medir_etapa("distribucion_riesgo", "poblacion"):
+            indice = obtener_indice()
+            poblacion = cargar_poblacion(indice)
+        with medir_etapa("distribucion_riesgo", "ordenar"):
+            ordenados = obtener_ordenados(poblacion, hoy, gimnasio, segmento)
+        with medir_etapa("distribucion_riesgo", "consulta"):
+            distribucion = describir_distribucion(ordenados, cortes, bins)
+
+        return {
+            "status": "success",
+            "timestamp": datetime.now().isoformat(),
+            "mensaje": "Distribución del riesgo de abandono",
+            "datos_fuente": indice.fuente,
+            "cortes": cortes,
+            "filtros": {"gimnasio": gimnasio, "segmento": segmento},
+            **distribucion
+        }
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error calculando distribución de riesgo: {str(e)}",
+            "timestamp": datetime.now().isoformat()
+        }
@@ -0,0 +1,282 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Ajustar sys.path para importar desde la carpeta ia
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.metricas import medir_etapa
+
+ESTADO_BUENO = '🟢 Bueno'
+ESTADO_ATENCION = '🟡 Atención'
+ESTADO_CRITICO = '🔴 Crítico'
+
+# Costo anual de mantenimiento / valor de reposición a partir del cual conviene reemplazar
+UMBRAL_REEMPLAZO = 0.5
+
+
+def run():
+    """
+    Ejecuta el análisis completo de equipamiento (semáforo, costo-beneficio y
+    ranking de fallos) con una única extracción de equipamiento y mantenimiento
+    """
+    try:
+        datos = cargar_datos_equipamiento()
+        hoy = datetime.now()
+
+        resultados = {
+            "status": "success",
+            "timestamp": hoy.isoformat(),
+            "mensaje": "Análisis de estado y costo-beneficio de equipamiento",
+            "datos_fuente": datos["fuente"]
+        }
+        resultados["estado_actual"] = resumir_estado(
+            calcular_estado_semaforo(datos["equipos"], datos["mantenimientos"], hoy)
+        )
+        resultados["costo_beneficio"] = resumir_costo_beneficio(
+            calcular_costo_beneficio(datos["equipos"], datos["mantenimientos"], hoy)
+        )
+        resultados["ranking_fallos"] = resumir_ranking_fallos(
+            calcular_ranking_fallos(datos["equipos"], datos["mantenimientos"])
+        )
+        return resultados
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error en análisis de equipamiento: {str(e)}",
+            "timestamp": datetime.now().isoformat()
+        }
+
+
+def run_estado_actual():
+    """Semáforo de estado de cada equipo"""
+    try:
+        datos = cargar_datos_equipamiento()
+        hoy = datetime.now()
+        with medir_etapa("equipamiento", "semaforo"):
+            estado_df = calcular_estado_semaforo(datos["equipos"], datos["mantenimientos"], hoy)
+
+        with medir_etapa("equipamiento", "serializacion"):
+            resultados = resumir_estado(estado_df)
+        resultados.update({
+            "status": "success",
+            "timestamp": hoy.isoformat(),
+            "datos_fuente": datos["fuente"]
+        })
+        return resultados
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error calculando estado de equipamiento: {str(e)}",
+            "timestamp": datetime.now().isoformat()
+        }
+
+
+def run_costo_beneficio():
+    """Relación costo de mantenimiento / valor de reposición de cada equipo"""
+    try:
+        datos = cargar_datos_equipamiento()
+        hoy = datetime.now()
+        with medir_etapa("equipamiento", "costo_beneficio"):
+            costo_df = calcular_costo_beneficio(datos["equipos"], datos["mantenimientos"], hoy)
+
+        with medir_etapa("equipamiento", "serializacion"):
+            resultados = resumir_costo_beneficio(costo_df)
+        resultados.update({
+            "status": "success",
+            "timestamp": hoy.isoformat(),
+            "datos_fuente": datos["fuente"]
+        })
+        return resultados
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error calculando costo-beneficio de equipamiento: {str(e)}",
+            "timestamp": datetime.now().isoformat()
+        }
+
+
+def run_ranking_fallos():
+    """Ranking de equipos por cantidad de mantenimientos correctivos"""
+    try:
+        datos = cargar_datos_equipamiento()
+        with medir_etapa("equipamiento", "ranking_fallos"):
+            ranking_df = calcular_ranking_fallos(datos["equipos"], datos["mantenimientos"])
+
+        with medir_etapa("equipamiento", "serializacion"):
+            resultados = resumir_ranking_fallos(ranking_df)
+        resultados.update({
+            "status": "success",
+            "timestamp": datetime.now().isoformat(),
+            "datos_fuente": datos["fuente"]
+        })
+        return resultados
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error calculando ranking de fallos: {str(e)}",
+            "timestamp": datetime.now().isoformat()
+        }
+
+
+def cargar_datos_equipamiento(forzar=False):
+    """
+    Devuelve el snapshot compartido de equipamiento y mantenimiento (fechas ya normalizadas),
+    para que todos los análisis trabajen sobre la misma extracción
+    """
+    from utils.snapshot_equipamiento import obtener_snapshot
+    with medir_etapa("equipamiento", "carga_snapshot"):
+        return obtener_snapshot(forzar=forzar)
+
+
+def calcular_estado_semaforo(df_equipos, df_mantenimientos, hoy=None):
+    """
+    Clasifica cada equipo en 🟢/🟡/🔴 con los criterios de equipamiento_estado_semaforos.py:
+
+    - 🔴 Crítico: sin revisión, última revisión hace más de 6 meses, próxima revisión
+      vencida o 2+ mantenimientos en los últimos 3 meses.
+    - 🟡 Atención: última revisión hace 3-6 meses o próxima revisión dentro de 30 días.
+    - 🟢 Bueno: el resto.
+    """
+    hoy = pd.Timestamp(hoy or datetime.now())
+
+    recientes = df_mantenimientos[df_mantenimientos['fecha_mantenimiento'] >= hoy - timedelta(days=90)]
+    resumen = recientes.groupby('id_equipamiento').agg(
+        mantenimientos_ultimos_3m=('id', 'count'),
+        costo_ultimos_3m=('costo', 'sum')
+    )
+
+    df_estado = df_equipos.merge(resumen, how='left', left_on='id', right_index=True)
+    df_estado['mantenimientos_ultimos_3m'] = df_estado['mantenimientos_ultimos_3m'].fillna(0).astype(int)
+    df_estado['costo_ultimos_3m'] = df_estado['costo_ultimos_3m'].fillna(0)
+
+    meses_desde_revision = (hoy - df_estado['ultima_revision']).dt.days.to_numpy(dtype=float) / 30
+    dias_proxima_revision = (df_estado['proxima_revision'] - hoy).dt.days.fillna(-1).to_numpy()
+    mantenimientos_3m = df_estado['mantenimientos_ultimos_3m'].to_numpy()
+
+    # NaN en meses_desde_revision compara False; el caso sin revisión se cubre explícitamente
+    critico = (
+        df_estado['ultima_revision'].isna().to_numpy()
+        | (meses_desde_revision > 6)
+        | (dias_proxima_revision < 0)
+        | (mantenimientos_3m >= 2)
+    )
+    atencion = (
+        ((meses_desde_revision >= 3) & (meses_desde_revision <= 6))
+        | ((dias_proxima_revision >= 0) & (dias_proxima_revision <= 30))
+    )
+    df_estado['estado_semaforo'] = np.select([critico, atencion], [ESTADO_CRITICO, ESTADO_ATENCION], default=ESTADO_BUENO)
+
+    return df_estado[[
+        'id', 'nombre', 'ultima_revision', 'proxima_revision',
+        'mantenimientos_ultimos_3m', 'costo_ultimos_3m', 'estado_semaforo'
+    ]]
+
+
+def calcular_costo_beneficio(df_equipos, df_mantenimientos, hoy=None):
+    """
+    Calcula antigüedad, costo total y promedio anual de mantenimiento y la relación
+    costo anual / valor de reposición de cada equipo
+    """
+    hoy = pd.Timestamp(hoy or datetime.now())
+
+    costo_total = df_mantenimientos.groupby('id_equipamiento')['costo'].sum().rename('costo_total_mantenimiento')
+    df_estado = df_equipos.merge(costo_total, how='left', left_on='id', right_index=True)
+    df_estado['costo_total_mantenimiento'] = df_estado['costo_total_mantenimiento'].fillna(0)
+
+    antiguedad = ((hoy - df_estado['fecha_adquisicion']).dt.days / 365).fillna(0).to_numpy()
+    costo = df_estado['costo_total_mantenimiento'].to_numpy(dtype=float)
+    valor_reposicion = df_estado['valor_reposicion'].to_numpy(dtype=float)
+
+    costo_promedio_anual = np.divide(costo, antiguedad, out=np.zeros_like(costo), where=antiguedad > 0)
+    ratio = np.divide(
+        costo_promedio_anual, valor_reposicion,
+        out=np.zeros_like(costo_promedio_anual), where=valor_reposicion > 0
+    )
+
+    df_estado['antiguedad_anios'] = antiguedad
+    df_estado['costo_promedio_anual'] = costo_promedio_anual
+    df_estado['costo_beneficio_ratio'] = ratio
+
+    return df_estado[[
+        'id', 'nombre', 'fecha_adquisicion', 'antiguedad_anios',
+        'costo_total_mantenimiento', 'costo_promedio_anual',
+        'valor_reposicion', 'costo_beneficio_ratio'
+    ]]
+
+
+def calcular_ranking_fallos(df_equipos, df_mantenimientos):
+    """
+    Cuenta cada mantenimiento "correctivo" como un fallo y rankea los equipos
+    por cantidad de fallos (ranking denso, descendente)
+    """
+    correctivos = df_mantenimientos[df_mantenimientos['tipo_mantenimiento'].to_numpy() == 'correctivo']
+    fallos = correctivos.groupby('id_equipamiento').agg(
+        total_fallos=('id', 'count'),
+        costo_total=('costo', 'sum')
+    ).reset_index()
+
+    fallos = fallos.merge(df_equipos[['id', 'nombre']], how='left', left_on='id_equipamiento', right_on='id')
+    fallos['ranking'] = fallos['total_fallos'].rank(method='dense', ascending=False).astype(int)
+
+    return fallos.sort_values(by='ranking')[[
+        'id_equipamiento', 'nombre', 'total_fallos', 'costo_total', 'ranking'
+    ]]
+
+
+def resumir_estado(estado_df):
+    """Arma la respuesta JSON del semáforo"""
+    conteo = estado_df['estado_semaforo'].value_counts()
+    criticos = int(conteo.get(ESTADO_CRITICO, 0))
+
+    return {
+        "total_equipos": int(len(estado_df)),
+        "resumen_semaforo": {
+            "bueno": int(conteo.get(ESTADO_BUENO, 0)),
+            "atencion": int(conteo.get(ESTADO_ATENCION, 0)),
+            "critico": criticos
+        },
+        "estado_general": "requiere_atencion" if criticos > 0 else "operativo",
+        "equipos": _registros(estado_df.sort_values('estado_semaforo'))
+    }
+
+
+def resumir_costo_beneficio(costo_df):
+    """Arma la respuesta JSON de costo-beneficio con la recomendación por equipo"""
+    costo_df = costo_df.assign(
+        costo_mantenimiento_mensual=costo_df['costo_promedio_anual'] / 12,
+        recomendacion=np.where(costo_df['costo_beneficio_ratio'] > UMBRAL_REEMPLAZO, 'reemplazar', 'mantener')
+    ).sort_values('costo_beneficio_ratio', ascending=False)
+
+    reemplazar = costo_df['recomendacion'].to_numpy() == 'reemplazar'
+    return {
+        "total_equipos": int(len(costo_df)),
+        "umbral_reemplazo": UMBRAL_REEMPLAZO,
+        "equipos_alto_costo": _registros(costo_df.head(10)),
+        "ahorro_potencial_anual": round(float(costo_df['costo_promedio_anual'].to_numpy()[reemplazar].sum()), 2),
+        "inversion_recomendada": round(float(costo_df['valor_reposicion'].to_numpy()[reemplazar].sum()), 2)
+    }
+
+
+def resumir_ranking_fallos(ranking_df, top=10):
+    """Arma la respuesta JSON del ranking de fallos"""
+    return {
+        "equipos_con_fallos": int(len(ranking_df)),
+        "total_fallos": int(ranking_df['total_fallos'].sum()),
+        "costo_total_fallos": round(float(ranking_df['costo_total'].sum()), 2),
+        "ranking": _registros(ranking_df.head(top))
+    }
+
+
+def _registros(df):
+    """Convierte un DataFrame a lista de dicts JSON-safe (fechas ISO, NaN → None)"""
+    from utils.serializacion import registros_df
+    return registros_df(df)
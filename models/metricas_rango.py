@@ -0,0 +1,90 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+from datetime import datetime
+
+# Ajustar sys.path para importar desde la raíz del proyecto
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.metricas import medir_etapa
+
+DIAS_DEFECTO = 30
+
+
+def _a_dia(fecha) -> int:
+    return int(pd.Timestamp(fecha).to_datetime64().astype('datetime64[D]').astype(np.int64))
+
+
+def _a_fecha(dia) -> str:
+    return str(np.datetime64(int(dia), 'D'))
+
+
+def _redondear(valor):
+    return round(float(valor), 2)
+
+
+def run(desde=None, hasta=None, granularidad="dia", gimnasio=None, dias_defecto=DIAS_DEFECTO):
+    """
+    Totales, promedios y serie por día/semana/mes de asistencias, pagos e
+    ingresos en [desde, hasta] (por defecto los últimos `dias_defecto` días),
+    leídos de las sumas acumuladas de utils/series_diarias.py.
+    """
+    try:
+        from utils.indice_asistencia import obtener_indice
+        from utils.series_diarias import obtener_series, tramos
+
+        dia_hasta = _a_dia(hasta or datetime.now().date())
+        dia_desde = _a_dia(desde) if desde else dia_hasta - dias_defecto + 1
+        if dia_desde > dia_hasta:
+            raise ValueError("'desde' no puede ser posterior a 'hasta'")
+
+        with medir_etapa("metricas_rango", "series"):
+            series = obtener_series(obtener_indice())
+
+        with medir_etapa("metricas_rango", "consulta"):
+            totales = series.total(dia_desde, dia_hasta, gimnasio)
+            inicios, fines = tramos(dia_desde, dia_hasta, granularidad)
+            por_tramo = series.totales(inicios, fines, gimnasio)
+
+        dias = dia_hasta - dia_desde + 1
+        return {
+            "status": "success",
+            "desde": _a_fecha(dia_desde),
+            "hasta": _a_fecha(dia_hasta),
+            "dias": int(dias),
+            "granularidad": granularidad,
+            "gimnasio": gimnasio,
+            "datos_fuente": series.fuentes,
+            "totales": {
+                "asistencias": int(totales["asistencias"]),
+                "pagos": int(totales["pagos"]),
+                "ingresos": _redondear(totales["ingresos"])
+            },
+            "promedios": {
+                "asistencias_diarias": _redondear(totales["asistencias"] / dias),
+                "ingresos_diarios": _redondear(totales["ingresos"] / dias),
+                "ticket_promedio": _redondear(totales["ingresos"] / totales["pagos"]) if totales["pagos"] else 0.0
+            },
+            "serie": [
+                {
+                    "inicio": _a_fecha(inicio),
+                    "fin": _a_fecha(fin),
+                    "asistencias": int(asistencias),
+                    "pagos": int(pagos),
+                    "ingresos": _redondear(ingresos)
+                }
+                for inicio, fin, asistencias, pagos, ingresos in zip(
+                    inicios, fines, por_tramo["asistencias"], por_tramo["pagos"], por_tramo["ingresos"]
+                )
+            ]
+        }
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error calculando métricas del rango: {str(e)}",
+            "timestamp": datetime.now().isoformat()
+        }
@@ -0,0 +1,72 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+from datetime import datetime
+
+# Ajustar sys.path para importar desde la raíz del proyecto
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.metricas import medir_etapa
+
+PERCENTILES_DEFECTO = (5, 25, 50, 75, 90, 95, 99)
+BINS_DEFECTO = 10
+
+
+def _a_mes(fecha):
+    return pd.Timestamp(fecha).strftime('%Y-%m') if fecha else None
+
+
+def _redondear(valor):
+    return round(float(valor), 2) if np.isfinite(valor) else None
+
+
+def describir_digest(digest, percentiles=PERCENTILES_DEFECTO, bins=BINS_DEFECTO) -> dict:
+    """Cantidad, extremos, percentiles e histograma estimados de un t-digest"""
+    if not digest.total:
+        return {"cantidad": 0, "minimo": None, "maximo": None, "percentiles": {}, "histograma": []}
+    valores = digest.cuantil(np.asarray(percentiles, dtype=float) / 100)
+    return {
+        "cantidad": int(round(digest.total)),
+        "minimo": _redondear(digest.minimo),
+        "maximo": _redondear(digest.maximo),
+        "percentiles": {f"p{p:g}": _redondear(valor) for p, valor in zip(percentiles, valores)},
+        "histograma": digest.histograma(bins)
+    }
+
+
+def run(desde=None, hasta=None, gimnasio=None, percentiles=PERCENTILES_DEFECTO, bins=BINS_DEFECTO):
+    """
+    Percentiles e histograma de monto y días de retraso de los pagos de los
+    meses de [desde, hasta] (por defecto todo el historial), combinando los
+    t-digest por gimnasio y mes de utils/tdigest.py en vez de releer pagos.
+    """
+    try:
+        from utils.tdigest import obtener_cuantiles, METRICAS
+
+        with medir_etapa("percentiles_pagos", "digests"):
+            cuantiles = obtener_cuantiles()
+
+        mes_desde, mes_hasta = _a_mes(desde), _a_mes(hasta)
+        with medir_etapa("percentiles_pagos", "consulta"):
+            distribuciones = {
+                metrica: describir_digest(cuantiles.union(metrica, mes_desde, mes_hasta, gimnasio), percentiles, bins)
+                for metrica in METRICAS
+            }
+
+        return {
+            "status": "success",
+            "timestamp": datetime.now().isoformat(),
+            "mensaje": "Percentiles estimados con t-digest por gimnasio y mes",
+            "filtros": {"mes_desde": mes_desde, "mes_hasta": mes_hasta, "gimnasio": gimnasio},
+            **distribuciones
+        }
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error calculando percentiles de pagos: {str(e)}",
+            "timestamp": datetime.now().isoformat()
+        }
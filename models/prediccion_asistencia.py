@@ -9,6 +9,12 @@ CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
 sys.path.insert(0, PROJECT_ROOT)
 
+from utils.logs import obtener_logger
+from utils.metricas import medir_etapa
+from utils.serializacion import columna_json, registros
+
+logger = obtener_logger(__name__)
+
 def run():
     """
     Ejecuta el análisis de predicción de asistencia usando los nuevos datos
@@ -17,10 +23,7 @@ def run():
         # Cargar los nuevos datasets - RUTA CORREGIDA
         base_path = os.path.join(PROJECT_ROOT, 'ia', 'Data_Lake_CSV')
         
-        # Debug: Verificar rutas
-        print(f"🔍 PROJECT_ROOT: {PROJECT_ROOT}")
-        print(f"📁 Base path: {base_path}")
-        print(f"📂 Existe base_path? {os.path.exists(base_path)}")
+        logger.debug("Rutas de datos", extra={"project_root": PROJECT_ROOT, "base_path": base_path})
         
         resultados = {
             "status": "success",
@@ -31,20 +34,20 @@ def run():
         
         # 1. Análisis de probabilidad de churn
         churn_path = os.path.join(base_path, 'probabilidad_churn.csv')
-        print(f"🎯 Buscando churn en: {churn_path}")
-        print(f"✅ Existe archivo churn? {os.path.exists(churn_path)}")
         
         if os.path.exists(churn_path):
-            churn_df = pd.read_csv(churn_path)
-            print(f"📊 Cargados {len(churn_df)} registros de churn")
-            print(f"🔍 Columnas disponibles: {list(churn_df.columns)}")
-            
             # Calcular estadísticas de riesgo de abandono - CAMPO CORREGIDO
-            total_socios = len(churn_df)
-            alto_riesgo = len(churn_df[churn_df.get('prob_churn', 0) > 0.7])
-            medio_riesgo = len(churn_df[(churn_df.get('prob_churn', 0) > 0.4) & 
-                                      (churn_df.get('prob_churn', 0) <= 0.7)])
-            bajo_riesgo = total_socios - alto_riesgo - medio_riesgo
+            # prob_churn ya ordenada de la población del ranking (se ordena una vez por
+            # versión del CSV, ver models/distribucion_riesgo.py) + searchsorted por corte
+            from utils.indice_asistencia import obtener_indice
+            from models.ranking_inactivos import cargar_poblacion
+            from models.distribucion_riesgo import CORTES_DEFECTO, contar_por_cortes, obtener_prob_churn_ordenada
+            with medir_etapa("prediccion_asistencia", "carga_csv"):
+                prob_churn = obtener_prob_churn_ordenada(cargar_poblacion(obtener_indice()))
+            logger.debug("prob_churn ordenada", extra={"archivo": churn_path, "socios": len(prob_churn)})
+
+            total_socios = len(prob_churn)
+            bajo_riesgo, medio_riesgo, alto_riesgo = contar_por_cortes(prob_churn, CORTES_DEFECTO)
             
             resultados["analisis_churn"] = {
                 "total_socios_analizados": int(total_socios),
@@ -60,12 +63,11 @@ def run():
         
         # 2. Análisis de segmentación de socios
         segmentacion_path = os.path.join(base_path, 'segmentacion_socios.csv')
-        print(f"👥 Buscando segmentación en: {segmentacion_path}")
-        print(f"✅ Existe archivo segmentación? {os.path.exists(segmentacion_path)}")
         
         if os.path.exists(segmentacion_path):
-            segmentacion_df = pd.read_csv(segmentacion_path)
-            print(f"📊 Cargados {len(segmentacion_df)} registros de segmentación")
+            with medir_etapa("prediccion_asistencia", "carga_csv"):
+                segmentacion_df = pd.read_csv(segmentacion_path)
+            logger.debug("CSV de segmentación cargado", extra={"archivo": segmentacion_path, "filas": len(segmentacion_df)})
             
             # Análisis por segmento de pago
             segmentos = segmentacion_df.get('segmento_pago', pd.Series()).value_counts()
@@ -81,31 +83,29 @@ def run():
         
         # 3. Top 5 socios inactivos
         top5_inactivos_path = os.path.join(base_path, 'top5_socios_inactivos.csv')
-        print(f"🚨 Buscando top 5 inactivos en: {top5_inactivos_path}")
-        print(f"✅ Existe archivo top5? {os.path.exists(top5_inactivos_path)}")
         
         if os.path.exists(top5_inactivos_path):
-            top5_df = pd.read_csv(top5_inactivos_path)
-            print(f"📊 Cargados {len(top5_df)} registros de socios inactivos")
+            with medir_etapa("prediccion_asistencia", "carga_csv"):
+                top5_df = pd.read_csv(top5_inactivos_path)
+            logger.debug("CSV de socios inactivos cargado", extra={"archivo": top5_inactivos_path, "filas": len(top5_df)})
             
+            top5 = top5_df.head()
             resultados["socios_criticos"] = {
                 "total_inactivos_criticos": int(len(top5_df)),
-                "detalle": []
-            }
-            
-            for _, socio in top5_df.head().iterrows():
-                resultados["socios_criticos"]["detalle"].append({
-                    "socio_id": str(socio.get('socio_id', 'N/A')),
-                    "dias_inactividad": int(socio.get('dias_sin_asistir', 0)),
-                    "ultima_asistencia": str(socio.get('ultima_asistencia', 'N/A'))
+                "detalle": registros({
+                    "socio_id": columna_json(top5.get('socio_id', pd.Series('N/A', index=top5.index)), 'str'),
+                    "dias_inactividad": columna_json(top5.get('dias_sin_asistir', pd.Series(0, index=top5.index)), 'int'),
+                    "ultima_asistencia": columna_json(top5.get('ultima_asistencia', pd.Series('N/A', index=top5.index)), 'str')
                 })
+            }
         else:
             resultados["socios_criticos"] = {"error": "Archivo top5_socios_inactivos.csv no encontrado"}
         
         # 4. Predicciones usando ETL (con fallback)
         try:
             from ia.data_science.ETL.etl_login import run_etl
-            data = run_etl("gym_master")
+            with medir_etapa("prediccion_asistencia", "etl_supabase"):
+                data = run_etl("gym_master", guardar_csv=False)
             asistencia_df = data.get('asistencia', pd.DataFrame())
             
             if not asistencia_df.empty:
@@ -120,6 +120,7 @@ def run():
                     "datos_desde_supabase": False
                 }
         except Exception as e:
+            logger.warning("No se pudo conectar a ETL", extra={"error": e})
             resultados["tendencias_asistencia"] = {
                 "error": f"No se pudo conectar a ETL: {str(e)}",
                 "datos_usados": "Análisis basado solo en archivos CSV"
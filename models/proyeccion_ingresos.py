@@ -3,6 +3,7 @@ import numpy as np
 import sys
 import os
 import math
+import warnings
 from datetime import datetime, timedelta
 
 # Ajustar sys.path para importar desde la carpeta ia
@@ -10,6 +11,13 @@ CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
 sys.path.insert(0, PROJECT_ROOT)
 
+from utils.diccionario import COLUMNAS_PAGOS, leer_csv_codificado
+from utils.logs import obtener_logger
+from utils.metricas import medir_etapa
+from utils.serializacion import sanitizar
+
+logger = obtener_logger(__name__)
+
 def sanitize_value(value):
     """Convierte valores problemáticos a números válidos para JSON"""
     if pd.isna(value) or math.isinf(value) or not math.isfinite(value):
@@ -26,10 +34,7 @@ def run():
         # RUTA CORREGIDA - Los archivos están en ia/Data_Lake_CSV
         base_path = os.path.join(PROJECT_ROOT, 'ia', 'Data_Lake_CSV')
         
-        # Debug: Verificar rutas
-        print(f"🔍 PROJECT_ROOT: {PROJECT_ROOT}")
-        print(f"📁 Base path: {base_path}")
-        print(f"📂 Existe base_path? {os.path.exists(base_path)}")
+        logger.debug("Rutas de datos", extra={"project_root": PROJECT_ROOT, "base_path": base_path})
         
         resultados = {
             "status": "success",
@@ -40,15 +45,14 @@ def run():
         
         # 1. Intentar cargar datos de pagos desde Supabase primero
         pagos_supabase_path = os.path.join(base_path, 'pagos_supabase.csv')
-        print(f"💳 Buscando pagos Supabase en: {pagos_supabase_path}")
-        print(f"✅ Existe archivo pagos Supabase? {os.path.exists(pagos_supabase_path)}")
         
         pagos_df = None
         
         if os.path.exists(pagos_supabase_path):
-            print("📊 Cargando datos de pagos desde Supabase...")
-            pagos_df = pd.read_csv(pagos_supabase_path)
-            print(f"✅ Cargados {len(pagos_df)} registros de pagos desde Supabase")
+            with medir_etapa("proyeccion_ingresos", "carga_csv"):
+                # id / socio_id / cuota_id como int32 (diccionario persistente de UUIDs)
+                pagos_df = leer_csv_codificado(pagos_supabase_path, COLUMNAS_PAGOS)
+            logger.debug("CSV de pagos Supabase cargado", extra={"archivo": pagos_supabase_path, "filas": len(pagos_df)})
             
             # Asegurar formato de fecha
             pagos_df['fecha_pago'] = pd.to_datetime(pagos_df['fecha_pago'])
@@ -77,17 +81,17 @@ def run():
                 "fuente": "Datos reales Supabase"
             }
         else:
-            print("⚠️ No se encontraron datos de Supabase, usando datos simulados...")
+            logger.debug("Sin pagos de Supabase, usando datos simulados", extra={"archivo": pagos_supabase_path})
             
             # Fallback: usar datos simulados
             pagos_simulados_path = os.path.join(base_path, 'pagos_simulados.csv')
-            print(f"🎲 Buscando pagos simulados en: {pagos_simulados_path}")
-            print(f"✅ Existe archivo simulados? {os.path.exists(pagos_simulados_path)}")
             
             if os.path.exists(pagos_simulados_path):
-                pagos_df = pd.read_csv(pagos_simulados_path)
+                with medir_etapa("proyeccion_ingresos", "carga_csv"):
+                    # Ids simulados: diccionarios aparte, no los de producción
+                    pagos_df = leer_csv_codificado(pagos_simulados_path, COLUMNAS_PAGOS, simulado=True)
                 pagos_df['fecha_pago'] = pd.to_datetime(pagos_df['fecha_pago'])
-                print(f"📊 Cargados {len(pagos_df)} registros simulados")
+                logger.debug("CSV de pagos simulados cargado", extra={"archivo": pagos_simulados_path, "filas": len(pagos_df)})
                 
                 # Usar 'monto' para datos simulados, 'monto_pagado' para reales
                 monto_col = 'monto' if 'monto' in pagos_df.columns else 'monto_pagado'
@@ -104,12 +108,11 @@ def run():
         
         # 2. Análisis de segmentación para proyecciones
         segmentacion_path = os.path.join(base_path, 'segmentacion_socios.csv')
-        print(f"👥 Buscando segmentación en: {segmentacion_path}")
-        print(f"✅ Existe archivo segmentación? {os.path.exists(segmentacion_path)}")
         
         if os.path.exists(segmentacion_path):
-            segmentacion_df = pd.read_csv(segmentacion_path)
-            print(f"📊 Cargados {len(segmentacion_df)} registros de segmentación")
+            with medir_etapa("proyeccion_ingresos", "carga_csv"):
+                segmentacion_df = pd.read_csv(segmentacion_path)
+            logger.debug("CSV de segmentación cargado", extra={"archivo": segmentacion_path, "filas": len(segmentacion_df)})
             
             # Análisis por segmento para proyecciones
             segmentos = segmentacion_df.get('segmento_pago', pd.Series()).value_counts()
@@ -124,10 +127,12 @@ def run():
             resultados["segmentacion_ingresos"] = {"error": "Archivo segmentacion_socios.csv no encontrado"}
         
         # 3. Simulación Monte Carlo para proyecciones futuras
-        resultados["proyeccion_monte_carlo"] = ejecutar_simulacion_monte_carlo_segura()
+        with medir_etapa("proyeccion_ingresos", "monte_carlo"):
+            resultados["proyeccion_monte_carlo"] = ejecutar_simulacion_monte_carlo_segura()
         
         # 4. Proyecciones por escenarios
-        resultados["escenarios_proyeccion"] = calcular_escenarios_seguros()
+        with medir_etapa("proyeccion_ingresos", "escenarios"):
+            resultados["escenarios_proyeccion"] = calcular_escenarios_seguros()
         
         # 5. Recomendaciones basadas en análisis
         resultados["recomendaciones_financieras"] = [
@@ -172,41 +177,23 @@ def ejecutar_simulacion_monte_carlo_segura():
         crecimiento_medio = 0.02  # 2% mensual
         crecimiento_std = 0.01
         
-        proyecciones_p5 = []
-        proyecciones_p50 = []
-        proyecciones_p95 = []
+        # Todas las simulaciones de todos los meses en una sola matriz (meses x simulaciones)
+        meses = np.arange(1, meses_proyeccion + 1)[:, None]
+        factor_crecimiento = 1 + np.random.normal(crecimiento_medio, crecimiento_std, size=(meses_proyeccion, n_simulaciones))
+        ingresos = socios_base * factor_crecimiento ** meses * precio_base
         
-        for mes in range(meses_proyeccion):
-            # Generar simulaciones para este mes
-            ingresos_mes = []
-            
-            for _ in range(n_simulaciones):
-                # Crecimiento de socios
-                factor_crecimiento = 1 + np.random.normal(crecimiento_medio, crecimiento_std)
-                socios = socios_base * (factor_crecimiento ** (mes + 1))
-                
-                # Calcular ingresos
-                ingresos = socios * precio_base
-                
-                # Validar que no sea infinito o NaN
-                if math.isfinite(ingresos) and ingresos > 0:
-                    ingresos_mes.append(ingresos)
-            
-            if ingresos_mes:
-                # Calcular percentiles de forma segura
-                p5 = sanitize_value(np.percentile(ingresos_mes, 5))
-                p50 = sanitize_value(np.percentile(ingresos_mes, 50))
-                p95 = sanitize_value(np.percentile(ingresos_mes, 95))
-                
-                proyecciones_p5.append(p5)
-                proyecciones_p50.append(p50)
-                proyecciones_p95.append(p95)
-            else:
-                # Fallback si no hay datos válidos
-                base_value = socios_base * precio_base * (1.02 ** (mes + 1))
-                proyecciones_p5.append(sanitize_value(base_value * 0.9))
-                proyecciones_p50.append(sanitize_value(base_value))
-                proyecciones_p95.append(sanitize_value(base_value * 1.1))
+        # Validar que no sea infinito o NaN: los valores inválidos no cuentan en los percentiles
+        ingresos = np.where(np.isfinite(ingresos) & (ingresos > 0), ingresos, np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # meses sin ningún valor válido
+            percentiles = np.nanpercentile(ingresos, [5, 50, 95], axis=1)
+        
+        # Fallback si un mes no tiene datos válidos
+        base_value = socios_base * precio_base * (1.02 ** meses[:, 0])
+        sin_datos = np.isnan(percentiles).any(axis=0)
+        percentiles[:, sin_datos] = base_value[sin_datos] * np.array([[0.9], [1.0], [1.1]])
+        
+        proyecciones_p5, proyecciones_p50, proyecciones_p95 = (sanitizar(fila).tolist() for fila in percentiles)
         
         return {
             "meses_proyectados": meses_proyeccion,
@@ -311,15 +298,12 @@ def run_by_gym(gym_id):
         
         # 1. Intentar cargar datos de pagos desde Supabase primero
         pagos_supabase_path = os.path.join(base_path, 'pagos_supabase.csv')
-        print(f"💳 Buscando pagos Supabase en: {pagos_supabase_path}")
-        print(f"✅ Existe archivo pagos Supabase? {os.path.exists(pagos_supabase_path)}")
         
         pagos_df = None
         
         if os.path.exists(pagos_supabase_path):
-            print("📊 Cargando datos de pagos desde Supabase...")
             pagos_df = pd.read_csv(pagos_supabase_path)
-            print(f"✅ Cargados {len(pagos_df)} registros de pagos desde Supabase")
+            logger.debug("CSV de pagos Supabase cargado", extra={"archivo": pagos_supabase_path, "filas": len(pagos_df)})
             
             # Asegurar formato de fecha
             pagos_df['fecha_pago'] = pd.to_datetime(pagos_df['fecha_pago'])
@@ -336,17 +320,15 @@ def run_by_gym(gym_id):
                 "fuente": "Datos reales Supabase"
             }
         else:
-            print("⚠️ No se encontraron datos de Supabase, usando datos simulados...")
+            logger.debug("Sin pagos de Supabase, usando datos simulados", extra={"archivo": pagos_supabase_path})
             
             # Fallback: usar datos simulados
             pagos_simulados_path = os.path.join(base_path, 'pagos_simulados.csv')
-            print(f"🎲 Buscando pagos simulados en: {pagos_simulados_path}")
-            print(f"✅ Existe archivo simulados? {os.path.exists(pagos_simulados_path)}")
             
             if os.path.exists(pagos_simulados_path):
                 pagos_df = pd.read_csv(pagos_simulados_path)
                 pagos_df['fecha_pago'] = pd.to_datetime(pagos_df['fecha_pago'])
-                print(f"📊 Cargados {len(pagos_df)} registros simulados")
+                logger.debug("CSV de pagos simulados cargado", extra={"archivo": pagos_simulados_path, "filas": len(pagos_df)})
                 
                 resultados["ingresos_reales"] = {
                     "total_periodo": float(pagos_df['monto_pagado'].sum()),
@@ -360,12 +342,10 @@ def run_by_gym(gym_id):
         
         # 2. Análisis de segmentación para proyecciones
         segmentacion_path = os.path.join(base_path, 'segmentacion_socios.csv')
-        print(f"👥 Buscando segmentación en: {segmentacion_path}")
-        print(f"✅ Existe archivo segmentación? {os.path.exists(segmentacion_path)}")
         
         if os.path.exists(segmentacion_path):
             segmentacion_df = pd.read_csv(segmentacion_path)
-            print(f"📊 Cargados {len(segmentacion_df)} registros de segmentación")
+            logger.debug("CSV de segmentación cargado", extra={"archivo": segmentacion_path, "filas": len(segmentacion_df)})
             
             # Análisis por segmento para proyecciones
             segmentos = segmentacion_df.get('segmento_pago', pd.Series()).value_counts()
@@ -381,7 +361,7 @@ def run_by_gym(gym_id):
         
         # 3. Simulación Monte Carlo para proyecciones futuras
         if pagos_df is not None and len(pagos_df) > 0:
-            print("🎯 Ejecutando simulación Monte Carlo...")
+            logger.debug("Ejecutando simulación Monte Carlo", extra={"pagos": len(pagos_df)})
             
             # Parámetros para Monte Carlo
             n_simulaciones = 1000
@@ -420,7 +400,7 @@ def run_by_gym(gym_id):
                 "crecimiento_estimado": "2% mensual"
             }
         else:
-            print("⚠️ Sin datos suficientes para Monte Carlo")
+            logger.debug("Sin datos suficientes para Monte Carlo")
             resultados["proyeccion_monte_carlo"] = {"error": "Datos insuficientes para simulación"}
         
         # 4. Recomendaciones basadas en análisis
@@ -0,0 +1,225 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+import threading
+from datetime import datetime
+
+# Ajustar sys.path para importar desde la raíz del proyecto
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.diccionario import SIN_CODIGO, leer_csv_codificado, obtener_diccionario
+from utils.logs import obtener_logger
+from utils.metricas import medir_etapa, registrar_cache
+from utils.serializacion import columna_json, registros
+
+logger = obtener_logger(__name__)
+
+BASE_PATH = os.path.join(PROJECT_ROOT, 'ia', 'Data_Lake_CSV')
+CHURN_PATH = os.path.join(BASE_PATH, 'probabilidad_churn.csv')
+SEGMENTACION_PATH = os.path.join(BASE_PATH, 'segmentacion_socios.csv')
+
+K_DEFECTO = 5
+CRITERIOS = ("riesgo", "inactividad")
+# Socios sin probabilidad del modelo de churn: riesgo estimado por inactividad,
+# 1.0 a las 4 semanas sin asistir (mismo umbral que informes_abandono)
+DIAS_ABANDONO = 28
+# Última visita de los socios sin asistencias: el día más antiguo representable,
+# así encabezan el ranking por inactividad y su riesgo estimado es 1.0
+SIN_VISITAS = np.iinfo(np.int32).min
+
+COLUMNAS_SOCIO_ID = {"socio_id": "socios"}
+
+_poblacion = None
+_poblacion_clave = None
+_poblacion_lock = threading.Lock()
+
+
+def run(k=K_DEFECTO, gimnasio=None, segmento=None, criterio="riesgo", hoy=None):
+    """
+    Top-k de socios inactivos / en riesgo sobre toda la población, en vivo.
+
+    Los días sin asistir salen del índice de asistencia (una última visita por
+    socio, vectorizado) y la probabilidad de churn / segmento de los CSV del Data
+    Lake; la selección usa np.argpartition (O(n)) y solo se ordenan los k elegidos.
+    """
+    try:
+        from utils.indice_asistencia import obtener_indice
+
+        if criterio not in CRITERIOS:
+            raise ValueError(f"Criterio inválido: {criterio} (opciones: {', '.join(CRITERIOS)})")
+
+        with medir_etapa("ranking_inactivos", "indice"):
+            indice = obtener_indice()
+        with medir_etapa("ranking_inactivos", "poblacion"):
+            poblacion = cargar_poblacion(indice)
+        with medir_etapa("ranking_inactivos", "seleccion"):
+            ranking = seleccionar_top(poblacion, k, gimnasio, segmento, criterio, hoy)
+
+        return {
+            "status": "success",
+            "timestamp": datetime.now().isoformat(),
+            "mensaje": "Ranking de socios inactivos y en riesgo de abandono",
+            "datos_fuente": indice.fuente,
+            "criterio": criterio,
+            "filtros": {"gimnasio": gimnasio, "segmento": segmento},
+            "gimnasios_disponibles": poblacion["gimnasios"].tolist(),
+            "segmentos_disponibles": poblacion["segmentos"].tolist(),
+            **ranking,
+            "recomendaciones": [
+                "Contactar primero a los socios con mayor riesgo del ranking",
+                "Establecer alertas automáticas para socios inactivos > 4 semanas",
+                "Crear descuentos personalizados según segmento de pago"
+            ]
+        }
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error calculando ranking de inactivos: {str(e)}",
+            "timestamp": datetime.now().isoformat()
+        }
+
+
+def huella_fuentes():
+    """mtime de los CSV de churn y segmentación (la población se recalcula si cambian)"""
+    return tuple(os.path.getmtime(ruta) if os.path.exists(ruta) else 0.0 for ruta in (CHURN_PATH, SEGMENTACION_PATH))
+
+
+def cargar_poblacion(indice) -> dict:
+    """
+    Arrays alineados, uno por socio: código, día de la última visita, probabilidad
+    de churn (NaN si el modelo no lo evaluó), segmento y gimnasio. La población son
+    los socios con asistencias más los de los CSV de churn y segmentación: un socio
+    que nunca asistió tiene SIN_VISITAS como última visita y gimnasio SIN_CODIGO.
+    Se cachean mientras no cambien el índice ni los CSV.
+    """
+    global _poblacion, _poblacion_clave
+
+    clave = (indice.version, huella_fuentes())
+    with _poblacion_lock:
+        vigente = _poblacion is not None and _poblacion_clave == clave
+        registrar_cache("ranking_inactivos_poblacion", vigente)
+        if vigente:
+            return _poblacion
+
+        churn_df = segmentacion_df = None
+        if os.path.exists(CHURN_PATH):
+            churn_df = leer_csv_codificado(CHURN_PATH, COLUMNAS_SOCIO_ID, simulado=indice.simulado)
+        if os.path.exists(SEGMENTACION_PATH):
+            segmentacion_df = leer_csv_codificado(SEGMENTACION_PATH, COLUMNAS_SOCIO_ID, simulado=indice.simulado)
+
+        con_visitas, ultima_con_visitas = indice.ultimas_visitas()
+        codigos = con_visitas
+        for df in (churn_df, segmentacion_df):
+            if df is not None:
+                codigos_df = df['socio_id'].to_numpy()
+                codigos = np.union1d(codigos, codigos_df[codigos_df != SIN_CODIGO])
+        codigos = codigos.astype(np.int64)
+        n = max(len(indice.offsets) - 1, int(codigos.max()) + 1 if len(codigos) else 0)
+
+        ultima = np.full(n, SIN_VISITAS, dtype=np.int32)
+        ultima[con_visitas] = ultima_con_visitas
+        gimnasio = np.full(n, SIN_CODIGO, dtype=np.int16)
+        gimnasio[:len(indice.gimnasio)] = indice.gimnasio
+
+        prob_churn = np.full(n, np.nan, dtype=np.float32)
+        if churn_df is not None and 'prob_churn' in churn_df.columns:
+            _asignar(prob_churn, churn_df['socio_id'].to_numpy(), pd.to_numeric(churn_df['prob_churn'], errors='coerce'))
+
+        segmento = np.full(n, SIN_CODIGO, dtype=np.int16)
+        segmentos = np.empty(0, dtype=str)
+        if segmentacion_df is not None and 'segmento_pago' in segmentacion_df.columns:
+            codigos_segmento, segmentos = pd.factorize(segmentacion_df['segmento_pago'])
+            _asignar(segmento, segmentacion_df['socio_id'].to_numpy(), codigos_segmento)
+            segmentos = np.asarray(segmentos, dtype=str)
+
+        _poblacion = {
+            "codigos": codigos,
+            "ultima_visita": ultima[codigos],
+            "prob_churn": prob_churn[codigos],
+            "segmento": segmento[codigos],
+            "gimnasio": gimnasio[codigos],
+            "segmentos": segmentos,
+            "gimnasios": indice.gimnasios,
+            "simulado": indice.simulado,
+            "version": clave
+        }
+        _poblacion_clave = clave
+        logger.debug("Población del ranking recalculada", extra={"socios": len(codigos)})
+        return _poblacion
+
+
+def _asignar(destino, codigos_socio, valores):
+    """destino[código] = valor para los socios que están en el índice"""
+    valores = np.asarray(valores)
+    dentro = (codigos_socio != SIN_CODIGO) & (codigos_socio < len(destino))
+    destino[codigos_socio[dentro]] = valores[dentro]
+
+
+def _posicion(nombres, nombre):
+    """Posición de `nombre` en el array de nombres o None si no está"""
+    posiciones = np.flatnonzero(nombres == nombre)
+    return int(posiciones[0]) if len(posiciones) else None
+
+
+def calcular_riesgo(poblacion, hoy=None):
+    """
+    (días sin asistir, riesgo en [0, 1]) por socio: prob_churn del modelo o, si falta,
+    estimado por inactividad. Los socios sin asistencias tienen el máximo de días
+    sin asistir (ver SIN_VISITAS) y riesgo estimado 1.0.
+    """
+    hoy = int(pd.Timestamp(hoy or pd.Timestamp.now()).to_datetime64().astype('datetime64[D]').astype(np.int64))
+    dias_sin_asistir = hoy - poblacion["ultima_visita"].astype(np.int64)
+    prob_churn = poblacion["prob_churn"]
+    riesgo = np.where(np.isnan(prob_churn), np.clip(dias_sin_asistir / DIAS_ABANDONO, 0, 1), prob_churn)
+    return dias_sin_asistir, riesgo
+
+
+def filtrar(poblacion, gimnasio=None, segmento=None) -> np.ndarray:
+    """Máscara de los socios del gimnasio/segmento pedidos (None = todos)"""
+    filtro = np.ones(len(poblacion["codigos"]), dtype=bool)
+    for columna, nombres, valor in (("gimnasio", poblacion["gimnasios"], gimnasio),
+                                    ("segmento", poblacion["segmentos"], segmento)):
+        if valor is not None:
+            posicion = _posicion(nombres, valor)
+            filtro &= poblacion[columna] == posicion if posicion is not None else False
+    return filtro
+
+
+def seleccionar_top(poblacion, k, gimnasio=None, segmento=None, criterio="riesgo", hoy=None) -> dict:
+    """Filtra por gimnasio/segmento y elige los k socios de mayor riesgo (o más días sin asistir)"""
+    dias_sin_asistir, riesgo = calcular_riesgo(poblacion, hoy)
+    prob_churn = poblacion["prob_churn"]
+    candidatos = np.flatnonzero(filtrar(poblacion, gimnasio, segmento))
+
+    # Clave principal según el criterio; la otra desempata al ordenar los k elegidos
+    principal, secundaria = (riesgo, dias_sin_asistir) if criterio == "riesgo" else (dias_sin_asistir, riesgo)
+    if k < len(candidatos):
+        elegidos = candidatos[np.argpartition(-principal[candidatos], k - 1)[:k]]
+    else:
+        elegidos = candidatos
+    elegidos = elegidos[np.lexsort((-secundaria[elegidos], -principal[elegidos]))]
+
+    socio_ids = obtener_diccionario("socios", poblacion["simulado"]).decodificar(poblacion["codigos"][elegidos])
+    sin_visitas = poblacion["ultima_visita"][elegidos] == SIN_VISITAS
+    ultima = poblacion["ultima_visita"][elegidos].astype('datetime64[D]')
+    ultima[sin_visitas] = np.datetime64('NaT')
+    return {
+        "total_candidatos": int(len(candidatos)),
+        "total_inactivos": int(np.count_nonzero(dias_sin_asistir[candidatos] >= DIAS_ABANDONO)),
+        "total_sin_asistencias": int(np.count_nonzero(poblacion["ultima_visita"][candidatos] == SIN_VISITAS)),
+        "k": int(k),
+        "detalle": registros({
+            "socio_id": columna_json(socio_ids, 'str'),
+            # null para los socios que nunca asistieron
+            "dias_inactividad": columna_json(np.where(sin_visitas, np.nan, dias_sin_asistir[elegidos]), 'int', defecto=None),
+            "ultima_asistencia": columna_json(pd.Series(ultima), 'fecha'),
+            "prob_churn": columna_json(prob_churn[elegidos], 'float', decimales=3, defecto=None),
+            "riesgo": columna_json(riesgo[elegidos], 'float', decimales=3),
+            "segmento": [str(poblacion["segmentos"][s]) if s != SIN_CODIGO else None for s in poblacion["segmento"][elegidos]],
+            "gimnasio": [str(poblacion["gimnasios"][g]) if g != SIN_CODIGO else None for g in poblacion["gimnasio"][elegidos]]
+        })
+    }
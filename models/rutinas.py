@@ -0,0 +1,353 @@
+import pandas as pd
+import sys
+import os
+import json
+import glob
+import copy
+import random
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# Ajustar sys.path para importar desde la carpeta ia
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.logs import obtener_logger
+from utils.metricas import medir_etapa, registrar_cache
+
+logger = obtener_logger(__name__)
+
+# Rutinas generadas por el script batch, usadas como catálogo de respaldo
+RUTINAS_DIR = os.path.join(PROJECT_ROOT, 'ia', 'data_science', 'rutinas')
+
+DIAS_SEMANA = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado"]
+DIAS_POR_SEMANA_DEFECTO = 3
+
+CATALOGO_TTL_SEGUNDOS = int(os.environ.get("RUTINAS_CATALOGO_TTL", 3600))
+MAX_RUTINAS_CACHE = int(os.environ.get("RUTINAS_CACHE_MAX", 512))
+# Perfiles de socio cacheados: la rutina y su ETag (utils/cache_http.py) comparten la misma consulta
+PERFIL_TTL_SEGUNDOS = int(os.environ.get("RUTINAS_PERFIL_TTL", 60))
+
+# Clave del catálogo cuando no se filtra por nivel/objetivo
+TODOS = ("*", "*")
+
+_catalogo = None
+_catalogo_lock = threading.Lock()
+
+_rutinas_recientes = OrderedDict()
+_rutinas_lock = threading.Lock()
+
+_perfiles = OrderedDict()
+_perfiles_lock = threading.Lock()
+
+
+def run(id_socio, semana=None, dias_por_semana=None):
+    """
+    Genera la rutina semanal de un socio a partir del catálogo de ejercicios cacheado.
+    La misma combinación socio/semana siempre produce la misma rutina.
+    """
+    try:
+        semana = semana or semana_iso()
+        with medir_etapa("rutinas", "catalogo"):
+            catalogo = cargar_catalogo()
+
+        with medir_etapa("rutinas", "perfil_socio"):
+            perfil = obtener_perfil_socio(id_socio)
+        if perfil is None:
+            return {
+                "status": "error",
+                "error": f"Socio {id_socio} no encontrado",
+                "socio_encontrado": False,
+                "timestamp": datetime.now().isoformat()
+            }
+
+        # El perfil es parte de la clave: si el socio cambia objetivo, nivel o días no se sirve la rutina vieja
+        clave = (str(id_socio), semana, dias_por_semana, huella_perfil(perfil))
+        rutina_cacheada = _obtener_de_cache(clave, catalogo["version"])
+        if rutina_cacheada is not None:
+            rutina_cacheada["desde_cache"] = True
+            return rutina_cacheada
+
+        dias = dias_por_semana or perfil["dias_por_semana"]
+        grupos = catalogo["grupos"].get((perfil["nivel"], perfil["objetivo"]))
+        if grupos is None:
+            grupos = catalogo["grupos"].get(TODOS, {})
+
+        rng = random.Random(semilla_rutina(id_socio, semana))
+        with medir_etapa("rutinas", "generacion"):
+            rutina = generar_rutina(grupos, dias, rng)
+        if rutina is None:
+            return {
+                "status": "error",
+                "error": f"No hay grupos musculares disponibles para el socio {id_socio}",
+                "timestamp": datetime.now().isoformat()
+            }
+
+        resultado = {
+            "status": "success",
+            "timestamp": datetime.now().isoformat(),
+            "id_socio": str(id_socio),
+            "semana_iso": semana,
+            "dias_por_semana": int(dias),
+            "perfil_socio": perfil["fuente"],
+            "catalogo": {
+                "fuente": catalogo["fuente"],
+                "version": catalogo["version"],
+                "total_ejercicios": catalogo["total_ejercicios"]
+            },
+            "rutina": rutina
+        }
+        _guardar_en_cache(clave, resultado)
+
+        resultado = copy.deepcopy(resultado)
+        resultado["desde_cache"] = False
+        return resultado
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": f"Error generando rutina: {str(e)}",
+            "timestamp": datetime.now().isoformat()
+        }
+
+
+def semana_iso(fecha=None):
+    """Devuelve la semana ISO en formato AAAA-Www (ej: 2025-W27)"""
+    anio, semana, _ = (fecha or datetime.now()).isocalendar()
+    return f"{anio}-W{semana:02d}"
+
+
+def semilla_rutina(id_socio, semana):
+    """Semilla estable entre procesos (hash() de Python cambia en cada arranque)"""
+    digest = hashlib.sha256(f"{id_socio}:{semana}".encode("utf-8")).hexdigest()
+    return int(digest[:16], 16)
+
+
+def generar_rutina(grupos, dias_por_semana, rng):
+    """
+    Genera una rutina semanal con la misma lógica que el script batch:
+    días con 1 grupo → 6 ejercicios, días con 2 grupos → 8 ejercicios (4 por grupo).
+
+    Args:
+        grupos (dict): grupo muscular → lista de ejercicios del catálogo.
+        dias_por_semana (int): cantidad de días de entrenamiento.
+        rng (random.Random): generador sembrado por socio/semana.
+    """
+    nombres_grupos = sorted(grupos)
+    if len(nombres_grupos) < 1:
+        return None
+
+    dias_usados = rng.sample(DIAS_SEMANA, min(int(dias_por_semana), len(DIAS_SEMANA)))
+
+    semana = {}
+    for dia in sorted(dias_usados, key=DIAS_SEMANA.index):
+        ejercicios_dia = []
+        usar_dos_grupos = rng.choice([True, False])
+        grupos_dia = rng.sample(nombres_grupos, 2 if usar_dos_grupos and len(nombres_grupos) >= 2 else 1)
+        cantidad_por_grupo = 4 if len(grupos_dia) == 2 else 6
+
+        for grupo in grupos_dia:
+            ejercicios_grupo = grupos[grupo]
+            seleccionados = rng.sample(ejercicios_grupo, min(cantidad_por_grupo, len(ejercicios_grupo)))
+            for ejercicio in seleccionados:
+                ejercicios_dia.append({
+                    "grupo_muscular": grupo,
+                    "ejercicio": ejercicio["ejercicio"],
+                    "series": rng.choice([3, 4]),
+                    "repeticiones": rng.choice([8, 10, 12, 15]),
+                    "descanso": rng.choice(["60s", "90s"]),
+                    "imagen": ejercicio["imagen"]
+                })
+        semana[dia] = ejercicios_dia
+
+    return {"semana": semana}
+
+
+def cargar_catalogo(forzar=False):
+    """
+    Devuelve el catálogo de ejercicios indexado por (nivel, objetivo) y grupo muscular.
+    Se descarga de Supabase como mucho una vez cada CATALOGO_TTL_SEGUNDOS.
+    """
+    global _catalogo
+
+    with _catalogo_lock:
+        vigente = _catalogo is not None and time.time() - _catalogo["cargado_en"] < CATALOGO_TTL_SEGUNDOS
+        registrar_cache("catalogo_rutinas", vigente and not forzar)
+        if vigente and not forzar:
+            return _catalogo
+
+        ejercicios_df = _cargar_ejercicios_supabase()
+        fuente = "Supabase"
+        if ejercicios_df is None or ejercicios_df.empty:
+            ejercicios_df = _cargar_ejercicios_locales()
+            fuente = "Rutinas locales (fallback)"
+
+        _catalogo = _indexar_catalogo(ejercicios_df)
+        _catalogo["fuente"] = fuente
+        _catalogo["cargado_en"] = time.time()
+        return _catalogo
+
+
+def _cargar_ejercicios_supabase():
+    """Descarga ejercicios con su grupo muscular, igual que el script batch"""
+    try:
+        from utils.db import get_supabase_client
+
+        client = get_supabase_client()
+        if client is None:
+            return None
+
+        ejercicios = pd.DataFrame(client.table("ejercicio").select("*").execute().data)
+        grupo_muscular = pd.DataFrame(client.table("grupo_muscular").select("id_gm, nombre_gp").execute().data)
+        if ejercicios.empty or grupo_muscular.empty:
+            return None
+
+        ejercicios = ejercicios.merge(grupo_muscular, on="id_gm", how="left")
+        return ejercicios.rename(columns={
+            "nombre_gp": "grupo_muscular",
+            "nombre_ejercicio": "ejercicio",
+            "id_nivel": "nivel",
+            "id_objetivo": "objetivo"
+        })
+    except Exception as e:
+        logger.warning("Error cargando catálogo de ejercicios", extra={"error": e})
+        return None
+
+
+def _cargar_ejercicios_locales():
+    """Arma un catálogo sin nivel/objetivo a partir de las rutinas JSON ya generadas"""
+    filas = []
+    for archivo in sorted(glob.glob(os.path.join(RUTINAS_DIR, '*.json'))):
+        with open(archivo, encoding="utf-8") as f:
+            rutina = json.load(f)
+        for ejercicios_dia in rutina.get("semana", {}).values():
+            for ejercicio in ejercicios_dia:
+                filas.append({
+                    "grupo_muscular": ejercicio.get("grupo_muscular"),
+                    "ejercicio": ejercicio.get("ejercicio"),
+                    "imagen": ejercicio.get("imagen")
+                })
+
+    ejercicios = pd.DataFrame(filas, columns=["grupo_muscular", "ejercicio", "imagen"])
+    ejercicios["nivel"] = TODOS[0]
+    ejercicios["objetivo"] = TODOS[1]
+    return ejercicios.drop_duplicates(subset=["grupo_muscular", "ejercicio"])
+
+
+def _indexar_catalogo(ejercicios_df):
+    """Agrupa el catálogo una sola vez para que cada generación sea solo trabajo sobre listas"""
+    ejercicios_df = ejercicios_df.dropna(subset=["grupo_muscular", "ejercicio"])
+    ejercicios_df = ejercicios_df.sort_values(["grupo_muscular", "ejercicio"])
+    ejercicios_df = ejercicios_df.assign(
+        imagen=ejercicios_df["imagen"].astype(object).where(ejercicios_df["imagen"].notna(), None)
+    )
+
+    grupos = {}
+    for (nivel, objetivo, grupo), df in ejercicios_df.groupby(["nivel", "objetivo", "grupo_muscular"], sort=True):
+        grupos.setdefault((nivel, objetivo), {})[grupo] = df[["ejercicio", "imagen"]].to_dict("records")
+
+    # Catálogo completo para socios cuyo nivel/objetivo no tiene ejercicios cargados
+    unicos = ejercicios_df.drop_duplicates(subset=["grupo_muscular", "ejercicio"])
+    grupos[TODOS] = {
+        grupo: df[["ejercicio", "imagen"]].to_dict("records")
+        for grupo, df in unicos.groupby("grupo_muscular", sort=True)
+    }
+
+    huella = "|".join(
+        ejercicios_df[["nivel", "objetivo", "grupo_muscular", "ejercicio"]].astype(str).agg(":".join, axis=1)
+    )
+    return {
+        "grupos": grupos,
+        "version": hashlib.sha256(huella.encode("utf-8")).hexdigest()[:12],
+        "total_ejercicios": int(len(ejercicios_df))
+    }
+
+
+def obtener_perfil_socio(id_socio):
+    """
+    Nivel, objetivo y días por semana del socio, cacheados PERFIL_TTL_SEGUNDOS
+    (también si no existe): el request y el cálculo del ETag hacen una sola consulta.
+    """
+    clave = str(id_socio)
+    with _perfiles_lock:
+        cacheado = _perfiles.get(clave)
+        vigente = cacheado is not None and time.time() - cacheado[1] < PERFIL_TTL_SEGUNDOS
+        registrar_cache("perfil_socio", vigente)
+        if vigente:
+            _perfiles.move_to_end(clave)
+            return copy.deepcopy(cacheado[0])
+
+    perfil = _consultar_perfil_socio(id_socio)
+    with _perfiles_lock:
+        _perfiles[clave] = (perfil, time.time())
+        _perfiles.move_to_end(clave)
+        while len(_perfiles) > MAX_RUTINAS_CACHE:
+            _perfiles.popitem(last=False)
+    return copy.deepcopy(perfil)
+
+
+def _consultar_perfil_socio(id_socio):
+    """
+    Obtiene nivel, objetivo y días por semana del socio desde Supabase.
+    Sin conexión a Supabase se usa un perfil por defecto sobre el catálogo completo.
+    """
+    from utils.db import get_supabase_client
+
+    client = get_supabase_client()
+    if client is None:
+        return {
+            "nivel": TODOS[0],
+            "objetivo": TODOS[1],
+            "dias_por_semana": DIAS_POR_SEMANA_DEFECTO,
+            "fuente": "Perfil por defecto (sin Supabase)"
+        }
+
+    response = client.table("socio").select(
+        "id_socio, nivel, objetivo, dias_por_semana"
+    ).eq("id_socio", id_socio).limit(1).execute()
+    if not response.data:
+        return None
+
+    socio = response.data[0]
+    dias = socio.get("dias_por_semana")
+    return {
+        "nivel": socio.get("nivel"),
+        "objetivo": socio.get("objetivo"),
+        "dias_por_semana": int(dias) if pd.notna(dias) else DIAS_POR_SEMANA_DEFECTO,
+        "fuente": "Supabase"
+    }
+
+
+def huella_perfil(perfil):
+    """Nivel, objetivo y días por semana del perfil (None si el socio no existe)"""
+    if perfil is None:
+        return "sin_perfil"
+    return f"{perfil['nivel']}:{perfil['objetivo']}:{perfil['dias_por_semana']}"
+
+
+def _obtener_de_cache(clave, version_catalogo):
+    """LRU de rutinas recientes; se descarta la entrada si cambió el catálogo"""
+    with _rutinas_lock:
+        resultado = _rutinas_recientes.get(clave)
+        if resultado is None:
+            registrar_cache("rutinas", False)
+            return None
+        if resultado["catalogo"]["version"] != version_catalogo:
+            del _rutinas_recientes[clave]
+            registrar_cache("rutinas", False)
+            return None
+        _rutinas_recientes.move_to_end(clave)
+        registrar_cache("rutinas", True)
+        return copy.deepcopy(resultado)
+
+
+def _guardar_en_cache(clave, resultado):
+    with _rutinas_lock:
+        _rutinas_recientes[clave] = resultado
+        _rutinas_recientes.move_to_end(clave)
+        while len(_rutinas_recientes) > MAX_RUTINAS_CACHE:
+            _rutinas_recientes.popitem(last=False)
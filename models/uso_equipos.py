@@ -0,0 +1,291 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Ajustar sys.path para importar desde la carpeta ia
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.diccionario import SIN_CODIGO, obtener_diccionario
+from utils.logs import obtener_logger
+from utils.metricas import registrar_cache
+
+logger = obtener_logger(__name__)
+
+# Agregados diarios persistidos junto al resto del Data Lake CSV
+BASE_PATH = os.path.join(PROJECT_ROOT, 'ia', 'Data_Lake_CSV')
+USO_DIARIO_PATH = os.path.join(BASE_PATH, 'uso_equipos_diario.csv')
+USO_HORARIO_PATH = os.path.join(BASE_PATH, 'uso_qr_horario.csv')
+
+VENTANA_DIAS = int(os.environ.get("USO_EQUIPOS_VENTANA_DIAS", 30))
+RETENCION_DIAS = int(os.environ.get("USO_EQUIPOS_RETENCION_DIAS", 365))
+AGREGADO_TTL_SEGUNDOS = int(os.environ.get("USO_EQUIPOS_TTL", 300))
+# Clave del bloqueo de refresco en el cache compartido entre workers
+CLAVE_BLOQUEO = "agregados_uso_equipos"
+
+HORAS_OPERATIVAS = 8
+# Escaneos del mismo socio en el mismo equipo separados por menos de esto son una sola sesión
+GAP_SESION_MINUTOS = 30
+# Duración asignada a sesiones con un único escaneo
+DURACION_SESION_DEFECTO_MINUTOS = 20
+# Tamaño de página de PostgREST (Supabase devuelve como máximo 1000 filas por request)
+TAMANIO_PAGINA = 1000
+
+COLUMNAS_EQUIPO = ['id_equipamiento', 'equipo_id', 'id_equipo']
+COLUMNAS_DISPOSITIVO = ['dispositivo', 'device_type', 'tipo']
+
+COLUMNAS_DIARIO = ['fecha', 'id_equipamiento', 'escaneos', 'sesiones', 'socios_unicos', 'minutos_uso']
+COLUMNAS_HORARIO = ['fecha', 'hora', 'dispositivo', 'escaneos', 'socios_unicos']
+
+_lock = threading.Lock()
+_agregados = None
+_actualizado_en = 0.0
+
+
+def obtener_agregados(forzar=False):
+    """
+    Devuelve {'diario', 'horario', 'fuente'} con los agregados de uso.
+    Se actualizan de forma incremental como mucho una vez cada AGREGADO_TTL_SEGUNDOS.
+    """
+    global _agregados, _actualizado_en
+
+    with _lock:
+        vigente = _agregados is not None and not forzar and time.time() - _actualizado_en < AGREGADO_TTL_SEGUNDOS
+        registrar_cache("agregados_uso_equipos", vigente)
+        if vigente:
+            return _agregados
+        _agregados = actualizar_agregados()
+        _actualizado_en = time.time()
+        return _agregados
+
+
+def actualizar_agregados(hoy=None):
+    """
+    Trae de Supabase solo los logs posteriores al último día agregado (el último día
+    se recalcula porque pudo haber quedado incompleto) y persiste las tablas diarias
+    """
+    from utils.cache import obtener_cache
+    from utils.db import get_supabase_client
+
+    hoy = pd.Timestamp(hoy or datetime.now()).normalize()
+    client = get_supabase_client()
+    if client is None:
+        return _agregados_simulados()
+
+    # Un solo worker a la vez lee, extiende y reescribe los CSV persistidos
+    with obtener_cache().bloqueo(CLAVE_BLOQUEO):
+        diario, horario = _leer_agregados_persistidos()
+        if not horario.empty:
+            desde = min(horario['fecha'].max(), hoy)
+        else:
+            desde = hoy - timedelta(days=VENTANA_DIAS)
+
+        try:
+            logs_df = extraer_logs(client, desde, hoy + timedelta(days=1))
+        except Exception as e:
+            logger.warning("Error extrayendo logs QR", extra={"error": e})
+            return {"diario": diario, "horario": horario, "fuente": "Agregados persistidos (sin refresco)"}
+
+        nuevo_diario, nuevo_horario = agregar_uso_diario(logs_df)
+
+        limite = hoy - timedelta(days=RETENCION_DIAS)
+        diario = pd.concat([diario[diario['fecha'] < desde], nuevo_diario], ignore_index=True)
+        horario = pd.concat([horario[horario['fecha'] < desde], nuevo_horario], ignore_index=True)
+        diario = diario[diario['fecha'] >= limite].reset_index(drop=True)
+        horario = horario[horario['fecha'] >= limite].reset_index(drop=True)
+
+        _guardar_csv(diario, USO_DIARIO_PATH)
+        _guardar_csv(horario, USO_HORARIO_PATH)
+
+    return {"diario": diario, "horario": horario, "fuente": "Logs QR Supabase (agregado diario)"}
+
+
+def extraer_logs(client, desde, hasta):
+    """Descarga los logs QR del rango [desde, hasta) filtrando en el servidor, paginando de a TAMANIO_PAGINA"""
+    paginas = []
+    inicio = 0
+    while True:
+        response = (
+            client.table('logs_qr').select('*')
+            .gte('timestamp', pd.Timestamp(desde).isoformat())
+            .lt('timestamp', pd.Timestamp(hasta).isoformat())
+            .order('timestamp')
+            .range(inicio, inicio + TAMANIO_PAGINA - 1)
+            .execute()
+        )
+        paginas.extend(response.data)
+        if len(response.data) < TAMANIO_PAGINA:
+            break
+        inicio += TAMANIO_PAGINA
+    return pd.DataFrame(paginas)
+
+
+def agregar_uso_diario(logs_df, simulado=False):
+    """
+    Reduce los logs crudos a dos tablas chicas:
+
+    - diario (fecha, id_equipamiento): escaneos, sesiones, socios únicos y minutos de uso.
+      Solo si los logs identifican el equipo escaneado.
+    - horario (fecha, hora, dispositivo): escaneos y socios únicos, para patrones de uso.
+
+    Con simulado=True los socios se codifican con el diccionario de datos simulados.
+    """
+    if logs_df is None or logs_df.empty or 'timestamp' not in logs_df.columns:
+        return pd.DataFrame(columns=COLUMNAS_DIARIO), pd.DataFrame(columns=COLUMNAS_HORARIO)
+
+    timestamp = pd.to_datetime(logs_df['timestamp'], errors='coerce', utc=True).dt.tz_localize(None)
+    # Socios como códigos int32 (utils/diccionario.py): sesionización y nunique sobre enteros
+    if 'socio_id' in logs_df.columns:
+        socio = pd.Series(obtener_diccionario("socios", simulado).codificar(logs_df['socio_id']), index=logs_df.index)
+    else:
+        socio = pd.Series(SIN_CODIGO, index=logs_df.index, dtype=np.int32)
+    col_dispositivo = next((c for c in COLUMNAS_DISPOSITIVO if c in logs_df.columns), None)
+    dispositivo = logs_df[col_dispositivo].astype(str) if col_dispositivo else pd.Series('desconocido', index=logs_df.index)
+
+    logs = pd.DataFrame({
+        'timestamp': timestamp,
+        'fecha': timestamp.dt.normalize(),
+        'hora': timestamp.dt.hour,
+        'socio_id': socio,
+        'dispositivo': dispositivo
+    }).dropna(subset=['timestamp'])
+
+    horario = logs.groupby(['fecha', 'hora', 'dispositivo']).agg(
+        escaneos=('socio_id', 'size'),
+        socios_unicos=('socio_id', 'nunique')
+    ).reset_index()
+
+    col_equipo = next((c for c in COLUMNAS_EQUIPO if c in logs_df.columns), None)
+    if col_equipo is None:
+        return pd.DataFrame(columns=COLUMNAS_DIARIO), horario[COLUMNAS_HORARIO]
+
+    logs['id_equipamiento'] = logs_df.loc[logs.index, col_equipo].astype(str)
+    logs = logs.sort_values(['id_equipamiento', 'socio_id', 'timestamp'])
+
+    # Sesionización vectorizada: nueva sesión al cambiar de equipo/socio/día o tras un hueco largo
+    ts = logs['timestamp'].to_numpy()
+    gap = np.diff(ts).astype('timedelta64[s]').astype(float) / 60
+    nueva_sesion = np.ones(len(logs), dtype=bool)
+    nueva_sesion[1:] = (
+        (logs['id_equipamiento'].to_numpy()[1:] != logs['id_equipamiento'].to_numpy()[:-1])
+        | (logs['socio_id'].to_numpy()[1:] != logs['socio_id'].to_numpy()[:-1])
+        | (logs['fecha'].to_numpy()[1:] != logs['fecha'].to_numpy()[:-1])
+        | (gap > GAP_SESION_MINUTOS)
+    )
+    logs['sesion'] = np.cumsum(nueva_sesion)
+
+    sesiones = logs.groupby('sesion').agg(
+        fecha=('fecha', 'first'),
+        id_equipamiento=('id_equipamiento', 'first'),
+        socio_id=('socio_id', 'first'),
+        inicio=('timestamp', 'min'),
+        fin=('timestamp', 'max'),
+        escaneos=('timestamp', 'size')
+    )
+    duracion = (sesiones['fin'] - sesiones['inicio']).dt.total_seconds().to_numpy() / 60
+    sesiones['minutos_uso'] = np.where(duracion > 0, duracion, DURACION_SESION_DEFECTO_MINUTOS)
+
+    diario = sesiones.groupby(['fecha', 'id_equipamiento']).agg(
+        escaneos=('escaneos', 'sum'),
+        sesiones=('minutos_uso', 'size'),
+        socios_unicos=('socio_id', 'nunique'),
+        minutos_uso=('minutos_uso', 'sum')
+    ).reset_index()
+
+    return diario[COLUMNAS_DIARIO], horario[COLUMNAS_HORARIO]
+
+
+def resumen_por_equipo(diario_df, dias=VENTANA_DIAS, hoy=None):
+    """
+    Métricas por equipo sobre la ventana de `dias`, con la misma forma que
+    espera clustering_equipos: uso diario, tiempo promedio y utilización
+    """
+    columnas = ['id_equipamiento', 'uso_diario_promedio', 'tiempo_promedio_minutos',
+                'utilizacion_porcentaje', 'socios_unicos_promedio']
+    if diario_df is None or diario_df.empty:
+        return pd.DataFrame(columns=columnas)
+
+    hoy = pd.Timestamp(hoy or datetime.now()).normalize()
+    ventana = diario_df[diario_df['fecha'] > hoy - timedelta(days=dias)]
+    if ventana.empty:
+        return pd.DataFrame(columns=columnas)
+
+    totales = ventana.groupby('id_equipamiento').agg(
+        sesiones=('sesiones', 'sum'),
+        minutos_uso=('minutos_uso', 'sum'),
+        socios_unicos=('socios_unicos', 'sum')
+    )
+    dias_ventana = max(ventana['fecha'].nunique(), 1)
+    sesiones = totales['sesiones'].to_numpy(dtype=float)
+    minutos = totales['minutos_uso'].to_numpy(dtype=float)
+
+    return pd.DataFrame({
+        'id_equipamiento': totales.index.to_numpy(),
+        'uso_diario_promedio': sesiones / dias_ventana,
+        'tiempo_promedio_minutos': np.divide(minutos, sesiones, out=np.zeros_like(minutos), where=sesiones > 0),
+        'utilizacion_porcentaje': np.minimum(100, minutos / dias_ventana / (HORAS_OPERATIVAS * 60) * 100),
+        'socios_unicos_promedio': totales['socios_unicos'].to_numpy(dtype=float) / dias_ventana
+    })
+
+
+def patrones_uso(horario_df, dias=VENTANA_DIAS, hoy=None):
+    """Resumen de dispositivos y horas pico a partir del agregado horario"""
+    hoy = pd.Timestamp(hoy or datetime.now()).normalize()
+    ventana = horario_df[horario_df['fecha'] > hoy - timedelta(days=dias)] if horario_df is not None else None
+    if ventana is None or ventana.empty:
+        return None
+
+    por_dia = ventana.groupby('fecha')['escaneos'].sum()
+    por_hora = ventana.groupby('hora')['escaneos'].sum()
+    por_dispositivo = ventana.groupby('dispositivo')['escaneos'].sum()
+    socios_por_dia = ventana.groupby('fecha')['socios_unicos'].max()
+
+    return {
+        "analisis_dispositivos": {
+            "total_registros": int(por_dia.sum()),
+            "socios_unicos_promedio_diario": round(float(socios_por_dia.mean()), 2),
+            "distribucion_tipos": {str(k): int(v) for k, v in por_dispositivo.items()}
+        },
+        "patrones_uso": {
+            "horas_pico": {str(int(hora)): int(cantidad) for hora, cantidad in por_hora.nlargest(3).items()},
+            "promedio_diario": round(float(por_dia.mean()), 2),
+            "dias_con_actividad": int(por_dia.size)
+        }
+    }
+
+
+def _guardar_csv(df, ruta):
+    """Escritura atómica (archivo temporal + os.replace): otro worker nunca lee un CSV a medio escribir"""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        df.to_csv(temporal, index=False, date_format='%Y-%m-%d')
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def _leer_agregados_persistidos():
+    """Lee las tablas diarias persistidas (vacías si todavía no existen)"""
+    diario = pd.read_csv(USO_DIARIO_PATH, dtype={'id_equipamiento': str}) if os.path.exists(USO_DIARIO_PATH) \
+        else pd.DataFrame(columns=COLUMNAS_DIARIO)
+    horario = pd.read_csv(USO_HORARIO_PATH, dtype={'dispositivo': str}) if os.path.exists(USO_HORARIO_PATH) \
+        else pd.DataFrame(columns=COLUMNAS_HORARIO)
+    diario['fecha'] = pd.to_datetime(diario['fecha'])
+    horario['fecha'] = pd.to_datetime(horario['fecha'])
+    return diario, horario
+
+
+def _agregados_simulados():
+    """Sin Supabase: se agregan logs simulados en memoria, sin persistir"""
+    from models.clustering_equipos import generar_logs_simulados
+
+    diario, horario = agregar_uso_diario(generar_logs_simulados(), simulado=True)
+    return {"diario": diario, "horario": horario, "fuente": "Logs simulados (fallback)"}
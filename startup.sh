@@ -10,6 +10,11 @@ echo "📋 Python version: $(python --version)"
 echo "📦 Verificando dependencias..."
 python -c "import fastapi, pandas, sklearn; print('✅ Dependencias OK')"
 
-# Ejecutar aplicación
+# Ejecutar aplicación: gunicorn con WEB_CONCURRENCY workers si está disponible,
+# si no un único proceso uvicorn
 echo "🏃 Ejecutando aplicación..."
+if command -v gunicorn >/dev/null 2>&1; then
+    echo "👷 Workers: ${WEB_CONCURRENCY:-auto}"
+    exec gunicorn -c gunicorn.conf.py main:app
+fi
 exec python main.py
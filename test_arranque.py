@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Presupuesto de arranque del microservicio
+
+Verifica que `import main` (lo que hace uvicorn/gunicorn antes de abrir el puerto)
+se mantenga por debajo del presupuesto y no cargue dependencias pesadas, que se
+importan dentro de los endpoints.
+
+Uso:
+    python test_arranque.py
+    ARRANQUE_PRESUPUESTO_MS=1500 python test_arranque.py
+"""
+
+import os
+import sys
+
+from benchmarks.reporte_importtime import DEPENDENCIAS_PESADAS, medir_imports
+
+PRESUPUESTO_MS = float(os.environ.get("ARRANQUE_PRESUPUESTO_MS", 1000))
+INTENTOS = 3
+
+
+def main():
+    print("🚀 Presupuesto de arranque: import main")
+
+    # Mejor de varios intentos: el primero puede pagar caché de disco frío
+    mejores = []
+    for _ in range(INTENTOS):
+        registros = medir_imports("main")
+        total_ms = next(acumulado for nombre, _, acumulado, _ in registros if nombre == "main") / 1000
+        mejores.append((total_ms, registros))
+    total_ms, registros = min(mejores, key=lambda m: m[0])
+
+    cargados = {nombre.split(".")[0] for nombre, *_ in registros}
+    pesadas = [dep for dep in DEPENDENCIAS_PESADAS if dep in cargados]
+
+    exito = True
+    if total_ms <= PRESUPUESTO_MS:
+        print(f"   ✅ import main: {total_ms:.0f} ms (presupuesto {PRESUPUESTO_MS:.0f} ms)")
+    else:
+        print(f"   ❌ import main: {total_ms:.0f} ms supera el presupuesto de {PRESUPUESTO_MS:.0f} ms")
+        print("      Ver detalle con: python benchmarks/reporte_importtime.py main")
+        exito = False
+
+    if not pesadas:
+        print("   ✅ Sin dependencias pesadas al arrancar")
+    else:
+        print(f"   ❌ Dependencias pesadas importadas al arrancar: {', '.join(pesadas)}")
+        exito = False
+
+    return 0 if exito else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
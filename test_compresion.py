@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Cache de respuestas por ETag y de cuerpos comprimidos
+
+Verifica que pedidos repetidos a una ruta con ETag, sin If-None-Match, no
+vuelvan a ejecutar el endpoint ni a comprimir el cuerpo aunque el payload lleve
+un timestamp, y que un cambio de versión de los datos sí lo recalcule.
+
+Uso:
+    python test_compresion.py
+"""
+
+import json
+import re
+import sys
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import utils.cache_http as cache_http
+import utils.compresion as compresion
+from utils.cache_http import CacheRespuestas, ETagMiddleware
+from utils.compresion import CompresionMiddleware
+
+RUTA = "/api/admin/metricas/prueba"
+
+
+def crear_cliente():
+    """App mínima con el mismo orden de middlewares que main.py (compresión por fuera)"""
+    app = FastAPI()
+    app.state.ejecuciones = 0
+
+    @app.get(RUTA)
+    def endpoint():
+        app.state.ejecuciones += 1
+        return {"timestamp": datetime.now().isoformat(), "datos": [{"socio": i, "riesgo": "alto"} for i in range(300)]}
+
+    cache = CacheRespuestas(maximo=8)
+    app.add_middleware(ETagMiddleware, cache=cache)
+    app.add_middleware(CompresionMiddleware)
+    return TestClient(app), app
+
+
+def contar_compresiones():
+    original = compresion.comprimir
+    contador = {"llamadas": 0}
+
+    def comprimir(*args, **kwargs):
+        contador["llamadas"] += 1
+        return original(*args, **kwargs)
+
+    compresion.comprimir = comprimir
+    return contador, original
+
+
+def test_pedidos_repetidos_aciertan():
+    cliente, app = crear_cliente()
+    contador, original = contar_compresiones()
+    try:
+        respuestas = [cliente.get(RUTA, headers={"Accept-Encoding": "gzip"}) for _ in range(3)]
+        identidad = cliente.get(RUTA, headers={"Accept-Encoding": "identity"})
+    finally:
+        compresion.comprimir = original
+
+    assert all(r.status_code == 200 for r in respuestas)
+    assert all(r.headers["content-encoding"] == "gzip" for r in respuestas)
+    assert app.state.ejecuciones == 1
+    assert contador["llamadas"] == 1
+    assert len({r.headers["etag"] for r in respuestas}) == 1
+    assert json.loads(identidad.content) == respuestas[0].json()
+
+
+def test_nueva_version_recalcula():
+    cliente, app = crear_cliente()
+    primera = cliente.get(RUTA, headers={"Accept-Encoding": "gzip"})
+    # Simula un cambio en los datos de origen: otra huella para la misma ruta
+    cache_http._FUENTES_COMPILADAS.insert(0, (re.compile(f"^{RUTA}$"), (lambda: "otra-version",)))
+    try:
+        segunda = cliente.get(RUTA, headers={"Accept-Encoding": "gzip"})
+    finally:
+        cache_http._FUENTES_COMPILADAS.pop(0)
+
+    assert app.state.ejecuciones == 2
+    assert primera.headers["etag"] != segunda.headers["etag"]
+
+
+def test_perfilado_no_usa_cache():
+    cliente, app = crear_cliente()
+    cliente.get(RUTA)
+    # La app de prueba no monta PerfiladoMiddleware: solo importa que el pedido
+    # con X-Perfil ejecute el endpoint en vez de servirse desde la cache
+    cliente.get(RUTA, headers={"X-Perfil": "cpu"})
+    assert app.state.ejecuciones == 2
+
+
+def main():
+    print("🧪 Cache de respuestas por ETag y compresión")
+    exito = True
+    for prueba in (test_pedidos_repetidos_aciertan, test_nueva_version_recalcula, test_perfilado_no_usa_cache):
+        try:
+            prueba()
+            print(f"   ✅ {prueba.__name__}")
+        except Exception as e:
+            print(f"   ❌ {prueba.__name__}: {e!r}")
+            exito = False
+    return 0 if exito else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Extracción paginada de asistencia para el índice (utils/indice_asistencia.py)
+
+PostgREST corta cada respuesta en 1000 filas: con un cliente falso que respeta
+ese límite verifica que el índice se construya con todas las asistencias.
+
+Uso:
+    python test_indice_asistencia.py
+"""
+
+import sys
+
+import utils.db as db
+from utils.indice_asistencia import IndiceAsistencia, TAMANIO_PAGINA, extraer_asistencia
+
+FILAS = 2 * TAMANIO_PAGINA + 345
+
+
+class ConsultaFalsa:
+    """Imita el query builder de supabase-py: order()/range() encadenables y execute()"""
+
+    def __init__(self, filas, limite_servidor=1000):
+        self.filas = filas
+        self.limite_servidor = limite_servidor
+        self.orden = []
+        self.rango = None
+
+    def select(self, columnas):
+        return self
+
+    def order(self, columna):
+        self.orden.append(columna)
+        return self
+
+    def range(self, inicio, fin):
+        self.rango = (inicio, fin)
+        return self
+
+    def execute(self):
+        filas = sorted(self.filas, key=lambda fila: tuple(fila[c] for c in self.orden))
+        inicio, fin = self.rango or (0, len(filas) - 1)
+        fin = min(fin, inicio + self.limite_servidor - 1)
+        return type("Respuesta", (), {"data": filas[inicio:fin + 1]})()
+
+
+class ClienteFalso:
+    def __init__(self, filas):
+        self.filas = filas
+        self.consultas = 0
+
+    def table(self, nombre):
+        assert nombre == "asistencia"
+        self.consultas += 1
+        return ConsultaFalsa(self.filas)
+
+
+def filas_asistencia(n):
+    return [
+        {"socio_id": f"socio-{i % 400}", "fecha": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}"}
+        for i in range(n)
+    ]
+
+
+def test_extrae_mas_de_una_pagina():
+    cliente = ClienteFalso(filas_asistencia(FILAS))
+    original = db.get_supabase_client
+    db.get_supabase_client = lambda: cliente
+    try:
+        datos, fuente = extraer_asistencia()
+    finally:
+        db.get_supabase_client = original
+
+    assert fuente == "Supabase"
+    assert len(datos) == FILAS
+    assert cliente.consultas == FILAS // TAMANIO_PAGINA + 1
+    # Filas todas distintas: un duplicado indicaría páginas solapadas
+    assert not datos.duplicated(["socio_id", "fecha"]).any()
+
+
+def test_indice_cuenta_todas_las_visitas():
+    cliente = ClienteFalso(filas_asistencia(FILAS))
+    original = db.get_supabase_client
+    db.get_supabase_client = lambda: cliente
+    try:
+        datos, fuente = extraer_asistencia()
+    finally:
+        db.get_supabase_client = original
+
+    indice = IndiceAsistencia.desde_asistencia(datos, fuente)
+    assert len(indice.dias) == FILAS
+
+
+def main():
+    print("🧪 Extracción paginada de asistencia")
+    exito = True
+    for prueba in (test_extrae_mas_de_una_pagina, test_indice_cuenta_todas_las_visitas):
+        try:
+            prueba()
+            print(f"   ✅ {prueba.__name__}")
+        except Exception as e:
+            print(f"   ❌ {prueba.__name__}: {e!r}")
+            exito = False
+    return 0 if exito else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
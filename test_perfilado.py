@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Perfilado bajo demanda con varios modelos por request
+
+Verifica que X-Perfil-Archivo liste los perfiles de todas las llamadas a
+ejecutar_modelo() del request y que un request perfilado ejecute el endpoint
+aunque su If-None-Match coincida con el ETag.
+
+Uso:
+    python test_perfilado.py
+"""
+
+import shutil
+import sys
+import tempfile
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import utils.perfilado as perfilado
+from utils.cache_http import CacheRespuestas, ETagMiddleware
+from utils.metricas import ejecutar_modelo
+from utils.perfilado import PerfiladoMiddleware
+
+RUTA = "/api/admin/metricas/prueba-perfil"
+TOKEN = "token-de-prueba"
+HEADERS_ADMIN = {"X-Perfil": "cpu", "X-Admin-Token": TOKEN}
+
+# Token y directorio propios: no depende del entorno ni escribe en output/perfiles
+perfilado.ADMIN_TOKEN = TOKEN
+perfilado.PERFILES_DIR = tempfile.mkdtemp(prefix="perfiles_")
+
+
+def modelo_a():
+    return sum(range(1000))
+
+
+def modelo_b():
+    return sorted(range(1000), reverse=True)[0]
+
+
+def crear_cliente():
+    """Mismo orden que main.py: ETag por fuera del perfilado"""
+    app = FastAPI()
+    app.state.ejecuciones = 0
+
+    @app.get(RUTA)
+    async def endpoint():
+        app.state.ejecuciones += 1
+        return {"a": await ejecutar_modelo(modelo_a), "b": await ejecutar_modelo(modelo_b)}
+
+    app.add_middleware(PerfiladoMiddleware)
+    app.add_middleware(ETagMiddleware, cache=CacheRespuestas(maximo=8))
+    return TestClient(app), app
+
+
+def test_header_lista_todos_los_perfiles():
+    cliente, _ = crear_cliente()
+    respuesta = cliente.get(RUTA, headers=HEADERS_ADMIN)
+    archivos = respuesta.headers["x-perfil-archivo"].split(", ")
+    assert len(archivos) == 2
+    assert "modelo_a" in archivos[0] and "modelo_b" in archivos[1]
+    assert all(perfilado.ruta_perfil(nombre) for nombre in archivos)
+
+
+def test_perfil_ignora_etag():
+    cliente, app = crear_cliente()
+    etag = cliente.get(RUTA).headers["etag"]
+    assert cliente.get(RUTA, headers={"If-None-Match": etag}).status_code == 304
+    respuesta = cliente.get(RUTA, headers={**HEADERS_ADMIN, "If-None-Match": etag})
+    assert respuesta.status_code == 200 and "x-perfil-archivo" in respuesta.headers
+    assert app.state.ejecuciones == 2
+
+
+def main():
+    print("🧪 Perfilado bajo demanda")
+    exito = True
+    for prueba in (test_header_lista_todos_los_perfiles, test_perfil_ignora_etag):
+        try:
+            prueba()
+            print(f"   ✅ {prueba.__name__}")
+        except Exception as e:
+            print(f"   ❌ {prueba.__name__}: {e!r}")
+            exito = False
+    shutil.rmtree(perfilado.PERFILES_DIR, ignore_errors=True)
+    return 0 if exito else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Casos borde de los t-digest de pagos (utils/tdigest.py)
+
+Verifica que la unión de digests vacíos (meses sin `dias_retraso`, o pagos
+sin esa columna) siga vacía en vez de fallar, y que el modelo de percentiles
+responda sin error en ese caso. También que la ingesta de pipeline_pagos sea
+incremental: pagina la extracción, no duplica pagos ya ingeridos y suma al mes
+que corresponde un pago cargado tarde con fecha de un mes anterior.
+
+Uso:
+    python test_tdigest.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import ia.data_science.Pipelines.pipeline_pagos as pipeline_pagos
+from utils.tdigest import CuantilesPagos, TDigest
+from models.percentiles_pagos import describir_digest
+
+
+def test_combinar_vacios():
+    union = TDigest().combinar(TDigest())
+    assert union.total == 0 and len(union.medias) == 0
+    assert np.isnan(union.cuantil(0.5))
+    assert union.histograma() == []
+
+
+def test_combinar_vacio_con_datos():
+    union = TDigest().combinar(TDigest.desde_valores([1, 2, 3]))
+    assert union.total == 3 and union.cuantil(0.5) == 2.0
+
+
+def test_union_sin_dias_retraso():
+    pagos = pd.DataFrame({"fecha_pago": ["2025-01-05", "2025-02-05"], "monto": [100.0, 200.0]})
+    cuantiles = CuantilesPagos().actualizar(pagos)
+    retraso = cuantiles.union("dias_retraso")
+    assert retraso.total == 0
+    assert describir_digest(retraso)["cantidad"] == 0
+    assert cuantiles.union("monto").total == 2
+
+
+class ConsultaPagos:
+    """Imita el query builder de supabase-py con el límite de 1000 filas de PostgREST"""
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.desde = None
+        self.rango = (0, len(filas) - 1)
+
+    def select(self, columnas):
+        return self
+
+    def gt(self, columna, valor):
+        self.desde = pd.Timestamp(valor)
+        return self
+
+    def order(self, columna):
+        return self
+
+    def range(self, inicio, fin):
+        self.rango = (inicio, min(fin, inicio + 999))
+        return self
+
+    def execute(self):
+        filas = sorted(self.filas, key=lambda fila: (fila["creado_en"], fila["id"]))
+        if self.desde is not None:
+            filas = [f for f in filas if pd.Timestamp(f["creado_en"], tz="UTC") > self.desde]
+        inicio, fin = self.rango
+        return type("Respuesta", (), {"data": filas[inicio:fin + 1]})()
+
+
+class ClientePagos:
+    def __init__(self, filas):
+        self.filas = filas
+
+    def table(self, nombre):
+        return ConsultaPagos(self.filas)
+
+
+def pago(i, fecha_pago, creado_en):
+    return {"id": f"pago-{i}", "socio_id": f"socio-{i % 50}", "fecha_pago": fecha_pago,
+            "fecha_vencimiento": fecha_pago, "monto_pagado": 100.0 + i % 7, "creado_en": creado_en}
+
+
+def test_pipeline_incremental():
+    directorio = tempfile.mkdtemp(prefix="pagos_")
+    ruta_cuantiles = os.path.join(directorio, "tdigest_pagos.npz")
+
+    class CuantilesTemporales(CuantilesPagos):
+        @classmethod
+        def cargar(cls, ruta=ruta_cuantiles):
+            return super().cargar(ruta)
+
+        def guardar(self, ruta=ruta_cuantiles):
+            return super().guardar(ruta)
+
+    originales = (pipeline_pagos.CSV_PATH, pipeline_pagos.DATA_LAKE_CSV, pipeline_pagos.CuantilesPagos)
+    pipeline_pagos.CSV_PATH = os.path.join(directorio, "pagos_supabase.csv")
+    pipeline_pagos.DATA_LAKE_CSV = directorio
+    pipeline_pagos.CuantilesPagos = CuantilesTemporales
+    try:
+        filas = [pago(i, f"2025-01-{1 + i % 28:02d}", f"2025-01-{1 + i % 28:02d}T10:00:{i % 60:02d}.{i:06d}")
+                 for i in range(2500)]
+        cliente = ClientePagos(filas)
+        assert len(pipeline_pagos.run(cliente=cliente)) == 2500
+
+        # Re-ingerir sin pagos nuevos no duplica nada
+        pipeline_pagos.run(cliente=cliente)
+        assert CuantilesTemporales.cargar().union("monto", "2025-01", "2025-01").total == 2500
+
+        # Se ingiere febrero y después llega un pago de enero cargado tarde, en marzo
+        filas.append(pago(9000, "2025-02-10", "2025-02-10T09:00:00"))
+        pipeline_pagos.run(cliente=cliente)
+        filas.append(pago(9001, "2025-01-20", "2025-03-05T12:00:00"))
+        pagos_df = pipeline_pagos.run(cliente=cliente)
+
+        cuantiles = CuantilesTemporales.cargar()
+        assert len(pagos_df) == 2502
+        assert cuantiles.union("monto", "2025-01", "2025-01").total == 2501
+        assert cuantiles.union("monto", "2025-02", "2025-02").total == 1
+        assert pd.Timestamp(cuantiles.marca) == pd.Timestamp("2025-03-05T12:00:00", tz="UTC")
+    finally:
+        pipeline_pagos.CSV_PATH, pipeline_pagos.DATA_LAKE_CSV, pipeline_pagos.CuantilesPagos = originales
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def main():
+    print("🧪 Casos borde de t-digest")
+    exito = True
+    for prueba in (test_combinar_vacios, test_combinar_vacio_con_datos, test_union_sin_dias_retraso,
+                   test_pipeline_incremental):
+        try:
+            prueba()
+            print(f"   ✅ {prueba.__name__}")
+        except Exception as e:
+            print(f"   ❌ {prueba.__name__}: {e!r}")
+            exito = False
+    return 0 if exito else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+Bitsets diarios de socios activos
+---------------------------------
+
+Contar socios distintos en una ventana (DAU/WAU/MAU), comparar dos períodos o
+seguir una cohorte obligaba a reagrupar las asistencias crudas. Acá cada día
+es una fila de bits: el bit c está prendido si el socio con código c
+(utils/diccionario.py) asistió ese día, empaquetado con np.packbits (1 bit
+por socio: 300.000 socios ocupan ~37 KB por día).
+
+- Activos en [desde, hasta]: OR de las filas de la ventana + popcount.
+- Superposición entre períodos: AND de los dos OR.
+- Retención de cohortes: AND entre los nuevos de una semana y los activos de
+  las semanas siguientes.
+- Por gimnasio: matriz aparte con las asistencias hechas en ese gimnasio
+  (`por_gimnasio`), armada la primera vez que se pide.
+
+Se arma desde el índice de asistencia (utils/indice_asistencia.py) y se cachea
+mientras no cambie su versión.
+"""
+
+import threading
+import numpy as np
+
+from utils.logs import obtener_logger
+from utils.metricas import registrar_cache
+
+logger = obtener_logger(__name__)
+
+# Bits prendidos de cada byte (np.bitwise_count recién existe en NumPy 2)
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def contar_bits(bits, axis=None):
+    """Cantidad de bits prendidos de un array uint8 empaquetado"""
+    return POPCOUNT[bits].sum(axis=axis, dtype=np.int64)
+
+
+class ActividadDiaria:
+    """Matriz (días x socios/8) de bits con los socios que asistieron cada día"""
+
+    def __init__(self, bits, dia_inicial, primera_visita, gimnasios, version=None, indice=None):
+        self.bits = bits
+        self.dia_inicial = int(dia_inicial)
+        self.primera_visita = primera_visita
+        self.gimnasios = gimnasios
+        self.version = version
+        self.n_socios = len(primera_visita)
+        self._indice = indice
+        self._por_gimnasio = {}
+        self._por_gimnasio_lock = threading.Lock()
+
+    @classmethod
+    def desde_indice(cls, indice, gimnasio=None):
+        """Bitsets de todas las asistencias del índice o solo de las hechas en la posición `gimnasio`"""
+        n_socios = len(indice.offsets) - 1
+        codigos = np.repeat(np.arange(n_socios, dtype=np.int64), np.diff(indice.offsets))
+        dias = indice.dias
+        if gimnasio is not None:
+            en_gimnasio = indice.gimnasio_visita == gimnasio
+            codigos, dias = codigos[en_gimnasio], dias[en_gimnasio]
+        n_bytes = (n_socios + 7) // 8
+
+        if len(dias) == 0:
+            bits = np.zeros((0, n_bytes), dtype=np.uint8)
+            dia_inicial = 0
+        else:
+            dia_inicial = int(dias.min())
+            filas = dias.astype(np.int64) - dia_inicial
+            bits = np.zeros((int(filas.max()) + 1, n_bytes), dtype=np.uint8)
+            # Mismo orden de bits que np.packbits (el primero es el más significativo)
+            mascaras = (np.uint8(0x80) >> (codigos & 7).astype(np.uint8)).astype(np.uint8)
+            np.bitwise_or.at(bits.reshape(-1), filas * n_bytes + (codigos >> 3), mascaras)
+
+        # Las asistencias del índice están ordenadas por socio y fecha: la primera de cada socio es su primera visita
+        primera_visita = np.full(n_socios, np.iinfo(np.int32).max, dtype=np.int32)
+        primera = np.r_[True, codigos[1:] != codigos[:-1]] if len(codigos) else np.empty(0, dtype=bool)
+        primera_visita[codigos[primera]] = dias[primera]
+        return cls(bits, dia_inicial, primera_visita, indice.gimnasios, indice.version, indice)
+
+    def por_gimnasio(self, gimnasio=None):
+        """
+        Bitsets solo con las asistencias hechas en el gimnasio (cada asistencia
+        cuenta en el gimnasio donde ocurrió, no en el último del socio); self si
+        no se filtra. Se arman la primera vez que se piden y quedan cacheados.
+        """
+        if gimnasio is None:
+            return self
+        posiciones = np.flatnonzero(self.gimnasios == gimnasio)
+        posicion = int(posiciones[0]) if len(posiciones) else None
+        with self._por_gimnasio_lock:
+            actividad = self._por_gimnasio.get(posicion)
+            if actividad is None:
+                if posicion is None:
+                    actividad = ActividadDiaria(np.zeros((0, self.bits.shape[1]), dtype=np.uint8), 0,
+                                                np.full(self.n_socios, np.iinfo(np.int32).max, dtype=np.int32),
+                                                self.gimnasios, self.version)
+                else:
+                    actividad = ActividadDiaria.desde_indice(self._indice, posicion)
+                self._por_gimnasio[posicion] = actividad
+            return actividad
+
+    @property
+    def dia_final(self):
+        return self.dia_inicial + len(self.bits) - 1
+
+    def _filas(self, desde, hasta):
+        """Filas de la matriz para los días [desde, hasta] (recortadas al rango con datos)"""
+        return max(desde - self.dia_inicial, 0), max(min(hasta, self.dia_final) - self.dia_inicial + 1, 0)
+
+    def activos(self, desde, hasta, mascara=None) -> np.ndarray:
+        """Bits de los socios con al menos una asistencia en [desde, hasta]"""
+        inicio, fin = self._filas(desde, hasta)
+        if fin <= inicio:
+            resultado = np.zeros(self.bits.shape[1], dtype=np.uint8)
+        else:
+            resultado = np.bitwise_or.reduce(self.bits[inicio:fin], axis=0)
+        return resultado & mascara if mascara is not None else resultado
+
+    def cantidad_activos(self, desde, hasta, mascara=None) -> int:
+        return int(contar_bits(self.activos(desde, hasta, mascara)))
+
+    def serie_diaria(self, desde, hasta, mascara=None) -> np.ndarray:
+        """Socios distintos por día en [desde, hasta] (0 en días sin datos)"""
+        serie = np.zeros(hasta - desde + 1, dtype=np.int64)
+        inicio, fin = self._filas(desde, hasta)
+        if fin > inicio:
+            filas = self.bits[inicio:fin] if mascara is None else self.bits[inicio:fin] & mascara
+            desplazamiento = self.dia_inicial + inicio - desde
+            serie[desplazamiento:desplazamiento + fin - inicio] = contar_bits(filas, axis=1)
+        return serie
+
+    def superposicion(self, periodo_a, periodo_b, mascara=None) -> dict:
+        """Socios activos en cada período, en ambos y en alguno (períodos = (desde, hasta) en días)"""
+        a = self.activos(*periodo_a, mascara)
+        b = self.activos(*periodo_b, mascara)
+        en_a, en_b = int(contar_bits(a)), int(contar_bits(b))
+        en_ambos, en_alguno = int(contar_bits(a & b)), int(contar_bits(a | b))
+        return {
+            "activos_periodo_a": en_a,
+            "activos_periodo_b": en_b,
+            "activos_en_ambos": en_ambos,
+            "activos_en_alguno": en_alguno,
+            "jaccard": round(en_ambos / en_alguno, 4) if en_alguno else 0.0,
+            # Socios de A que siguen activos en B
+            "retenidos_de_a": round(en_ambos / en_a, 4) if en_a else 0.0
+        }
+
+    def nuevos(self, desde, hasta, mascara=None) -> np.ndarray:
+        """Bits de los socios cuya primera asistencia cae en [desde, hasta]"""
+        bits = np.packbits((self.primera_visita >= desde) & (self.primera_visita <= hasta))
+        return bits & mascara if mascara is not None else bits
+
+    def retencion_cohortes(self, inicio_semanas, semanas, mascara=None) -> list:
+        """
+        Cohortes semanales: socios nuevos de cada semana (lunes en `inicio_semanas`)
+        y el % de ellos activos en cada semana siguiente hasta la última disponible.
+        """
+        activos_semana = [self.activos(lunes, lunes + 6, mascara) for lunes in inicio_semanas]
+        cohortes = []
+        for i, lunes in enumerate(inicio_semanas):
+            cohorte = self.nuevos(lunes, lunes + 6, mascara)
+            tamanio = int(contar_bits(cohorte))
+            retencion = [
+                round(int(contar_bits(cohorte & activos)) / tamanio * 100, 2) if tamanio else 0.0
+                for activos in activos_semana[i + 1:i + 1 + semanas]
+            ]
+            cohortes.append({"inicio": lunes, "socios_nuevos": tamanio, "retencion_por_semana": retencion})
+        return cohortes
+
+
+_actividad = None
+_actividad_lock = threading.Lock()
+
+
+def obtener_actividad(indice) -> ActividadDiaria:
+    """Bitsets del índice de asistencia vigente (se reconstruyen solo si cambia su versión)"""
+    global _actividad
+    with _actividad_lock:
+        vigente = _actividad is not None and _actividad.version == indice.version
+        registrar_cache("actividad_diaria", vigente)
+        if not vigente:
+            _actividad = ActividadDiaria.desde_indice(indice)
+            logger.debug("Bitsets de actividad diaria construidos", extra={
+                "dias": len(_actividad.bits), "socios": _actividad.n_socios, "bytes": _actividad.bits.nbytes
+            })
+        return _actividad
@@ -0,0 +1,271 @@
+"""
+Cache compartido entre workers
+------------------------------
+
+Con gunicorn (varios procesos, ver gunicorn.conf.py) cada worker tiene su propia
+memoria: sin un cache común cada uno descargaría y calcularía su propio snapshot.
+Este módulo guarda valores (DataFrames, dicts...) serializados con pickle en un
+backend visible por todos los procesos:
+
+- "disco" (por defecto): un archivo por clave en CACHE_DIR. La escritura es
+  atómica (archivo temporal + os.replace), así un worker nunca lee un valor a
+  medio escribir. Sirve para todos los workers de una misma máquina/contenedor.
+- "redis": cualquier servidor compatible con Redis (REDIS_URL). Necesita el
+  paquete `redis`; se puede pasar un cliente compatible (ej. fakeredis) para pruebas.
+- "memoria": solo el proceso actual (un único worker / desarrollo).
+
+Uso:
+
+    cache = obtener_cache()
+    valor = cache.obtener("snapshot_equipamiento")
+    if valor is None:
+        with cache.bloqueo("snapshot_equipamiento"):
+            valor = cache.obtener("snapshot_equipamiento") or calcular()
+            cache.guardar("snapshot_equipamiento", valor, ttl=300)
+
+`bloqueo()` evita que varios workers recalculen lo mismo a la vez.
+"""
+
+import os
+import time
+import pickle
+import hashlib
+import tempfile
+import threading
+from contextlib import ExitStack, contextmanager
+
+from utils.logs import obtener_logger
+from utils.metricas import registrar_cache
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = obtener_logger(__name__)
+
+REDIS_URL = os.environ.get("REDIS_URL")
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "redis" if REDIS_URL else "disco")
+CACHE_DIR = os.environ.get("CACHE_DIR", os.path.join(tempfile.gettempdir(), "gymmaster_cache"))
+CACHE_PREFIJO = os.environ.get("CACHE_PREFIJO", "gymmaster:")
+# Tiempo máximo esperando el bloqueo de otro worker antes de calcular igual
+BLOQUEO_TIMEOUT_SEGUNDOS = int(os.environ.get("CACHE_BLOQUEO_TIMEOUT", 120))
+
+
+class CacheMemoria:
+    """Cache del proceso actual (mismo contrato que los backends compartidos)"""
+
+    nombre = "memoria"
+
+    def __init__(self):
+        self._valores = {}
+        self._lock = threading.Lock()
+        self._bloqueos = {}
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._valores.get(clave)
+            if entrada is None or (entrada[0] is not None and entrada[0] < time.time()):
+                return None
+            return entrada[1]
+
+    def guardar(self, clave, valor, ttl=None):
+        with self._lock:
+            self._valores[clave] = (time.time() + ttl if ttl else None, valor)
+
+    def borrar(self, clave):
+        with self._lock:
+            self._valores.pop(clave, None)
+
+    @contextmanager
+    def bloqueo(self, clave, timeout=BLOQUEO_TIMEOUT_SEGUNDOS):
+        with self._lock:
+            lock = self._bloqueos.setdefault(clave, threading.Lock())
+        adquirido = lock.acquire(timeout=timeout)
+        try:
+            yield
+        finally:
+            if adquirido:
+                lock.release()
+
+
+class CacheDisco:
+    """Un archivo pickle por clave en `directorio`; escrituras atómicas con os.replace"""
+
+    nombre = "disco"
+
+    def __init__(self, directorio=CACHE_DIR):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+        # flock no excluye hilos del mismo proceso que comparten el archivo: lock local además
+        self._locales = {}
+        self._locales_lock = threading.Lock()
+
+    def _ruta(self, clave, extension="pkl"):
+        nombre = hashlib.sha256(clave.encode()).hexdigest()[:32]
+        return os.path.join(self.directorio, f"{nombre}.{extension}")
+
+    def obtener(self, clave):
+        try:
+            with open(self._ruta(clave), "rb") as f:
+                expira_en, valor = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Entrada de cache ilegible", extra={"clave": clave, "error": e})
+            return None
+        if expira_en is not None and expira_en < time.time():
+            return None
+        return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        ruta = self._ruta(clave)
+        descriptor, temporal = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                pickle.dump((time.time() + ttl if ttl else None, valor), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, ruta)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+    def borrar(self, clave):
+        try:
+            os.remove(self._ruta(clave))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def bloqueo(self, clave, timeout=BLOQUEO_TIMEOUT_SEGUNDOS):
+        with self._locales_lock:
+            local = self._locales.setdefault(clave, threading.Lock())
+        if not local.acquire(timeout=timeout):
+            yield
+            return
+        try:
+            if fcntl is None:
+                yield
+                return
+            with open(self._ruta(clave, "lock"), "a+") as archivo:
+                limite = time.monotonic() + timeout
+                adquirido = False
+                while not adquirido:
+                    try:
+                        fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        adquirido = True
+                    except BlockingIOError:
+                        if time.monotonic() >= limite:
+                            break
+                        time.sleep(0.05)
+                try:
+                    yield
+                finally:
+                    if adquirido:
+                        fcntl.flock(archivo, fcntl.LOCK_UN)
+        finally:
+            local.release()
+
+
+class CacheRedis:
+    """Backend sobre un servidor compatible con Redis (o un cliente con la misma API)"""
+
+    nombre = "redis"
+
+    def __init__(self, url=REDIS_URL, cliente=None, prefijo=CACHE_PREFIJO):
+        if cliente is None:
+            import redis
+            cliente = redis.Redis.from_url(url)
+        self.cliente = cliente
+        self.prefijo = prefijo
+
+    def obtener(self, clave):
+        datos = self.cliente.get(self.prefijo + clave)
+        return pickle.loads(datos) if datos is not None else None
+
+    def guardar(self, clave, valor, ttl=None):
+        datos = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        self.cliente.set(self.prefijo + clave, datos, ex=int(ttl) if ttl else None)
+
+    def borrar(self, clave):
+        self.cliente.delete(self.prefijo + clave)
+
+    @contextmanager
+    def bloqueo(self, clave, timeout=BLOQUEO_TIMEOUT_SEGUNDOS):
+        lock = self.cliente.lock(self.prefijo + "lock:" + clave, timeout=timeout, blocking_timeout=timeout)
+        adquirido = lock.acquire()
+        try:
+            yield
+        finally:
+            if adquirido:
+                try:
+                    lock.release()
+                except Exception:
+                    pass  # expiró mientras se calculaba
+
+
+class CacheMedido:
+    """Envuelve un backend: registra aciertos/fallos y nunca propaga errores del backend"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.nombre = backend.nombre
+
+    def obtener(self, clave):
+        try:
+            valor = self.backend.obtener(clave)
+        except Exception as e:
+            logger.warning("Error leyendo cache compartido", extra={"backend": self.nombre, "clave": clave, "error": e})
+            valor = None
+        registrar_cache(f"compartido_{self.nombre}", valor is not None)
+        return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        try:
+            self.backend.guardar(clave, valor, ttl)
+        except Exception as e:
+            logger.warning("Error escribiendo cache compartido", extra={"backend": self.nombre, "clave": clave, "error": e})
+
+    def borrar(self, clave):
+        try:
+            self.backend.borrar(clave)
+        except Exception as e:
+            logger.warning("Error borrando cache compartido", extra={"backend": self.nombre, "clave": clave, "error": e})
+
+    @contextmanager
+    def bloqueo(self, clave, timeout=BLOQUEO_TIMEOUT_SEGUNDOS):
+        with ExitStack() as pila:
+            try:
+                pila.enter_context(self.backend.bloqueo(clave, timeout))
+            except Exception as e:
+                logger.warning("No se pudo tomar el bloqueo del cache", extra={"backend": self.nombre, "clave": clave, "error": e})
+            yield
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def crear_cache(backend=CACHE_BACKEND):
+    """Instancia el backend pedido; si no está disponible cae a disco y luego a memoria"""
+    try:
+        if backend == "redis":
+            return CacheMedido(CacheRedis())
+        if backend == "memoria":
+            return CacheMedido(CacheMemoria())
+        return CacheMedido(CacheDisco())
+    except Exception as e:
+        logger.warning("Backend de cache no disponible", extra={"backend": backend, "error": e})
+        if backend == "redis":
+            return crear_cache("disco")
+        return CacheMedido(CacheMemoria())
+
+
+def obtener_cache():
+    """Cache compartido del proceso (se crea en el primer uso)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = crear_cache()
+    return _cache
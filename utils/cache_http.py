@@ -0,0 +1,261 @@
+"""
+ETag / If-None-Match y Cache-Control
+------------------------------------
+
+Los dashboards consultan `/api/admin/metricas/*` cada pocos segundos aunque los
+datos de origen (CSV del Data Lake, snapshot de equipamiento, catálogo de
+ejercicios) cambien pocas veces al día.
+
+`ETagMiddleware` calcula, ANTES de ejecutar el endpoint (en el threadpool, no en
+el event loop), una huella de los datos de los que depende la ruta. Si coincide
+con el If-None-Match del cliente responde 304 sin ejecutar el modelo ni
+serializar el payload; si no, agrega ETag y Cache-Control a la respuesta 200.
+
+Las huellas incluyen una ventana de tiempo (ETAG_VENTANA segundos) porque varios
+modelos leen además Supabase en vivo: como mucho cada ventana el contenido se
+vuelve a calcular aunque los archivos locales no hayan cambiado.
+
+Los 200 de GET se guardan además (LRU de ETAG_RESPUESTAS_MAX entradas) por
+(ruta, query, ETag): mientras la huella no cambie, otro cliente sin el ETag
+recibe los mismos bytes sin volver a ejecutar el modelo, y CompresionMiddleware
+comprime cada versión una sola vez por encoding (ver RespuestaCacheada). El
+`timestamp` del payload es por lo tanto el del cálculo de esa versión de los
+datos, igual que lo que ya ve un cliente que recibe 304.
+"""
+
+import os
+import re
+import glob
+import hashlib
+import time
+import threading
+from collections import OrderedDict
+
+from starlette.concurrency import run_in_threadpool
+
+from utils.logs import obtener_logger
+from utils.metricas import registrar_cache
+
+logger = obtener_logger(__name__)
+
+ETAG_VENTANA_SEGUNDOS = int(os.environ.get("ETAG_VENTANA", 300))
+CACHE_CONTROL = os.environ.get("HTTP_CACHE_CONTROL", "private, no-cache")
+RESPUESTAS_MAX = int(os.environ.get("ETAG_RESPUESTAS_MAX", 128))
+RESPUESTA_MAX_BYTES = int(os.environ.get("ETAG_RESPUESTA_MAX_BYTES", 4 * 1024 * 1024))
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+DATA_LAKE_CSV = os.path.join(PROJECT_ROOT, 'ia', 'Data_Lake_CSV')
+
+
+def huella_archivos(patron=os.path.join(DATA_LAKE_CSV, '*.csv')):
+    """Nombre, tamaño y mtime de los archivos (no se leen los contenidos)"""
+    partes = []
+    for ruta in sorted(glob.glob(patron)):
+        try:
+            estado = os.stat(ruta)
+        except OSError:
+            continue
+        partes.append(f"{os.path.basename(ruta)}:{estado.st_size}:{estado.st_mtime_ns}")
+    return "|".join(partes)
+
+
+def huella_equipamiento():
+    """Versión del snapshot compartido de equipamiento/mantenimiento"""
+    from utils.snapshot_equipamiento import obtener_snapshot
+    return obtener_snapshot()["version"]
+
+
+def huella_rutina_socio(id_socio):
+    """
+    Versión del catálogo de ejercicios + semana ISO actual (la rutina por defecto
+    depende de ella) + perfil del socio: un cambio de objetivo, nivel o días invalida el ETag
+    """
+    from models.rutinas import cargar_catalogo, semana_iso, obtener_perfil_socio, huella_perfil
+    return f"{cargar_catalogo()['version']}:{semana_iso()}:{huella_perfil(obtener_perfil_socio(id_socio))}"
+
+
+def huella_indice_asistencia():
+    """Versión del índice de asistencia por socio + fecha (dias_sin_asistir cambia cada día)"""
+    from utils.indice_asistencia import obtener_indice
+    return f"{obtener_indice().version}:{time.strftime('%Y-%m-%d')}"
+
+
+def huella_cuantiles_pagos():
+    """mtime de los t-digest de pagos y de los CSV de pagos de respaldo"""
+    from utils.tdigest import huella_cuantiles
+    return str(huella_cuantiles())
+
+
+def ventana_actual():
+    return str(int(time.time() // ETAG_VENTANA_SEGUNDOS)) if ETAG_VENTANA_SEGUNDOS > 0 else "0"
+
+
+# Ruta (regex) → fuentes de datos de las que depende su respuesta. La primera que coincide gana.
+# Los grupos con nombre de la regex se pasan como argumentos a cada fuente.
+FUENTES_POR_RUTA = [
+    (r"^/api/admin/metricas/equipamiento/", (huella_equipamiento, ventana_actual)),
+    (r"^/ranking-equipos$", (huella_equipamiento, huella_archivos, ventana_actual)),
+    (r"^/api/socios/(?P<id_socio>[^/]+)/rutina$", (huella_rutina_socio,)),
+    (r"^/api/socios/[^/]+/asistencia$", (huella_indice_asistencia,)),
+    (r"^/api/admin/metricas/asistencia/(top-inactivos|distribucion-riesgo|actividad)$", (huella_indice_asistencia, huella_archivos)),
+    (r"^/api/admin/metricas/pagos/percentiles$", (huella_cuantiles_pagos,)),
+    (r"^/api/admin/metricas/", (huella_archivos, ventana_actual)),
+    (r"^/(prediccion-asistencia|proyeccion-ingresos|segmentacion-socios|analisis-churn)$",
+     (huella_archivos, ventana_actual)),
+]
+_FUENTES_COMPILADAS = [(re.compile(patron), fuentes) for patron, fuentes in FUENTES_POR_RUTA]
+
+
+def calcular_etag(path, query_string=b""):
+    """
+    ETag débil de la ruta o None si la ruta no participa del cacheo.
+    Es débil (W/) porque el payload incluye timestamps que cambian en cada cálculo:
+    dos respuestas con el mismo ETag son equivalentes, no idénticas byte a byte.
+    """
+    for patron, fuentes in _FUENTES_COMPILADAS:
+        coincidencia = patron.match(path)
+        if coincidencia:
+            huella = hashlib.sha256()
+            huella.update(path.encode())
+            huella.update(b"?" + query_string)
+            for fuente in fuentes:
+                huella.update(b"\x00" + str(fuente(**coincidencia.groupdict())).encode())
+            return f'W/"{huella.hexdigest()[:20]}"'
+    return None
+
+
+def etag_coincide(if_none_match, etag):
+    """If-None-Match puede traer varios ETags separados por coma o '*'"""
+    if not if_none_match:
+        return False
+    candidatos = [valor.strip() for valor in if_none_match.split(",")]
+    # La comparación débil ignora el prefijo W/
+    return "*" in candidatos or etag.removeprefix("W/") in [c.removeprefix("W/") for c in candidatos]
+
+
+class RespuestaCacheada:
+    """
+    Respuesta 200 de una versión de los datos: headers, cuerpo sin comprimir y sus
+    variantes comprimidas por (encoding, nivel), que completa CompresionMiddleware
+    """
+
+    __slots__ = ("headers", "cuerpo", "comprimidos")
+
+    def __init__(self, headers, cuerpo):
+        self.headers = headers
+        self.cuerpo = cuerpo
+        self.comprimidos = {}
+
+
+class CacheRespuestas:
+    """LRU de RespuestaCacheada por (ruta, query, ETag)"""
+
+    def __init__(self, maximo=RESPUESTAS_MAX):
+        self.maximo = maximo
+        self._respuestas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            respuesta = self._respuestas.get(clave)
+            registrar_cache("respuestas_etag", respuesta is not None)
+            if respuesta is not None:
+                self._respuestas.move_to_end(clave)
+            return respuesta
+
+    def guardar(self, clave, respuesta):
+        if self.maximo <= 0:
+            return
+        with self._lock:
+            self._respuestas[clave] = respuesta
+            self._respuestas.move_to_end(clave)
+            while len(self._respuestas) > self.maximo:
+                self._respuestas.popitem(last=False)
+
+
+cache_respuestas = CacheRespuestas()
+
+
+class ETagMiddleware:
+    """
+    Middleware ASGI: 304 si la huella de datos no cambió; ETag + Cache-Control en los 200,
+    que se guardan por ETag para reenviarlos sin ejecutar el endpoint
+    """
+
+    def __init__(self, app, cache_control=CACHE_CONTROL, cache=cache_respuestas):
+        self.app = app
+        self.cache_control = cache_control.encode()
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            # Las huellas pueden consultar Supabase o esperar el bloqueo de reconstrucción
+            # del índice: se calculan en el threadpool para no frenar el event loop
+            etag = await run_in_threadpool(calcular_etag, scope["path"], scope.get("query_string", b""))
+        except Exception as e:
+            logger.warning("Error calculando ETag", extra={"ruta": scope["path"], "error": e})
+            etag = None
+
+        if etag is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Los requests perfilados tienen que ejecutar el modelo: ni 304 ni respuesta cacheada
+        from utils.perfilado import modo_solicitado
+        perfilado = bool(modo_solicitado(scope))
+
+        scope.setdefault("state", {})["etag"] = etag
+        headers = dict(scope["headers"])
+        no_modificado = not perfilado and etag_coincide(headers.get(b"if-none-match", b"").decode("latin-1"), etag)
+        registrar_cache("etag", no_modificado)
+        if no_modificado:
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", etag.encode()), (b"cache-control", self.cache_control)]
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        cacheable = scope["method"] == "GET" and not perfilado
+        clave = (scope["path"], scope.get("query_string", b""), etag)
+        if cacheable:
+            respuesta = self.cache.obtener(clave)
+            if respuesta is not None:
+                scope["state"]["respuesta_etag"] = respuesta
+                await send({"type": "http.response.start", "status": 200, "headers": respuesta.headers})
+                await send({"type": "http.response.body", "body": respuesta.cuerpo})
+                return
+
+        inicio = None
+        partes = []
+
+        async def send_con_etag(message):
+            nonlocal inicio, cacheable
+            if message["type"] == "http.response.start":
+                if message["status"] == 200:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"etag", etag.encode()),
+                        (b"cache-control", self.cache_control)
+                    ]
+                else:
+                    cacheable = False
+                inicio = message
+            elif message["type"] == "http.response.body" and cacheable:
+                partes.append(message.get("body", b""))
+                if sum(len(parte) for parte in partes) > RESPUESTA_MAX_BYTES:
+                    cacheable = False
+                    partes.clear()
+                elif not message.get("more_body", False):
+                    # Se guarda antes de reenviar el cuerpo para que CompresionMiddleware
+                    # (más externo) pueda asociarle la variante comprimida
+                    respuesta = RespuestaCacheada(list(inicio["headers"]), b"".join(partes))
+                    self.cache.guardar(clave, respuesta)
+                    scope["state"]["respuesta_etag"] = respuesta
+            await send(message)
+
+        await self.app(scope, receive, send_con_etag)
@@ -0,0 +1,152 @@
+"""
+Compresión de respuestas (gzip / brotli)
+----------------------------------------
+
+Las respuestas analíticas son JSON muy repetitivo (recomendaciones, métricas
+anidadas) y comprimen 5-10x. `CompresionMiddleware`:
+
+- comprime solo si el cuerpo supera COMPRESION_MINIMO bytes y el cliente lo acepta;
+- usa brotli si está instalado y el cliente envía `br`, si no gzip;
+- permite fijar el nivel por ruta (NIVELES_POR_RUTA);
+- en las rutas con ETag guarda el cuerpo comprimido junto a la respuesta que
+  ETagMiddleware cachea para esa versión de los datos (RespuestaCacheada), por
+  (encoding, nivel): cada versión se comprime una sola vez. Hashear el cuerpo no
+  sirve como clave porque los timestamps del payload lo hacen único en cada cálculo.
+
+brotli es opcional (`pip install brotli`); sin él solo se ofrece gzip.
+"""
+
+import os
+import re
+import gzip
+
+from utils.metricas import registrar_cache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+COMPRESION_MINIMO_BYTES = int(os.environ.get("COMPRESION_MINIMO", 1024))
+NIVEL_GZIP_DEFECTO = int(os.environ.get("COMPRESION_NIVEL_GZIP", 6))
+NIVEL_BROTLI_DEFECTO = int(os.environ.get("COMPRESION_NIVEL_BROTLI", 5))
+
+# Ruta (regex) → niveles. Los payloads grandes que se sirven desde snapshot justifican
+# un nivel alto porque se comprimen una vez; los de cálculo en vivo priorizan latencia.
+NIVELES_POR_RUTA = [
+    (r"^/(ranking-equipos|proyeccion-ingresos)$", {"gzip": 9, "br": 9}),
+    (r"^/api/admin/metricas/equipamiento/", {"gzip": 9, "br": 9}),
+    (r"^/api/socios/[^/]+/rutina$", {"gzip": 5, "br": 4}),
+]
+_NIVELES_COMPILADOS = [(re.compile(patron), niveles) for patron, niveles in NIVELES_POR_RUTA]
+
+TIPOS_COMPRIMIBLES = (b"application/json", b"text/", b"application/javascript")
+
+
+def niveles_para(path):
+    for patron, niveles in _NIVELES_COMPILADOS:
+        if patron.match(path):
+            return niveles
+    return {"gzip": NIVEL_GZIP_DEFECTO, "br": NIVEL_BROTLI_DEFECTO}
+
+
+def elegir_encoding(accept_encoding):
+    """br si el cliente lo acepta y brotli está instalado; si no gzip; None si ninguno"""
+    aceptados = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                calidad = float(parametros.strip()[2:])
+            except ValueError:
+                calidad = 0.0
+        aceptados[nombre.strip()] = calidad
+
+    if brotli is not None and aceptados.get("br", 0) > 0:
+        return "br"
+    if aceptados.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def comprimir(cuerpo, encoding, nivel):
+    if encoding == "br":
+        return brotli.compress(cuerpo, quality=nivel)
+    # mtime=0: misma entrada → mismos bytes (cacheable y comparable)
+    return gzip.compress(cuerpo, compresslevel=nivel, mtime=0)
+
+
+class CompresionMiddleware:
+    """Middleware ASGI de compresión con umbral, nivel por ruta y cache por versión (ETag)"""
+
+    def __init__(self, app, minimo=COMPRESION_MINIMO_BYTES):
+        self.app = app
+        self.minimo = minimo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        encoding = elegir_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        partes = []
+
+        async def send_comprimido(message):
+            nonlocal inicio
+            if message["type"] == "http.response.start":
+                inicio = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            partes.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            cuerpo = b"".join(partes)
+            await self._enviar(scope, send, inicio, cuerpo, encoding)
+
+        await self.app(scope, receive, send_comprimido)
+
+    async def _enviar(self, scope, send, inicio, cuerpo, encoding):
+        headers = [(k, v) for k, v in inicio.get("headers", []) if k.lower() != b"content-length"]
+        tipo = next((v for k, v in headers if k.lower() == b"content-type"), b"")
+        ya_codificado = any(k.lower() == b"content-encoding" for k, _ in headers)
+
+        if (
+            inicio["status"] != 200
+            or ya_codificado
+            or len(cuerpo) < self.minimo
+            or not tipo.startswith(TIPOS_COMPRIMIBLES)
+        ):
+            await send(inicio)
+            await send({"type": "http.response.body", "body": cuerpo})
+            return
+
+        nivel = niveles_para(scope["path"])[encoding]
+        respuesta = scope.get("state", {}).get("respuesta_etag")
+        if respuesta is None or respuesta.cuerpo != cuerpo:
+            comprimido = comprimir(cuerpo, encoding, nivel)
+        else:
+            comprimido = respuesta.comprimidos.get((encoding, nivel))
+            registrar_cache("compresion", comprimido is not None)
+            if comprimido is None:
+                # Carrera benigna entre requests: gzip con mtime=0 y brotli son deterministas
+                comprimido = comprimir(cuerpo, encoding, nivel)
+                respuesta.comprimidos[(encoding, nivel)] = comprimido
+
+        headers += [
+            (b"content-encoding", encoding.encode()),
+            (b"content-length", str(len(comprimido)).encode()),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        await send({**inicio, "headers": headers})
+        await send({"type": "http.response.body", "body": comprimido})
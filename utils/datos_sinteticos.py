@@ -0,0 +1,274 @@
+"""
+Datos sintéticos vectorizados
+-----------------------------
+
+Generadores de socios, asistencia, pagos, logs QR, equipamiento y
+mantenimiento para desarrollo, fallback sin Supabase y benchmarks. Todo se
+genera con operaciones de NumPy sobre arrays completos (sin loops por fila ni
+iterrows) con un `np.random.Generator` sembrado, así que escalan a millones
+de socios/filas y la misma semilla da los mismos datos.
+
+Distribuciones:
+- Socios: gimnasio uniforme, edad ~ Normal(32, 10) recortada a [16, 75],
+  85% activos, nivel y perfil de pago con las proporciones de simulador_pagos.
+- Asistencia: visitas por socio ~ Poisson(frecuencia semanal · días / 7) con
+  frecuencia ~ Gamma(2, 1.75) (mucho menor en inactivos), como mucho una por
+  día, más visitas de lunes a jueves que el fin de semana, horarios pico de
+  mañana y tarde.
+- Pagos: una cuota por socio y mes; retraso y falta de pago según el perfil.
+- Logs QR: horas concentradas en los picos, dispositivo mobile/kiosk/web.
+
+`generar_datos(...)` arma todas las tablas y `guardar_data_lake(...)` las
+escribe como CSV con los nombres del Data Lake.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+SINTETICOS_DIR = os.path.join(PROJECT_ROOT, 'ia', 'data_science', 'Data_Lake_CSV', 'sinteticos')
+
+SEMILLA = 42
+GIMNASIO_DEFECTO = "gym_master"
+
+HORARIOS = np.array(['06:00', '07:00', '08:00', '18:00', '19:00', '20:00'])
+PROB_HORARIOS = [0.12, 0.18, 0.15, 0.2, 0.22, 0.13]
+# Lunes a domingo
+PESO_DIA_SEMANA = np.array([1.2, 1.15, 1.1, 1.1, 0.95, 0.7, 0.5])
+
+NIVELES = np.array(['Básico', 'Estándar', 'Premium'])
+MONTO_NIVEL = np.array([30, 50, 70])
+PROB_NIVELES = [0.5, 0.3, 0.2]
+PERFILES = np.array(['puntual', 'leve_retraso', 'moroso'])
+PROB_PERFILES = [0.6, 0.25, 0.15]
+# Perfil → (días de retraso posibles, probabilidades)
+RETRASOS = {
+    'puntual': ([0, 1, 2], [0.85, 0.1, 0.05]),
+    'leve_retraso': ([0, 3, 5, 7], [0.3, 0.3, 0.3, 0.1]),
+    'moroso': ([5, 10, 15, 20], [0.4, 0.3, 0.2, 0.1]),
+}
+PROB_NO_PAGO_MOROSO = 0.2
+METODOS_PAGO = np.array(['Efectivo', 'Tarjeta', 'Transferencia', 'Débito automático'])
+PROB_METODOS = [0.3, 0.4, 0.2, 0.1]
+
+DISPOSITIVOS = np.array(['mobile', 'kiosk', 'web'])
+PROB_DISPOSITIVOS = [0.6, 0.3, 0.1]
+# Peso de cada hora de 0 a 23 para los escaneos QR (picos 7-9 y 18-20)
+PESO_HORAS = np.array([0, 0, 0, 0, 0, 0.3, 1.0, 1.6, 1.4, 0.9, 0.7, 0.6,
+                       0.7, 0.6, 0.5, 0.6, 0.9, 1.4, 1.8, 1.7, 1.2, 0.7, 0.3, 0])
+
+EQUIPOS = np.array(['Cinta', 'Elíptica', 'Bicicleta_Estática', 'Remo', 'Press_Banca', 'Rack_Sentadillas',
+                    'Leg_Press', 'Lat_Pulldown', 'Chest_Fly', 'Leg_Curl', 'Smith', 'Poleas'])
+VALORES_REPOSICION = np.array([800, 1500, 3000, 6000, 12000], dtype=float)
+
+
+def generador(semilla=SEMILLA) -> np.random.Generator:
+    return np.random.default_rng(semilla)
+
+
+def nombres_gimnasios(n_gimnasios=1) -> np.ndarray:
+    """gym_master, gym_2, gym_3, ..."""
+    return np.array([GIMNASIO_DEFECTO] + [f"gym_{i}" for i in range(2, n_gimnasios + 1)])
+
+
+def _hoy(hoy=None):
+    return np.datetime64(pd.Timestamp(hoy or pd.Timestamp.now()).date(), 'D')
+
+
+def _categoria(valores, codigos):
+    """Columna categórica (1 byte por fila en vez de un objeto str por fila)"""
+    return pd.Categorical.from_codes(codigos, categories=valores)
+
+
+def _repetir(columna, filas, categorias=None):
+    """Columna de socios repetida en `filas`, como categórica (sirve aunque la columna sea str)"""
+    categorica = pd.Categorical(columna, categories=categorias)
+    return pd.Categorical.from_codes(categorica.codes[filas], categories=categorica.categories)
+
+
+def _probabilidades(pesos):
+    pesos = np.asarray(pesos, dtype=float)
+    return pesos / pesos.sum()
+
+
+def _dias_distintos(visitas, pesos_dias, rng, celdas_por_bloque=4_000_000):
+    """
+    Para cada socio, visitas[i] días distintos de range(len(pesos_dias)) elegidos con
+    probabilidad proporcional al peso, sin reemplazo (Efraimidis-Spirakis: los de mayor
+    log(U) / peso). Devuelve los días de los socios concatenados en orden de socio.
+    Se procesa por bloques de socios para acotar la matriz socios x días.
+    """
+    n_dias = len(pesos_dias)
+    con_visitas = np.flatnonzero(visitas)
+    por_bloque = max(1, celdas_por_bloque // max(n_dias, 1))
+    dias = []
+    for inicio in range(0, len(con_visitas), por_bloque):
+        cantidades = visitas[con_visitas[inicio:inicio + por_bloque]]
+        claves = np.log(rng.random((len(cantidades), n_dias))) / pesos_dias
+        orden = np.argsort(-claves, axis=1)
+        dias.append(orden[np.arange(n_dias) < cantidades[:, None]])
+    return np.concatenate(dias) if dias else np.empty(0, dtype=np.int64)
+
+
+def generar_socios(n_socios=200, n_gimnasios=1, rng=None, hoy=None) -> pd.DataFrame:
+    """Socios con gimnasio, sexo, fecha de nacimiento, estado, nivel, perfil de pago y frecuencia semanal"""
+    rng = rng or generador()
+    activo = rng.random(n_socios) < 0.85
+    edad_dias = (np.clip(rng.normal(32, 10, n_socios), 16, 75) * 365.25).astype(np.int64)
+    frecuencia = rng.gamma(2.0, 1.75, n_socios)
+    frecuencia[~activo] *= 0.05
+    return pd.DataFrame({
+        'id_socio': np.arange(1, n_socios + 1),
+        'gimnasio': _categoria(nombres_gimnasios(n_gimnasios), rng.integers(0, n_gimnasios, n_socios)),
+        'sexo': _categoria(['M', 'F'], rng.integers(0, 2, n_socios)),
+        'fecnac': (_hoy(hoy) - edad_dias).astype(str),
+        'activo': activo,
+        'nivel': _categoria(NIVELES, rng.choice(len(NIVELES), n_socios, p=PROB_NIVELES)),
+        'perfil_pago': _categoria(PERFILES, rng.choice(len(PERFILES), n_socios, p=PROB_PERFILES)),
+        'frecuencia_semanal': frecuencia.round(2)
+    })
+
+
+def generar_asistencia(socios, n_dias=90, rng=None, hoy=None) -> pd.DataFrame:
+    """Asistencias (fecha, socio_id, hora_entrada, gimnasio) de los últimos `n_dias` días, una por socio y día"""
+    rng = rng or generador()
+    visitas = np.minimum(rng.poisson(socios['frecuencia_semanal'].to_numpy() * n_dias / 7), n_dias)
+    total = int(visitas.sum())
+
+    primer_dia = _hoy(hoy) - n_dias
+    dias = primer_dia + np.arange(n_dias)
+    # 1970-01-01 fue jueves: (días + 3) % 7 es 0 los lunes
+    peso_dias = PESO_DIA_SEMANA[(dias.astype(np.int64) + 3) % 7]
+    desplazamiento = _dias_distintos(visitas, peso_dias, rng).astype(np.int16)
+    orden = np.argsort(desplazamiento, kind='stable')
+    fila_socio = np.repeat(np.arange(len(socios)), visitas)[orden]
+
+    return pd.DataFrame({
+        'fecha': (primer_dia + desplazamiento[orden]).astype('datetime64[ns]'),
+        'socio_id': socios['id_socio'].to_numpy()[fila_socio],
+        'hora_entrada': _categoria(HORARIOS, rng.choice(len(HORARIOS), total, p=PROB_HORARIOS)),
+        'gimnasio': _repetir(socios['gimnasio'], fila_socio)
+    })
+
+
+def generar_pagos(socios, n_meses=12, inicio="2024-07-01", rng=None) -> pd.DataFrame:
+    """Una cuota mensual por socio desde `inicio`, con descuentos, retrasos y meses impagos según el perfil"""
+    rng = rng or generador()
+    n_socios = len(socios)
+    fila_socio = np.repeat(np.arange(n_socios), n_meses)
+    mes = np.tile(np.arange(n_meses), n_socios)
+    perfil = _repetir(socios['perfil_pago'], fila_socio, PERFILES)
+    nivel = _repetir(socios['nivel'], fila_socio, NIVELES)
+    codigo_perfil = perfil.codes
+    n = len(fila_socio)
+
+    puntual, moroso = codigo_perfil == 0, codigo_perfil == 2
+    descuento = np.where(puntual & (rng.random(n) < 0.2), rng.choice([5, 10], n), 0)
+    dias_retraso = np.zeros(n, dtype=np.int64)
+    for codigo, nombre in enumerate(PERFILES):
+        valores, probabilidades = RETRASOS[nombre]
+        mascara = codigo_perfil == codigo
+        dias_retraso[mascara] = rng.choice(valores, int(mascara.sum()), p=probabilidades)
+    paga = ~(moroso & (rng.random(n) < PROB_NO_PAGO_MOROSO))
+
+    fecha_limite = (np.datetime64(pd.Timestamp(inicio).strftime('%Y-%m'), 'M') + mes).astype('datetime64[D]')
+    pagos = pd.DataFrame({
+        'socio_id': socios['id_socio'].to_numpy()[fila_socio],
+        'nivel': nivel,
+        'perfil_pago': perfil,
+        'monto': MONTO_NIVEL[nivel.codes] - descuento,
+        'descuento': descuento,
+        'fecha_limite': fecha_limite.astype('datetime64[ns]'),
+        'fecha_pago': (fecha_limite + dias_retraso).astype('datetime64[ns]'),
+        'dias_retraso': dias_retraso,
+        'metodo_pago': _categoria(METODOS_PAGO, rng.choice(len(METODOS_PAGO), n, p=PROB_METODOS)),
+        'gimnasio': _repetir(socios['gimnasio'], fila_socio)
+    })[paga].reset_index(drop=True)
+    pagos.insert(0, 'pago_id', np.arange(1, len(pagos) + 1))
+    return pagos
+
+
+def generar_logs_qr(socio_ids, n_logs=500, n_dias=30, rng=None, hoy=None) -> pd.DataFrame:
+    """Escaneos QR (socio_id, timestamp, device_type, fecha, hora) de los últimos `n_dias` días"""
+    rng = rng or generador()
+    socio_ids = np.asarray(socio_ids)
+    segundos = (rng.integers(0, n_dias, n_logs) * 86400
+                + rng.choice(24, n_logs, p=_probabilidades(PESO_HORAS)) * 3600
+                + rng.integers(0, 3600, n_logs))
+    timestamp = pd.Series((_hoy(hoy) - n_dias + 1).astype('datetime64[s]') + segundos).astype('datetime64[ns]')
+    return pd.DataFrame({
+        'socio_id': socio_ids[rng.integers(0, len(socio_ids), n_logs)],
+        'timestamp': timestamp,
+        'device_type': _categoria(DISPOSITIVOS, rng.choice(len(DISPOSITIVOS), n_logs, p=PROB_DISPOSITIVOS)),
+        'fecha': timestamp.dt.normalize(),
+        'hora': timestamp.dt.hour
+    })
+
+
+def generar_equipamiento(n_gimnasios=1, rng=None, hoy=None) -> pd.DataFrame:
+    """Los equipos de EQUIPOS en cada gimnasio, con adquisición, revisiones y valor de reposición"""
+    rng = rng or generador()
+    n = len(EQUIPOS) * n_gimnasios
+    hoy = _hoy(hoy)
+    ultima_revision = hoy - rng.integers(5, 240, n)
+    return pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'nombre': np.tile(EQUIPOS, n_gimnasios),
+        'gimnasio': np.repeat(nombres_gimnasios(n_gimnasios), len(EQUIPOS)),
+        'fecha_adquisicion': (hoy - rng.integers(180, 2500, n)).astype(str),
+        'ultima_revision': ultima_revision.astype(str),
+        'proxima_revision': (ultima_revision + 180).astype(str),
+        'valor_reposicion': VALORES_REPOSICION[rng.integers(0, len(VALORES_REPOSICION), n)]
+    })
+
+
+def generar_mantenimiento(equipamiento, n_mantenimientos=60, rng=None, hoy=None) -> pd.DataFrame:
+    """Mantenimientos de los últimos 2 años; los correctivos cuestan más que los preventivos"""
+    rng = rng or generador()
+    correctivo = rng.random(n_mantenimientos) < 0.4
+    costo = np.where(correctivo, rng.integers(100, 600, n_mantenimientos), rng.integers(20, 300, n_mantenimientos))
+    return pd.DataFrame({
+        'id': np.arange(1, n_mantenimientos + 1),
+        'id_equipamiento': equipamiento['id'].to_numpy()[rng.integers(0, len(equipamiento), n_mantenimientos)],
+        'fecha_mantenimiento': (_hoy(hoy) - rng.integers(1, 720, n_mantenimientos)).astype(str),
+        'tipo_mantenimiento': np.where(correctivo, 'correctivo', 'preventivo'),
+        'costo': costo.astype(float)
+    })
+
+
+def generar_datos(n_socios=200, n_gimnasios=1, n_dias=90, n_meses=12, n_logs=None,
+                  semilla=SEMILLA, hoy=None) -> dict:
+    """Todas las tablas sintéticas con una sola semilla (n_logs por defecto: 2.5 por socio)"""
+    rng = generador(semilla)
+    socios = generar_socios(n_socios, n_gimnasios, rng, hoy)
+    equipamiento = generar_equipamiento(n_gimnasios, rng, hoy)
+    return {
+        'socios': socios,
+        'asistencia': generar_asistencia(socios, n_dias, rng, hoy),
+        'pagos': generar_pagos(socios, n_meses, rng=rng),
+        'logs_qr': generar_logs_qr(socios['id_socio'].to_numpy(), n_logs or int(n_socios * 2.5), rng=rng, hoy=hoy),
+        'equipamiento': equipamiento,
+        'mantenimiento': generar_mantenimiento(equipamiento, 60 * n_gimnasios, rng, hoy)
+    }
+
+
+# Tabla → archivo del Data Lake
+ARCHIVOS = {
+    'socios': 'socios.csv',
+    'asistencia': 'asistencia.csv',
+    'pagos': 'pagos_simulados.csv',
+    'logs_qr': 'logs_qr.csv',
+    'equipamiento': 'equipamiento.csv',
+    'mantenimiento': 'mantenimiento.csv',
+}
+
+
+def guardar_data_lake(datos, directorio=SINTETICOS_DIR) -> dict:
+    """Escribe cada tabla como CSV en `directorio`; devuelve {tabla: ruta}"""
+    os.makedirs(directorio, exist_ok=True)
+    rutas = {}
+    for tabla, df in datos.items():
+        rutas[tabla] = os.path.join(directorio, ARCHIVOS.get(tabla, f"{tabla}.csv"))
+        df.to_csv(rutas[tabla], index=False)
+    return rutas
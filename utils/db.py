@@ -1,31 +1,54 @@
 import os
+import threading
 import pandas as pd
 from dotenv import load_dotenv
 
+from utils.logs import obtener_logger
+
 # Cargar variables de entorno
 load_dotenv()
 
+logger = obtener_logger(__name__)
+
+# Clientes compartidos por (url, key): se crean en el primer uso y se reutilizan
+# entre requests, pipelines y scripts (ninguno abre conexiones al importarse)
+_clientes = {}
+_clientes_lock = threading.Lock()
+
+
+def obtener_cliente(url, key):
+    """
+    Cliente de Supabase compartido para (url, key), creado en el primer uso.
+    Lanza ImportError si supabase no está instalado.
+    """
+    cliente = _clientes.get((url, key))
+    if cliente is None:
+        with _clientes_lock:
+            cliente = _clientes.get((url, key))
+            if cliente is None:
+                from supabase import create_client
+                cliente = _clientes[(url, key)] = create_client(url, key)
+    return cliente
+
+
 def get_supabase_client():
-    """Obtiene el cliente de Supabase"""
+    """Obtiene el cliente de Supabase (compartido) configurado por variables de entorno"""
     try:
-        from supabase import create_client, Client
-        
         # Configuración desde variables de entorno
         SUPABASE_URL = os.getenv("SUPABASE_URL")
         SUPABASE_KEY = os.getenv("SUPABASE_KEY")
         
         if SUPABASE_URL and SUPABASE_KEY:
-            client = create_client(SUPABASE_URL, SUPABASE_KEY)
-            return client
+            return obtener_cliente(SUPABASE_URL, SUPABASE_KEY)
         else:
-            print("Variables de entorno SUPABASE_URL o SUPABASE_KEY no configuradas")
+            logger.warning("Variables de entorno SUPABASE_URL o SUPABASE_KEY no configuradas")
             return None
             
     except ImportError:
-        print("Módulo supabase no instalado")
+        logger.warning("Módulo supabase no instalado")
         return None
     except Exception as e:
-        print(f"Error conectando a Supabase: {e}")
+        logger.error("Error conectando a Supabase", extra={"error": e})
         return None
 
 def get_asistencia_data():
@@ -35,13 +58,13 @@ def get_asistencia_data():
     try:
         client = get_supabase_client()
         if client is None:
-            print("Cliente Supabase no disponible, usando datos simulados")
+            logger.debug("Cliente Supabase no disponible, usando datos simulados")
             return get_simulated_asistencia()
             
         response = client.table("asistencia").select("*").execute()
         return pd.DataFrame(response.data)
     except Exception as e:
-        print(f"Error obteniendo datos de asistencia: {e}")
+        logger.warning("Error obteniendo datos de Supabase", extra={"tabla": "asistencia", "error": e})
         return get_simulated_asistencia()
 
 def get_socios_data():
@@ -55,7 +78,7 @@ def get_socios_data():
         response = client.table("socio").select("id_socio", "sexo", "fecnac", "activo").execute()
         return pd.DataFrame(response.data)
     except Exception as e:
-        print(f"Error obteniendo datos de socios: {e}")
+        logger.warning("Error obteniendo datos de Supabase", extra={"tabla": "socios", "error": e})
         return get_simulated_socios()
 
 def get_usuarios_data():
@@ -69,7 +92,7 @@ def get_usuarios_data():
         response = client.table("usuario").select("*").execute()
         return pd.DataFrame(response.data)
     except Exception as e:
-        print(f"Error obteniendo datos de usuarios: {e}")
+        logger.warning("Error obteniendo datos de Supabase", extra={"tabla": "usuarios", "error": e})
         return pd.DataFrame()
 
 def test_connection():
@@ -87,40 +110,31 @@ def test_connection():
         return {"status": "error", "message": f"Error de conexión: {str(e)}"}
 
 # Funciones de respaldo para datos simulados si la conexión falla
+# (generadores vectorizados y sembrados de utils/datos_sinteticos.py)
 def get_simulated_asistencia():
-    """Datos simulados de asistencia para desarrollo/testing"""
-    import numpy as np
-    from datetime import datetime, timedelta
-    
-    np.random.seed(42)
-    fechas = pd.date_range(start=datetime.now() - timedelta(days=90), periods=90)
-    
-    data = []
-    for fecha in fechas:
-        # Simular entre 50-150 asistencias por día
-        n_asistencias = np.random.randint(50, 150)
-        for _ in range(n_asistencias):
-            data.append({
-                'fecha': fecha,
-                'socio_id': np.random.randint(1, 200),
-                'hora_entrada': np.random.choice(['06:00', '07:00', '08:00', '18:00', '19:00', '20:00']),
-                'gimnasio': 'gym_master'
-            })
-    
-    return pd.DataFrame(data)
+    """Datos simulados de asistencia para desarrollo/testing (200 socios, 90 días)"""
+    from utils.datos_sinteticos import generador, generar_socios, generar_asistencia
+
+    rng = generador()
+    asistencia = generar_asistencia(generar_socios(200, rng=rng), n_dias=90, rng=rng)
+    return asistencia.astype({'hora_entrada': str, 'gimnasio': str})
 
 def get_simulated_socios():
     """Datos simulados de socios para desarrollo/testing"""
-    import numpy as np
-    np.random.seed(42)
-    
-    data = []
-    for i in range(1, 201):  # 200 socios
-        data.append({
-            'id_socio': i,
-            'sexo': np.random.choice(['M', 'F']),
-            'fecnac': f"199{np.random.randint(0, 9)}-{np.random.randint(1, 13):02d}-{np.random.randint(1, 29):02d}",
-            'activo': np.random.choice([True, False], p=[0.85, 0.15])
-        })
-    
-    return pd.DataFrame(data)
\ No newline at end of file
+    from utils.datos_sinteticos import generador, generar_socios
+
+    socios = generar_socios(200, rng=generador())
+    return socios[['id_socio', 'sexo', 'fecnac', 'activo']].astype({'sexo': str})
+
+def get_simulated_equipamiento():
+    """Datos simulados de equipamiento para desarrollo/testing"""
+    from utils.datos_sinteticos import generador, generar_equipamiento
+
+    return generar_equipamiento(rng=generador()).drop(columns=['gimnasio'])
+
+def get_simulated_mantenimiento():
+    """Datos simulados de mantenimientos para desarrollo/testing"""
+    from utils.datos_sinteticos import generador, generar_equipamiento, generar_mantenimiento
+
+    rng = generador()
+    return generar_mantenimiento(generar_equipamiento(rng=rng), 60, rng=rng)
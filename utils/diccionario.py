@@ -0,0 +1,194 @@
+"""
+Diccionarios UUID → int32
+-------------------------
+
+Los identificadores de Supabase (socio_id, cuota_id, id de pago...) son UUID de
+36 caracteres: como columnas `object` ocupan ~90 bytes por fila y cada merge /
+groupby / nunique tiene que hashear los strings.
+
+Un `DiccionarioIds` asigna a cada UUID un entero denso (0, 1, 2...) la primera vez
+que se lo ve y lo recuerda para siempre:
+
+- Persistencia append-only en ia/Data_Lake_CSV/diccionarios/<nombre>.csv: el
+  código de un UUID es su número de fila, así que nunca cambia y los CSV/índices
+  ya calculados con esos códigos siguen siendo válidos.
+- Varios procesos (workers de gunicorn, pipelines) pueden agregar UUIDs a la vez:
+  el append se hace con un lock de archivo y antes de agregar se leen las filas
+  que otros procesos hayan escrito desde la última lectura.
+- Los nulos / desconocidos se codifican como SIN_CODIGO (-1).
+- Los ids de datos simulados o de fallback ("1".."200", pagos simulados) van a
+  diccionarios aparte (<nombre>_simulados, `simulado=True`): nunca se agregan a
+  los de producción, que dimensionan bitsets y offsets indexados por código.
+
+Uso:
+
+    df = codificar_columnas(df, {"socio_id": "socios", "cuota_id": "cuotas"})
+    ...  # merges y groupbys sobre int32
+    df = decodificar_columnas(df, {"socio_id": "socios"})
+"""
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+DICCIONARIOS_DIR = os.environ.get(
+    "DICCIONARIOS_DIR", os.path.join(PROJECT_ROOT, 'ia', 'Data_Lake_CSV', 'diccionarios')
+)
+
+SIN_CODIGO = -1
+MAX_CODIGO = np.iinfo(np.int32).max
+
+# Columna → diccionario, para los identificadores de socio, pago y cuota del Data Lake
+COLUMNAS_SOCIO = {"socio_id": "socios", "id_socio": "socios"}
+COLUMNAS_PAGOS = {"id": "pagos", "socio_id": "socios", "cuota_id": "cuotas"}
+SUFIJO_SIMULADOS = "_simulados"
+
+
+class DiccionarioIds:
+    """Mapeo persistente y append-only de UUID (str) a código int32 denso"""
+
+    def __init__(self, nombre, directorio=DICCIONARIOS_DIR):
+        self.nombre = nombre
+        self.ruta = os.path.join(directorio, f"{nombre}.csv")
+        self._lock = threading.Lock()
+        self._uuids = np.empty(0, dtype=object)
+        self._indice = pd.Index(self._uuids)
+        self._bytes_leidos = 0
+
+    def __len__(self):
+        return len(self._uuids)
+
+    def codificar(self, valores, agregar=True) -> np.ndarray:
+        """
+        Códigos int32 de `valores` (iterable de UUID). Con agregar=True los UUID
+        nuevos se incorporan al diccionario; si no, quedan como SIN_CODIGO.
+        """
+        textos = pd.Series(valores, dtype=object) if not isinstance(valores, pd.Series) else valores.astype(object)
+        if len(textos) == 0:
+            return np.empty(0, dtype=np.int32)
+        if pd.api.types.infer_dtype(textos, skipna=True) != "string":
+            # Ids leídos como otro tipo (ej. enteros en datos simulados): se guardan como texto
+            no_nulos = textos.notna()
+            textos = textos.where(~no_nulos, textos[no_nulos].astype(str))
+
+        with self._lock:
+            self._sincronizar()
+            codigos = self._indice.get_indexer(textos)
+            if agregar:
+                faltantes = (codigos == SIN_CODIGO) & textos.notna().to_numpy()
+                if faltantes.any():
+                    self._agregar(pd.unique(textos[faltantes]))
+                    codigos = self._indice.get_indexer(textos)
+        return codigos.astype(np.int32)
+
+    def decodificar(self, codigos) -> np.ndarray:
+        """UUIDs (object) de los códigos; SIN_CODIGO → None"""
+        codigos = np.asarray(codigos, dtype=np.int64)
+        with self._lock:
+            if len(codigos) and codigos.max(initial=SIN_CODIGO) >= len(self._uuids):
+                self._sincronizar()
+            uuids = self._uuids
+        resultado = np.full(len(codigos), None, dtype=object)
+        validos = (codigos >= 0) & (codigos < len(uuids))
+        resultado[validos] = uuids[codigos[validos]]
+        return resultado
+
+    def _sincronizar(self):
+        """Lee las filas agregadas al archivo (por este u otro proceso) desde la última lectura"""
+        try:
+            tamanio = os.path.getsize(self.ruta)
+        except OSError:
+            return
+        if tamanio == self._bytes_leidos:
+            return
+
+        with open(self.ruta, "r", encoding="utf-8") as f:
+            f.seek(self._bytes_leidos)
+            contenido = f.read()
+        # Solo líneas completas: otro proceso puede estar escribiendo la última
+        completo = contenido[:contenido.rfind("\n") + 1]
+        nuevos = [linea for linea in completo.split("\n") if linea and linea != "uuid"]
+        self._bytes_leidos += len(completo.encode("utf-8"))
+        if nuevos:
+            self._extender(nuevos)
+
+    def _agregar(self, nuevos):
+        os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+        with open(self.ruta, "a+", encoding="utf-8") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                # Otro proceso pudo haber agregado (algunos de) los mismos UUID
+                self._sincronizar()
+                nuevos = np.asarray(nuevos, dtype=object)
+                nuevos = nuevos[self._indice.get_indexer(nuevos) == SIN_CODIGO]
+                if len(nuevos) == 0:
+                    return
+                if len(self._uuids) + len(nuevos) > MAX_CODIGO:
+                    raise OverflowError(f"Diccionario {self.nombre} excede el rango de int32")
+
+                lineas = ("uuid\n" if self._bytes_leidos == 0 and f.tell() == 0 else "") + "".join(f"{uuid}\n" for uuid in nuevos)
+                f.write(lineas)
+                f.flush()
+                self._bytes_leidos += len(lineas.encode("utf-8"))
+                self._extender(nuevos)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _extender(self, nuevos):
+        self._uuids = np.concatenate([self._uuids, np.asarray(nuevos, dtype=object)])
+        self._indice = pd.Index(self._uuids)
+
+
+_diccionarios = {}
+_diccionarios_lock = threading.Lock()
+
+
+def obtener_diccionario(nombre, simulado=False) -> DiccionarioIds:
+    """
+    Diccionario compartido del proceso para `nombre` (socios, pagos, cuotas...).
+    Con simulado=True, el diccionario aparte <nombre>_simulados.
+    """
+    if simulado:
+        nombre = f"{nombre}{SUFIJO_SIMULADOS}"
+    diccionario = _diccionarios.get(nombre)
+    if diccionario is None:
+        with _diccionarios_lock:
+            diccionario = _diccionarios.setdefault(nombre, DiccionarioIds(nombre))
+    return diccionario
+
+
+def codificar_columnas(df: pd.DataFrame, columnas: dict, agregar=True, simulado=False) -> pd.DataFrame:
+    """Copia de df con las columnas {columna: diccionario} presentes reemplazadas por códigos int32"""
+    presentes = {columna: nombre for columna, nombre in columnas.items() if columna in df.columns}
+    if not presentes:
+        return df.copy()
+    return df.assign(**{
+        columna: obtener_diccionario(nombre, simulado).codificar(df[columna], agregar=agregar)
+        for columna, nombre in presentes.items()
+    })
+
+
+def decodificar_columnas(df: pd.DataFrame, columnas: dict, simulado=False) -> pd.DataFrame:
+    """Inversa de codificar_columnas: copia de df con los UUID de vuelta en las columnas indicadas"""
+    presentes = {columna: nombre for columna, nombre in columnas.items() if columna in df.columns}
+    if not presentes:
+        return df.copy()
+    return df.assign(**{
+        columna: obtener_diccionario(nombre, simulado).decodificar(df[columna].fillna(SIN_CODIGO))
+        for columna, nombre in presentes.items()
+    })
+
+
+def leer_csv_codificado(ruta, columnas, simulado=False, **kwargs) -> pd.DataFrame:
+    """pd.read_csv leyendo los identificadores como str y codificándolos a int32"""
+    dtype = {**{columna: str for columna in columnas}, **kwargs.pop("dtype", {})}
+    return codificar_columnas(pd.read_csv(ruta, dtype=dtype, **kwargs), columnas, simulado=simulado)
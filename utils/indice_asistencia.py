@@ -0,0 +1,354 @@
+"""
+Índice de asistencia por socio (CSR)
+------------------------------------
+
+Las preguntas por socio (última visita, visitas en las últimas N semanas,
+rachas) agrupaban toda la tabla `asistencia` en cada consulta. Este índice la
+ordena una vez por (socio, fecha) y guarda dos arrays NumPy:
+
+- dias: fecha de cada asistencia (días desde 1970-01-01, int32), ordenadas por
+  socio y fecha.
+- offsets: para el socio con código c (utils/diccionario.py) sus asistencias
+  son dias[offsets[c]:offsets[c + 1]].
+
+Además, alineado con `dias`, el gimnasio de cada asistencia (gimnasio_visita:
+posición en `gimnasios`), para series y socios activos por gimnasio; y por
+código de socio el gimnasio de su última asistencia (-1 si no tiene), para
+filtrar rankings por gimnasio.
+
+Construido desde datos simulados (sin Supabase) los códigos son del diccionario
+de socios simulados (`simulado`), para no mezclar esos ids con los de producción.
+
+Buscar un socio es un lookup en el diccionario + un slice: no depende de la
+cantidad de asistencias. Los códigos del diccionario son estables, así que el
+índice se persiste tal cual junto al Data Lake (ia/Data_Lake_CSV/indice_asistencia.npz)
+y los demás workers lo cargan desde el archivo en vez de reconstruirlo.
+
+Refresco:
+- El índice vale INDICE_ASISTENCIA_TTL segundos desde que se generó (mtime del archivo).
+- Si otro worker generó un archivo más nuevo, se recarga desde disco.
+- Vencido, un solo worker a la vez lo reconstruye (bloqueo de utils/cache.py).
+"""
+
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from utils.diccionario import SIN_CODIGO, obtener_diccionario
+from utils.logs import obtener_logger
+from utils.metricas import registrar_cache
+
+logger = obtener_logger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+INDICE_ASISTENCIA_PATH = os.environ.get(
+    "INDICE_ASISTENCIA_PATH", os.path.join(PROJECT_ROOT, 'ia', 'Data_Lake_CSV', 'indice_asistencia.npz')
+)
+INDICE_TTL_SEGUNDOS = int(os.environ.get("INDICE_ASISTENCIA_TTL", 3600))
+
+# Clave del bloqueo de reconstrucción en el cache compartido entre workers
+CLAVE_CACHE = "indice_asistencia"
+
+EPOCA = np.datetime64('1970-01-01', 'D')
+
+# La tabla asistencia de Supabase es de un solo gimnasio (igual que en etl_login)
+GIMNASIO_DEFECTO = "gym_master"
+
+# PostgREST devuelve como mucho 1000 filas por request (igual que en models/uso_equipos.py)
+TAMANIO_PAGINA = 1000
+
+
+def a_dias(fechas) -> np.ndarray:
+    """Fechas (str, datetime, Timestamp) → días desde 1970-01-01; NaT → mínimo de int64"""
+    fechas = pd.to_datetime(pd.Series(fechas), errors='coerce', utc=True).dt.tz_localize(None)
+    return fechas.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def a_fecha(dias) -> str:
+    return str(EPOCA + np.timedelta64(int(dias), 'D'))
+
+
+def semana_de(dias):
+    """Índice de semana (lunes a domingo) de días desde la época (1970-01-01 fue jueves)"""
+    return (np.asarray(dias) + 3) // 7
+
+
+class IndiceAsistencia:
+    """Asistencias ordenadas por socio y fecha con offsets por código de socio"""
+
+    def __init__(self, offsets, dias, gimnasio=None, gimnasios=(), generado_en=None, fuente="desconocida",
+                 simulado=False, gimnasio_visita=None):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.dias = np.asarray(dias, dtype=np.int32)
+        if gimnasio is None:
+            gimnasio = np.full(len(self.offsets) - 1, SIN_CODIGO, dtype=np.int16)
+        self.gimnasio = np.asarray(gimnasio, dtype=np.int16)
+        if gimnasio_visita is None:
+            gimnasio_visita = np.full(len(self.dias), SIN_CODIGO, dtype=np.int16)
+        self.gimnasio_visita = np.asarray(gimnasio_visita, dtype=np.int16)
+        self.gimnasios = np.asarray(gimnasios, dtype=str)
+        self.generado_en = generado_en or pd.Timestamp.now().isoformat()
+        self.fuente = fuente
+        self.simulado = bool(simulado)
+
+    @classmethod
+    def desde_asistencia(cls, asistencia_df: pd.DataFrame, fuente="desconocida", simulado=False):
+        """
+        Construye el índice desde un DataFrame con columnas socio_id, fecha y
+        (opcional) gimnasio. simulado=True codifica con el diccionario de socios simulados.
+        """
+        if asistencia_df is None or asistencia_df.empty or not {'socio_id', 'fecha'} <= set(asistencia_df.columns):
+            return cls(np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int32), fuente=fuente, simulado=simulado)
+
+        diccionario = obtener_diccionario("socios", simulado)
+        codigos = diccionario.codificar(asistencia_df['socio_id'])
+        dias = a_dias(asistencia_df['fecha'])
+        validos = (codigos != SIN_CODIGO) & (dias != np.iinfo(np.int64).min)
+        codigos, dias = codigos[validos], dias[validos].astype(np.int32)
+        if 'gimnasio' in asistencia_df.columns:
+            gimnasio_fila, gimnasios = pd.factorize(asistencia_df['gimnasio'].to_numpy()[validos])
+        else:
+            gimnasio_fila, gimnasios = np.zeros(len(codigos), dtype=np.int64), [GIMNASIO_DEFECTO]
+
+        orden = np.lexsort((dias, codigos))
+        conteos = np.bincount(codigos, minlength=len(diccionario))
+        offsets = np.zeros(len(conteos) + 1, dtype=np.int64)
+        np.cumsum(conteos, out=offsets[1:])
+
+        gimnasio_visita = gimnasio_fila[orden].astype(np.int16)
+        # Gimnasio de la última asistencia de cada socio
+        gimnasio = np.full(len(conteos), SIN_CODIGO, dtype=np.int16)
+        con_visitas = conteos > 0
+        gimnasio[con_visitas] = gimnasio_visita[offsets[1:][con_visitas] - 1]
+        return cls(offsets, dias[orden], gimnasio, np.asarray(gimnasios, dtype=str), fuente=fuente, simulado=simulado,
+                   gimnasio_visita=gimnasio_visita)
+
+    @property
+    def n_socios(self):
+        return int(np.count_nonzero(np.diff(self.offsets)))
+
+    @property
+    def n_asistencias(self):
+        return len(self.dias)
+
+    @property
+    def version(self):
+        return f"{self.generado_en}:{self.n_asistencias}"
+
+    def ultimas_visitas(self):
+        """(códigos de socio con asistencias, día de su última asistencia), vectorizado sobre todos los socios"""
+        codigos = np.flatnonzero(np.diff(self.offsets))
+        return codigos, self.dias[self.offsets[codigos + 1] - 1]
+
+    @property
+    def diccionario(self):
+        """Diccionario de socios de los códigos del índice (el de simulados si se construyó con datos simulados)"""
+        return obtener_diccionario("socios", self.simulado)
+
+    def codigo(self, socio_id) -> int:
+        """Código del socio en el índice o SIN_CODIGO si no tiene asistencias indexadas"""
+        codigo = int(self.diccionario.codificar([socio_id], agregar=False)[0])
+        if codigo == SIN_CODIGO or codigo >= len(self.offsets) - 1:
+            return SIN_CODIGO
+        return codigo
+
+    def visitas(self, socio_id) -> np.ndarray:
+        """Días (int32, ordenados) con asistencia del socio; vacío si no tiene"""
+        codigo = self.codigo(socio_id)
+        if codigo == SIN_CODIGO:
+            return self.dias[:0]
+        return self.dias[self.offsets[codigo]:self.offsets[codigo + 1]]
+
+    def resumen(self, socio_id, semanas=4, limite=50, hoy=None) -> dict:
+        """
+        Línea de tiempo del socio: última visita, visitas en las últimas `semanas`,
+        racha actual y máxima de semanas consecutivas con asistencia y las
+        últimas `limite` fechas.
+        """
+        dias = self.visitas(socio_id)
+        if len(dias) == 0:
+            return None
+
+        hoy = int(pd.Timestamp(hoy or pd.Timestamp.now()).to_datetime64().astype('datetime64[D]').astype(np.int64))
+        desde = hoy - 7 * semanas
+        semanas_con_visita = np.unique(semana_de(dias))
+        cortes = np.flatnonzero(np.diff(semanas_con_visita) != 1)
+        # Largo de cada tramo de semanas consecutivas
+        inicios = np.concatenate(([0], cortes + 1))
+        fines = np.concatenate((cortes, [len(semanas_con_visita) - 1]))
+        largos = fines - inicios + 1
+        # La racha actual sigue viva si la última semana con visita es esta o la anterior
+        racha_actual = int(largos[-1]) if semana_de(hoy) - semanas_con_visita[-1] <= 1 else 0
+
+        return {
+            "total_visitas": int(len(dias)),
+            "primera_visita": a_fecha(dias[0]),
+            "ultima_visita": a_fecha(dias[-1]),
+            "dias_sin_asistir": int(hoy - dias[-1]),
+            "semanas_consultadas": int(semanas),
+            "visitas_ultimas_semanas": int(len(dias) - np.searchsorted(dias, desde, side='right')),
+            "racha_actual_semanas": racha_actual,
+            "racha_maxima_semanas": int(largos.max()),
+            "ultimas_visitas": [a_fecha(d) for d in dias[::-1][:limite]]
+        }
+
+    def guardar(self, ruta=INDICE_ASISTENCIA_PATH):
+        """Escritura atómica (archivo temporal + os.replace): nunca se lee un índice a medio escribir"""
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, "wb") as f:
+                np.savez(f, offsets=self.offsets, dias=self.dias, gimnasio=self.gimnasio, gimnasios=self.gimnasios,
+                         gimnasio_visita=self.gimnasio_visita,
+                         generado_en=np.array(self.generado_en), fuente=np.array(self.fuente),
+                         simulado=np.array(self.simulado))
+            os.replace(temporal, ruta)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+    @classmethod
+    def cargar(cls, ruta=INDICE_ASISTENCIA_PATH):
+        with np.load(ruta) as datos:
+            # datos["gimnasio_visita"] falla con índices de versiones anteriores: se tratan como ilegibles y se reconstruyen
+            return cls(datos["offsets"], datos["dias"], datos["gimnasio"], datos["gimnasios"],
+                       str(datos["generado_en"]), str(datos["fuente"]),
+                       bool(datos["simulado"]) if "simulado" in datos else False, datos["gimnasio_visita"])
+
+
+def extraer_paginas(client):
+    """
+    Todas las filas socio_id/fecha de asistencia, de a TAMANIO_PAGINA. Ordenar por
+    (fecha, socio_id) hace estable la paginación: dos filas empatadas son idénticas,
+    así que aunque el servidor las intercambie entre páginas el resultado no cambia.
+    """
+    filas = []
+    inicio = 0
+    while True:
+        response = (
+            client.table('asistencia').select('socio_id, fecha')
+            .order('fecha').order('socio_id')
+            .range(inicio, inicio + TAMANIO_PAGINA - 1)
+            .execute()
+        )
+        filas.extend(response.data)
+        if len(response.data) < TAMANIO_PAGINA:
+            break
+        inicio += TAMANIO_PAGINA
+    return filas
+
+
+def extraer_asistencia():
+    """(DataFrame socio_id/fecha, fuente) desde Supabase, o datos simulados si no hay conexión"""
+    from utils.db import get_supabase_client, get_simulated_asistencia
+
+    client = get_supabase_client()
+    if client is not None:
+        try:
+            datos = pd.DataFrame(extraer_paginas(client), columns=['socio_id', 'fecha'])
+            return datos.assign(gimnasio=GIMNASIO_DEFECTO), "Supabase"
+        except Exception as e:
+            logger.warning("Error extrayendo asistencia para el índice", extra={"error": e})
+    return get_simulated_asistencia(), "Datos simulados (fallback)"
+
+
+class IndiceCompartido:
+    """Índice del proceso, sincronizado con el archivo persistido por cualquier worker"""
+
+    def __init__(self, ruta=INDICE_ASISTENCIA_PATH, ttl_segundos=INDICE_TTL_SEGUNDOS, cache=None):
+        self.ruta = ruta
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.Lock()
+        self._indice = None
+        self._mtime = 0.0
+        self._cache = cache
+        self.construcciones = 0
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            from utils.cache import obtener_cache
+            self._cache = obtener_cache()
+        return self._cache
+
+    def obtener(self, forzar=False) -> IndiceAsistencia:
+        with self._lock:
+            vigente = self._indice is not None and not forzar and self._vigente(self._mtime)
+            if vigente and self._mtime_archivo() <= self._mtime:
+                registrar_cache("indice_asistencia", True)
+                return self._indice
+
+            if not forzar and self._adoptar_archivo():
+                registrar_cache("indice_asistencia", True)
+                return self._indice
+
+            registrar_cache("indice_asistencia", False)
+            with self.cache.bloqueo(CLAVE_CACHE):
+                # Mientras se esperaba el bloqueo otro worker pudo haberlo reconstruido
+                if not forzar and self._adoptar_archivo():
+                    return self._indice
+                self._reconstruir()
+            return self._indice
+
+    def invalidar(self):
+        with self._lock:
+            self._indice = None
+            self._mtime = 0.0
+
+    def _vigente(self, mtime):
+        return time.time() - mtime < self.ttl_segundos
+
+    def _mtime_archivo(self):
+        try:
+            return os.path.getmtime(self.ruta)
+        except OSError:
+            return 0.0
+
+    def _adoptar_archivo(self) -> bool:
+        """Carga el índice persistido si es más nuevo que el de memoria y sigue vigente"""
+        mtime = self._mtime_archivo()
+        if not mtime or not self._vigente(mtime):
+            return False
+        if mtime > self._mtime:
+            try:
+                self._indice = IndiceAsistencia.cargar(self.ruta)
+            except Exception as e:
+                logger.warning("Índice de asistencia ilegible", extra={"ruta": self.ruta, "error": e})
+                return False
+            self._mtime = mtime
+        return self._indice is not None
+
+    def _reconstruir(self):
+        self.construcciones += 1
+        try:
+            asistencia_df, fuente = extraer_asistencia()
+            indice = IndiceAsistencia.desde_asistencia(asistencia_df, fuente, simulado=fuente != "Supabase")
+        except Exception as e:
+            logger.error("Error construyendo el índice de asistencia", extra={"error": e})
+            if self._indice is not None:
+                return
+            raise
+
+        self._indice = indice
+        try:
+            indice.guardar(self.ruta)
+            self._mtime = self._mtime_archivo()
+        except OSError as e:
+            # Sin disco escribible el índice sigue sirviendo desde memoria
+            logger.warning("No se pudo persistir el índice de asistencia", extra={"ruta": self.ruta, "error": e})
+            self._mtime = time.time()
+        logger.info("Índice de asistencia construido", extra={
+            "socios": indice.n_socios, "asistencias": indice.n_asistencias, "fuente": fuente
+        })
+
+
+# Instancia compartida por todo el proceso
+indice_asistencia = IndiceCompartido()
+
+
+def obtener_indice(forzar=False) -> IndiceAsistencia:
+    """Atajo al índice compartido del proceso"""
+    return indice_asistencia.obtener(forzar=forzar)
@@ -0,0 +1,124 @@
+"""
+Logging estructurado para los modelos
+-------------------------------------
+
+Reemplaza los print() de depuración de los run():
+
+    logger = obtener_logger(__name__)
+    logger.debug("CSV cargado", extra={"archivo": ruta, "filas": len(df)})
+
+- Formateo perezoso: el mensaje y los campos `extra` solo se formatean si el
+  registro pasa el nivel (LOG_LEVEL, por defecto INFO).
+- Salida asíncrona: los registros se encolan (QueueHandler) y un hilo
+  (QueueListener) escribe a stdout; el request nunca hace I/O de logging.
+- Muestreo: LOG_MUESTREO (0-1) deja pasar solo esa fracción de los DEBUG/INFO;
+  WARNING y superiores se registran siempre.
+- Formato logfmt (clave=valor) para que Render / cualquier agregador pueda
+  filtrar por campo.
+"""
+
+import os
+import sys
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+import threading
+
+NIVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+MUESTREO = float(os.environ.get("LOG_MUESTREO", 1.0))
+RAIZ = "gymmaster"
+
+# Atributos estándar de LogRecord; el resto son campos `extra` del registro
+_ATRIBUTOS_ESTANDAR = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener = None
+_config_lock = threading.Lock()
+
+
+class FormatoLogfmt(logging.Formatter):
+    """ts=... nivel=... logger=... msg="..." clave=valor ..."""
+
+    def format(self, record):
+        campos = [
+            f"ts={self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}",
+            f"nivel={record.levelname}",
+            f"logger={record.name}",
+            f"msg={_valor_logfmt(record.getMessage())}",
+        ]
+        campos += [
+            f"{clave}={_valor_logfmt(valor)}"
+            for clave, valor in vars(record).items()
+            if clave not in _ATRIBUTOS_ESTANDAR
+        ]
+        if record.exc_info:
+            campos.append(f"error={_valor_logfmt(self.formatException(record.exc_info))}")
+        return " ".join(campos)
+
+
+def _valor_logfmt(valor):
+    texto = str(valor)
+    if texto == "" or any(c in texto for c in ' "=\n'):
+        return '"' + texto.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+    return texto
+
+
+class FiltroMuestreo(logging.Filter):
+    """Deja pasar una fracción de los registros por debajo de WARNING"""
+
+    def __init__(self, tasa=MUESTREO):
+        super().__init__()
+        self.tasa = tasa
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.tasa >= 1 or random.random() < self.tasa
+
+
+class _QueueHandlerSinCopia(logging.handlers.QueueHandler):
+    """
+    QueueHandler.prepare() formatea el mensaje en el hilo que loguea; acá se
+    difiere todo al hilo del listener (los argumentos ya son inmutables o
+    se convierten a str recién al escribir).
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def configurar_logging(nivel=NIVEL, muestreo=MUESTREO, destino=None):
+    """
+    Configura (una sola vez) el logger raíz del proyecto con cola + hilo escritor.
+    Llamadas posteriores solo ajustan nivel y muestreo.
+    """
+    global _listener
+
+    with _config_lock:
+        raiz = logging.getLogger(RAIZ)
+        raiz.setLevel(getattr(logging, str(nivel).upper(), logging.INFO))
+        raiz.propagate = False
+
+        if _listener is None:
+            salida = logging.StreamHandler(destino or sys.stdout)
+            salida.setFormatter(FormatoLogfmt())
+            cola = queue.SimpleQueue()
+            _listener = logging.handlers.QueueListener(cola, salida, respect_handler_level=True)
+            _listener.start()
+            atexit.register(_listener.stop)
+
+            handler = _QueueHandlerSinCopia(cola)
+            handler.addFilter(FiltroMuestreo(muestreo))
+            raiz.addHandler(handler)
+        else:
+            for handler in raiz.handlers:
+                for filtro in handler.filters:
+                    if isinstance(filtro, FiltroMuestreo):
+                        filtro.tasa = muestreo
+        return raiz
+
+
+def obtener_logger(nombre):
+    """Logger hijo de 'gymmaster' (ej: gymmaster.models.prediccion_asistencia)"""
+    if _listener is None:
+        configurar_logging()
+    return logging.getLogger(f"{RAIZ}.{nombre}")
@@ -0,0 +1,184 @@
+"""
+Métricas Prometheus
+-------------------
+
+Expone en `/metrics`:
+
+- gymmaster_request_duration_seconds{metodo, ruta, status}: latencia por endpoint
+  (ruta = plantilla de FastAPI, ej. /api/socios/{id_socio}/rutina).
+- gymmaster_etapa_duration_seconds{modelo, etapa}: duración de cada etapa de los
+  run() (carga de CSV, extracción ETL, agregación, clustering, serialización...).
+- gymmaster_cache_total{cache, resultado}: aciertos/fallos de cada cache
+  (snapshot, catálogo, rutinas, ETag, compresión...).
+- gymmaster_modelos_en_cola / gymmaster_modelos_en_curso: ejecuciones de modelos
+  esperando un hilo del executor y ejecutándose.
+
+prometheus_client es opcional: sin él las métricas no registran nada y /metrics
+responde 503.
+
+Con varios workers (gunicorn.conf.py) PROMETHEUS_MULTIPROC_DIR apunta a un
+directorio común: cada proceso escribe sus valores ahí y /metrics agrega los de
+todos los workers, sin importar cuál atienda el scrape.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+    )
+except ImportError:  # pragma: no cover - depende del entorno
+    CONTENT_TYPE_LATEST = "text/plain; charset=utf-8"
+    Counter = Gauge = Histogram = generate_latest = None
+
+# Buckets pensados para endpoints analíticos: de pocos ms (cache) a decenas de segundos (ETL)
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class _MetricaNula:
+    """Reemplazo sin efecto cuando prometheus_client no está instalado"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, valor):
+        pass
+
+    def inc(self, valor=1):
+        pass
+
+    def dec(self, valor=1):
+        pass
+
+
+if Histogram is not None:
+    LATENCIA_REQUEST = Histogram(
+        "gymmaster_request_duration_seconds", "Latencia de requests HTTP por ruta",
+        ["metodo", "ruta", "status"], buckets=BUCKETS_LATENCIA
+    )
+    LATENCIA_ETAPA = Histogram(
+        "gymmaster_etapa_duration_seconds", "Duración de cada etapa dentro de los modelos",
+        ["modelo", "etapa"], buckets=BUCKETS_LATENCIA
+    )
+    EVENTOS_CACHE = Counter(
+        "gymmaster_cache", "Aciertos y fallos de cache", ["cache", "resultado"]
+    )
+    # livesum: en modo multiproceso se suman los workers vivos
+    MODELOS_EN_COLA = Gauge(
+        "gymmaster_modelos_en_cola", "Ejecuciones de modelos esperando un hilo del executor",
+        multiprocess_mode="livesum"
+    )
+    MODELOS_EN_CURSO = Gauge(
+        "gymmaster_modelos_en_curso", "Ejecuciones de modelos en curso",
+        multiprocess_mode="livesum"
+    )
+else:
+    LATENCIA_REQUEST = LATENCIA_ETAPA = EVENTOS_CACHE = MODELOS_EN_COLA = MODELOS_EN_CURSO = _MetricaNula()
+
+
+def metricas_habilitadas():
+    return generate_latest is not None
+
+
+@contextmanager
+def medir_etapa(modelo, etapa):
+    """
+    Mide la duración de un bloque:
+
+        with medir_etapa("clustering_equipos", "carga_snapshot"):
+            datos = cargar_datos_equipamiento()
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        LATENCIA_ETAPA.labels(modelo=modelo, etapa=etapa).observe(time.perf_counter() - inicio)
+
+
+def registrar_cache(cache, acierto):
+    EVENTOS_CACHE.labels(cache=cache, resultado="acierto" if acierto else "fallo").inc()
+
+
+async def ejecutar_modelo(funcion, *args, **kwargs):
+    """
+    Ejecuta un run() bloqueante en el threadpool (no bloquea el event loop) midiendo
+    cuántas ejecuciones esperan hilo y cuántas están en curso. Si un admin pidió
+    perfilar el request, el run() se ejecuta bajo el perfilador.
+    """
+    from starlette.concurrency import run_in_threadpool
+    from utils.perfilado import perfil_actual, ejecutar_perfilado, registrar_perfil_generado
+
+    # Perfilado pedido por un admin para este request (ver utils/perfilado.py)
+    modo_perfil = perfil_actual()
+
+    MODELOS_EN_COLA.inc()
+    en_cola = True
+
+    def _ejecutar():
+        nonlocal en_cola
+        MODELOS_EN_COLA.dec()
+        en_cola = False
+        MODELOS_EN_CURSO.inc()
+        try:
+            if modo_perfil:
+                etiqueta = f"{getattr(funcion, '__module__', '')}.{getattr(funcion, '__name__', 'run')}"
+                return ejecutar_perfilado(modo_perfil, etiqueta, funcion, *args, **kwargs)
+            return funcion(*args, **kwargs)
+        finally:
+            MODELOS_EN_CURSO.dec()
+
+    try:
+        resultado = await run_in_threadpool(_ejecutar)
+    finally:
+        # Cancelado antes de obtener un hilo
+        if en_cola:
+            MODELOS_EN_COLA.dec()
+
+    if modo_perfil:
+        resultado, archivo = resultado
+        registrar_perfil_generado(archivo)
+    return resultado
+
+
+def exportar():
+    """(cuerpo, content-type) del formato de texto de Prometheus"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import CollectorRegistry, multiprocess
+
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+        return generate_latest(registro), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricasMiddleware:
+    """Middleware ASGI que registra la latencia de cada request con la plantilla de ruta"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = 500
+
+        async def send_con_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_con_status)
+        finally:
+            ruta = scope.get("route")
+            # Plantilla y no path real: los ids en la URL no deben crear series nuevas
+            plantilla = getattr(ruta, "path", None) or "sin_ruta"
+            LATENCIA_REQUEST.labels(
+                metodo=scope["method"], ruta=plantilla, status=str(status)
+            ).observe(time.perf_counter() - inicio)
@@ -0,0 +1,222 @@
+"""
+Perfilado bajo demanda (solo administradores)
+---------------------------------------------
+
+Permite perfilar un request puntual en producción sin redeploy:
+
+    GET /ranking-equipos?perfil=cpu          (o header X-Perfil: cpu)
+    X-Admin-Token: <ADMIN_TOKEN>
+
+Modos:
+- cpu: pyinstrument (muestreo, reporte HTML) si está instalado; si no cProfile
+  (archivo .prof para snakeviz/pstats + resumen .txt).
+- memoria: tracemalloc, top de asignaciones por línea durante la ejecución del modelo.
+
+El perfil envuelve cada llamada al run() de un modelo (ver utils.metricas.ejecutar_modelo)
+y se guarda en output/perfiles; la respuesta lleva los nombres de los archivos en
+X-Perfil-Archivo (separados por coma si el endpoint ejecutó varios modelos) y cada
+uno se descarga con GET /api/admin/perfiles/{archivo}.
+
+ETagMiddleware es más externo que este middleware: para que haya algo que perfilar,
+un request con perfil nunca recibe 304 ni la respuesta cacheada por ETag. Si el
+endpoint no ejecuta ningún modelo (o responde desde otra cache) no hay header.
+
+Sin ADMIN_TOKEN configurado el perfilado está deshabilitado.
+"""
+
+import os
+import re
+import hmac
+import time
+import threading
+import contextvars
+from datetime import datetime
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+PERFILES_DIR = os.path.join(PROJECT_ROOT, 'output', 'perfiles')
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+MODOS = ("cpu", "memoria")
+TOP_ASIGNACIONES = 25
+
+# Modo pedido para el request actual; lo lee ejecutar_modelo() en el event loop
+_perfil_solicitado = contextvars.ContextVar("perfil_solicitado", default=None)
+# Archivos generados durante el request, para devolverlos en el header de la respuesta.
+# Es una lista que crea el middleware y a la que se agrega: así los perfiles de todas
+# las llamadas a ejecutar_modelo() llegan al middleware aunque corran en otro contexto
+_perfiles_generados = contextvars.ContextVar("perfiles_generados", default=None)
+
+# tracemalloc es global al proceso: un solo perfil de memoria a la vez
+_memoria_lock = threading.Lock()
+
+
+def token_valido(token):
+    return bool(ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def perfil_actual():
+    return _perfil_solicitado.get()
+
+
+def _nombre_archivo(etiqueta, modo, extension):
+    etiqueta = re.sub(r"[^A-Za-z0-9_.-]+", "_", etiqueta).strip("_") or "request"
+    return f"{datetime.now():%Y%m%d_%H%M%S_%f}_{etiqueta}_{modo}.{extension}"
+
+
+def _guardar(nombre, contenido, binario=False):
+    os.makedirs(PERFILES_DIR, exist_ok=True)
+    ruta = os.path.join(PERFILES_DIR, nombre)
+    with open(ruta, "wb" if binario else "w", encoding=None if binario else "utf-8") as f:
+        f.write(contenido)
+    return ruta
+
+
+def ejecutar_perfilado(modo, etiqueta, funcion, *args, **kwargs):
+    """
+    Ejecuta funcion(*args, **kwargs) bajo el perfilador indicado y guarda el resultado.
+
+    Returns:
+        tuple: (resultado de la función, nombre del archivo de perfil)
+    """
+    if modo == "memoria":
+        return _perfilar_memoria(etiqueta, funcion, *args, **kwargs)
+    return _perfilar_cpu(etiqueta, funcion, *args, **kwargs)
+
+
+def _perfilar_cpu(etiqueta, funcion, *args, **kwargs):
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+
+    if Profiler is not None:
+        perfilador = Profiler(async_mode="disabled")
+        perfilador.start()
+        try:
+            resultado = funcion(*args, **kwargs)
+        finally:
+            perfilador.stop()
+        nombre = _nombre_archivo(etiqueta, "cpu", "html")
+        _guardar(nombre, perfilador.output_html())
+        return resultado, nombre
+
+    import cProfile
+    import io
+    import pstats
+
+    perfilador = cProfile.Profile()
+    perfilador.enable()
+    try:
+        resultado = funcion(*args, **kwargs)
+    finally:
+        perfilador.disable()
+
+    nombre = _nombre_archivo(etiqueta, "cpu", "prof")
+    os.makedirs(PERFILES_DIR, exist_ok=True)
+    perfilador.dump_stats(os.path.join(PERFILES_DIR, nombre))
+    resumen = io.StringIO()
+    pstats.Stats(perfilador, stream=resumen).sort_stats("cumulative").print_stats(40)
+    _guardar(nombre.replace(".prof", ".txt"), resumen.getvalue())
+    return resultado, nombre
+
+
+def _perfilar_memoria(etiqueta, funcion, *args, **kwargs):
+    import tracemalloc
+
+    with _memoria_lock:
+        ya_activo = tracemalloc.is_tracing()
+        if not ya_activo:
+            tracemalloc.start(10)
+        tracemalloc.reset_peak()
+        antes = tracemalloc.take_snapshot()
+        inicio = time.perf_counter()
+        try:
+            resultado = funcion(*args, **kwargs)
+        finally:
+            despues = tracemalloc.take_snapshot()
+            _, pico = tracemalloc.get_traced_memory()
+            if not ya_activo:
+                tracemalloc.stop()
+
+    diferencias = despues.compare_to(antes, "lineno")
+    lineas = [
+        f"Perfil de memoria: {etiqueta}",
+        f"Duración: {time.perf_counter() - inicio:.3f} s",
+        f"Pico de memoria trazada: {pico / 1024 / 1024:.2f} MiB",
+        "",
+        f"Top {TOP_ASIGNACIONES} diferencias por línea:",
+    ]
+    lineas += [str(estadistica) for estadistica in diferencias[:TOP_ASIGNACIONES]]
+
+    nombre = _nombre_archivo(etiqueta, "memoria", "txt")
+    _guardar(nombre, "\n".join(lineas) + "\n")
+    return resultado, nombre
+
+
+def registrar_perfil_generado(nombre):
+    generados = _perfiles_generados.get()
+    if generados is not None:
+        generados.append(nombre)
+
+
+def ruta_perfil(nombre):
+    """Ruta del archivo de perfil o None si el nombre no es válido / no existe"""
+    if not re.fullmatch(r"[A-Za-z0-9_.-]+", nombre or ""):
+        return None
+    ruta = os.path.join(PERFILES_DIR, nombre)
+    return ruta if os.path.isfile(ruta) else None
+
+
+def modo_solicitado(scope):
+    """Modo pedido por X-Perfil o ?perfil= ("" si el request no pide perfil)"""
+    modo = dict(scope["headers"]).get(b"x-perfil", b"").decode("latin-1").strip().lower()
+    if not modo:
+        consulta = scope.get("query_string", b"").decode("latin-1")
+        encontrado = re.search(r"(?:^|&)perfil=([^&]*)", consulta)
+        modo = encontrado.group(1).lower() if encontrado else ""
+    return modo
+
+
+class PerfiladoMiddleware:
+    """
+    Lee ?perfil= / X-Perfil, valida X-Admin-Token y deja el modo en un contextvar
+    para que ejecutar_modelo() perfile el run() del request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        modo = modo_solicitado(scope)
+        if not modo:
+            await self.app(scope, receive, send)
+            return
+
+        token = headers.get(b"x-admin-token", b"").decode("latin-1")
+        if modo not in MODOS or not token_valido(token):
+            from utils.respuestas import RespuestaJSON
+            error = "Perfilado no autorizado" if modo in MODOS else f"Modo de perfil inválido (usar {', '.join(MODOS)})"
+            await RespuestaJSON({"error": error}, status_code=403 if modo in MODOS else 400)(scope, receive, send)
+            return
+
+        generados = []
+        token_modo = _perfil_solicitado.set(modo)
+        token_archivos = _perfiles_generados.set(generados)
+
+        async def send_con_perfil(message):
+            if message["type"] == "http.response.start" and generados:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-perfil-archivo", ", ".join(generados).encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_con_perfil)
+        finally:
+            _perfil_solicitado.reset(token_modo)
+            _perfiles_generados.reset(token_archivos)
@@ -0,0 +1,133 @@
+"""
+Respuestas JSON rápidas
+-----------------------
+
+`RespuestaJSON` serializa con orjson, que entiende directamente escalares y
+arrays de NumPy, datetime/date y pandas.Timestamp. NaN e ±inf se envían como
+null (el JSON estándar no los admite).
+
+`RutaJSONRapida` hace que los endpoints que devuelven dict/list se envuelvan en
+`RespuestaJSON` sin pasar por `jsonable_encoder`, que recorre y copia todo el
+payload antes de serializarlo.
+
+Si orjson no está instalado se usa json de la librería estándar con la misma
+política (más lento, mismo resultado).
+"""
+
+import sys
+import functools
+import inspect
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+from utils.metricas import medir_etapa
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+
+def _por_defecto(valor):
+    """Tipos que orjson/json no serializan por sí solos"""
+    # numpy/pandas no se importan acá: si el valor es de esos tipos el módulo ya está cargado
+    np = sys.modules.get("numpy")
+    pd = sys.modules.get("pandas")
+    if np is not None:
+        if isinstance(valor, np.generic):
+            return valor.item()
+        if isinstance(valor, np.ndarray):
+            return valor.tolist()
+    if pd is not None:
+        if isinstance(valor, (pd.Series, pd.Index)):
+            return valor.tolist()
+        if isinstance(valor, pd.DataFrame):
+            return valor.to_dict('records')
+        if valor is pd.NaT or valor is pd.NA:
+            return None
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (set, frozenset, tuple)):
+        return list(valor)
+    raise TypeError(f"Tipo no serializable a JSON: {type(valor).__name__}")
+
+
+def _limpiar_no_finitos(valor):
+    """Solo para el fallback sin orjson: NaN/±inf → None, recorriendo el payload"""
+    if isinstance(valor, float):
+        return valor if math.isfinite(valor) else None
+    if isinstance(valor, dict):
+        return {k: _limpiar_no_finitos(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_limpiar_no_finitos(v) for v in valor]
+    if isinstance(valor, (set, frozenset)) or type(valor).__module__.split(".")[0] in ("numpy", "pandas"):
+        return _limpiar_no_finitos(_por_defecto(valor))
+    return valor
+
+
+def serializar_json(contenido) -> bytes:
+    """Serializa a bytes UTF-8 con la política de la API (numpy nativo, NaN → null)"""
+    if orjson is not None:
+        return orjson.dumps(
+            contenido,
+            default=_por_defecto,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(
+        _limpiar_no_finitos(contenido),
+        default=_por_defecto,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+class RespuestaJSON(JSONResponse):
+    """JSONResponse serializada con orjson (fallback a json)"""
+
+    def render(self, content) -> bytes:
+        with medir_etapa("respuesta", "serializacion"):
+            return serializar_json(content)
+
+
+class RutaJSONRapida(APIRoute):
+    """
+    APIRoute que convierte el dict/list devuelto por el endpoint directamente en
+    RespuestaJSON. Las rutas con response_model siguen el camino normal de FastAPI
+    (validación + jsonable_encoder).
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        response_model = kwargs.get("response_model")
+        if isinstance(response_model, DefaultPlaceholder):
+            # FastAPI infiere el response_model de la anotación de retorno
+            response_model = getattr(endpoint, "__annotations__", {}).get("return")
+        if response_model is None:
+            endpoint = _envolver_endpoint(endpoint, kwargs.get("status_code"))
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _envolver_endpoint(endpoint, status_code=None):
+    def _respuesta(resultado):
+        if isinstance(resultado, (dict, list)):
+            return RespuestaJSON(resultado, status_code=status_code or 200)
+        return resultado
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def envuelto(*args, **kwargs):
+            return _respuesta(await endpoint(*args, **kwargs))
+    else:
+        @functools.wraps(endpoint)
+        def envuelto(*args, **kwargs):
+            return _respuesta(endpoint(*args, **kwargs))
+
+    return envuelto
@@ -0,0 +1,117 @@
+"""
+Serialización columnar a JSON
+-----------------------------
+
+Los modelos arman sus respuestas como listas de dicts. En lugar de recorrer
+DataFrames con iterrows() y castear campo por campo, se convierte cada columna
+una sola vez (NumPy → tipos nativos de Python con tolist()) y se arman los
+registros con zip.
+
+    registros({
+        "nombre": columna_json(df['nombre'], 'str'),
+        "uso": columna_json(df['uso_diario_promedio'], 'int'),
+        "utilizacion": columna_json(df['utilizacion_porcentaje'], 'float')
+    })
+"""
+
+import numpy as np
+import pandas as pd
+
+# Marca "no se pasó defecto" (None es un valor válido: se serializa como null)
+_SIN_DEFECTO = object()
+
+
+def sanitizar(valores, decimales=2, reemplazo=0.0):
+    """
+    Versión vectorizada de sanitize_value: NaN/±inf → `reemplazo` y redondeo.
+
+    Returns:
+        np.ndarray de float64.
+    """
+    arreglo = pd.to_numeric(pd.Series(valores), errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    if reemplazo is not None:
+        arreglo = np.where(np.isfinite(arreglo), arreglo, reemplazo)
+    if decimales is not None:
+        arreglo = np.round(arreglo, decimales)
+    return arreglo
+
+
+def columna_json(valores, tipo=None, decimales=None, defecto=_SIN_DEFECTO):
+    """
+    Convierte una columna a lista de valores JSON-safe.
+
+    Args:
+        valores: Serie, array o lista.
+        tipo: 'float', 'int', 'str', 'fecha' o None (se infiere del dtype).
+        decimales: redondeo para 'float'.
+        defecto: valor para nulos/no finitos (None → null en JSON). Si no se
+            indica: 0 en 'int'/'float', 'N/A' en 'str' y null en el resto.
+    """
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores)
+
+    if tipo is None:
+        if pd.api.types.is_bool_dtype(serie):
+            tipo = 'bool'
+        elif pd.api.types.is_integer_dtype(serie):
+            tipo = 'int'
+        elif pd.api.types.is_float_dtype(serie):
+            tipo = 'float'
+        elif pd.api.types.is_datetime64_any_dtype(serie):
+            tipo = 'fecha'
+        else:
+            tipo = 'objeto'
+
+    if tipo in ('float', 'int'):
+        arreglo = sanitizar(serie, decimales=decimales if tipo == 'float' else None, reemplazo=np.nan)
+        validos = np.isfinite(arreglo)
+        relleno = 0 if defecto is _SIN_DEFECTO else defecto
+        if tipo == 'int':
+            lista = np.trunc(np.where(validos, arreglo, 0)).astype(np.int64).tolist()
+        else:
+            lista = np.where(validos, arreglo, 0.0).tolist()
+        if not validos.all():
+            lista = [v if ok else relleno for v, ok in zip(lista, validos.tolist())]
+        return lista
+
+    if tipo == 'bool':
+        return serie.fillna(False).astype(bool).tolist()
+
+    if defecto is _SIN_DEFECTO:
+        defecto = 'N/A' if tipo == 'str' else None
+
+    if tipo == 'fecha':
+        fechas = pd.to_datetime(serie, errors='coerce')
+        texto = fechas.dt.strftime('%Y-%m-%d')
+        return texto.astype(object).where(fechas.notna(), defecto).tolist()
+
+    if tipo == 'str':
+        return serie.astype(str).where(serie.notna(), defecto).tolist()
+
+    return serie.astype(object).where(serie.notna(), defecto).tolist()
+
+
+def registros(columnas):
+    """
+    Arma la lista de dicts a partir de {clave: lista de valores}, todas del mismo largo.
+    """
+    claves = list(columnas)
+    return [dict(zip(claves, fila)) for fila in zip(*columnas.values())]
+
+
+def registros_df(df, decimales=2):
+    """
+    DataFrame → lista de dicts JSON-safe: fechas como AAAA-MM-DD, floats redondeados
+    y NaN/NaT como None.
+    """
+    columnas = {}
+    for columna in df.columns:
+        serie = df[columna]
+        if pd.api.types.is_float_dtype(serie):
+            columnas[columna] = columna_json(serie, 'float', decimales=decimales, defecto=None)
+        elif pd.api.types.is_datetime64_any_dtype(serie):
+            columnas[columna] = columna_json(serie, 'fecha')
+        else:
+            columnas[columna] = columna_json(serie)
+    if not columnas:
+        return [{} for _ in range(len(df))]
+    return registros(columnas)
@@ -0,0 +1,176 @@
+"""
+Series diarias con sumas acumuladas (prefix sums)
+-------------------------------------------------
+
+Asistencias, cantidad de pagos e ingresos por gimnasio y por día, guardados
+como sumas acumuladas: el total de cualquier rango [desde, hasta] es
+acumulado[hasta + 1] - acumulado[desde], O(1) sin importar el largo del rango,
+y una serie por semana/mes es una resta por tramo.
+
+Cada métrica es una matriz (gimnasios + 1, días + 1): la última fila es la
+suma de todos los gimnasios. Los días van desde la primera fecha con datos;
+consultar fuera del rango con datos suma 0.
+
+Fuentes: el índice de asistencia (utils/indice_asistencia.py, el gimnasio de
+cada asistencia) y el CSV de pagos del Data Lake (el mismo que proyeccion_ingresos).
+"""
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+from utils.logs import obtener_logger
+from utils.metricas import registrar_cache
+
+logger = obtener_logger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+PAGOS_PATHS = (
+    os.path.join(PROJECT_ROOT, 'ia', 'Data_Lake_CSV', 'pagos_supabase.csv'),
+    os.path.join(PROJECT_ROOT, 'ia', 'data_science', 'Data_Lake_CSV', 'pagos_simulados.csv'),
+)
+# Los pagos no registran gimnasio (igual que la tabla asistencia de Supabase)
+GIMNASIO_DEFECTO = "gym_master"
+
+METRICAS = ("asistencias", "pagos", "ingresos")
+GRANULARIDADES = ("dia", "semana", "mes")
+
+
+class SeriesDiarias:
+    """Sumas acumuladas por gimnasio y día de cada métrica"""
+
+    def __init__(self, dia_inicial, acumulados, gimnasios, version=None, fuentes=None):
+        self.dia_inicial = int(dia_inicial)
+        self.acumulados = acumulados
+        self.gimnasios = np.asarray(gimnasios, dtype=str)
+        self.version = version
+        self.fuentes = fuentes or {}
+        self.n_dias = next(iter(acumulados.values())).shape[1] - 1 if acumulados else 0
+
+    @classmethod
+    def desde_eventos(cls, eventos, gimnasios, version=None, fuentes=None):
+        """
+        eventos: {métrica: (días int64, posición del gimnasio, peso o None)}; cada
+        evento suma su peso (o 1) al día y gimnasio correspondientes.
+        """
+        todos = [dias for dias, _, _ in eventos.values() if len(dias)]
+        dia_inicial = min(int(dias.min()) for dias in todos) if todos else 0
+        dia_final = max(int(dias.max()) for dias in todos) if todos else -1
+        n_dias, n_gimnasios = dia_final - dia_inicial + 1, len(gimnasios)
+
+        acumulados = {}
+        for metrica, (dias, gimnasio, peso) in eventos.items():
+            diarios = np.zeros((n_gimnasios + 1, n_dias), dtype=np.float64)
+            if len(dias):
+                posiciones = gimnasio.astype(np.int64) * n_dias + (dias - dia_inicial)
+                diarios[:n_gimnasios] = np.bincount(
+                    posiciones, weights=peso, minlength=n_gimnasios * n_dias
+                ).reshape(n_gimnasios, n_dias)
+                diarios[n_gimnasios] = diarios[:n_gimnasios].sum(axis=0)
+            acumulado = np.zeros((n_gimnasios + 1, n_dias + 1), dtype=np.float64)
+            np.cumsum(diarios, axis=1, out=acumulado[:, 1:])
+            acumulados[metrica] = acumulado
+        return cls(dia_inicial, acumulados, gimnasios, version, fuentes)
+
+    def fila(self, gimnasio=None):
+        """Fila de las matrices para el gimnasio (None = todos); None si no existe"""
+        if gimnasio is None:
+            return len(self.gimnasios)
+        posiciones = np.flatnonzero(self.gimnasios == gimnasio)
+        return int(posiciones[0]) if len(posiciones) else None
+
+    def _posiciones(self, dias):
+        return np.clip(np.asarray(dias, dtype=np.int64) - self.dia_inicial, 0, self.n_dias)
+
+    def totales(self, inicios, fines, gimnasio=None) -> dict:
+        """{métrica: array de totales de cada tramo [inicios[i], fines[i]]} (días inclusive)"""
+        fila = self.fila(gimnasio)
+        desde, hasta = self._posiciones(inicios), self._posiciones(np.asarray(fines) + 1)
+        return {
+            metrica: (acumulado[fila, hasta] - acumulado[fila, desde]) if fila is not None
+            else np.zeros(len(desde))
+            for metrica, acumulado in self.acumulados.items()
+        }
+
+    def total(self, desde, hasta, gimnasio=None) -> dict:
+        """{métrica: total en [desde, hasta]} en O(1)"""
+        return {metrica: float(valores[0]) for metrica, valores in self.totales([desde], [hasta], gimnasio).items()}
+
+
+def tramos(desde, hasta, granularidad="dia"):
+    """(inicios, fines) en días de los períodos de la granularidad que cubren [desde, hasta], recortados"""
+    if granularidad == "dia":
+        inicios = np.arange(desde, hasta + 1, dtype=np.int64)
+    elif granularidad == "semana":
+        # Lunes de cada semana (1970-01-01 fue jueves)
+        inicios = np.arange(((desde + 3) // 7) * 7 - 3, hasta + 1, 7, dtype=np.int64)
+    elif granularidad == "mes":
+        meses = np.arange(np.datetime64(int(desde), 'D').astype('datetime64[M]'),
+                          np.datetime64(int(hasta), 'D').astype('datetime64[M]') + 1)
+        inicios = meses.astype('datetime64[D]').astype(np.int64)
+    else:
+        raise ValueError(f"Granularidad inválida: {granularidad} (opciones: {', '.join(GRANULARIDADES)})")
+    fines = np.append(inicios[1:] - 1, hasta)
+    return np.maximum(inicios, desde), fines
+
+
+def cargar_pagos():
+    """(DataFrame fecha_pago/monto[/dias_retraso], fuente) del primer CSV de pagos disponible"""
+    for ruta in PAGOS_PATHS:
+        if os.path.exists(ruta):
+            columnas = pd.read_csv(ruta, nrows=0).columns
+            monto_col = 'monto_pagado' if 'monto_pagado' in columnas else 'monto'
+            usecols = ['fecha_pago', monto_col] + (['dias_retraso'] if 'dias_retraso' in columnas else [])
+            pagos_df = pd.read_csv(ruta, usecols=usecols)
+            return pagos_df.rename(columns={monto_col: 'monto'}), os.path.basename(ruta)
+    return pd.DataFrame(columns=['fecha_pago', 'monto']), None
+
+
+def huella_pagos():
+    return tuple(os.path.getmtime(ruta) if os.path.exists(ruta) else 0.0 for ruta in PAGOS_PATHS)
+
+
+def construir_series(indice) -> SeriesDiarias:
+    """Series de asistencias (índice de asistencia) y pagos/ingresos (CSV de pagos)"""
+    gimnasios = list(indice.gimnasios)
+    if GIMNASIO_DEFECTO not in gimnasios:
+        gimnasios.append(GIMNASIO_DEFECTO)
+
+    # Cada asistencia cuenta en el gimnasio donde ocurrió; sin gimnasio conocido, en el gimnasio por defecto
+    gimnasio_visita = indice.gimnasio_visita.astype(np.int64)
+    gimnasio_visita[gimnasio_visita < 0] = gimnasios.index(GIMNASIO_DEFECTO)
+
+    pagos_df, fuente_pagos = cargar_pagos()
+    fechas = pd.to_datetime(pagos_df['fecha_pago'], errors='coerce', utc=True).dt.tz_localize(None)
+    montos = pd.to_numeric(pagos_df['monto'], errors='coerce')
+    validos = (fechas.notna() & montos.notna() & np.isfinite(montos)).to_numpy()
+    dias_pago = fechas.to_numpy()[validos].astype('datetime64[D]').astype(np.int64)
+    gimnasio_pago = np.full(len(dias_pago), gimnasios.index(GIMNASIO_DEFECTO), dtype=np.int64)
+
+    return SeriesDiarias.desde_eventos(
+        {
+            "asistencias": (indice.dias.astype(np.int64), gimnasio_visita, None),
+            "pagos": (dias_pago, gimnasio_pago, None),
+            "ingresos": (dias_pago, gimnasio_pago, montos.to_numpy()[validos].astype(np.float64)),
+        },
+        gimnasios,
+        version=(indice.version, huella_pagos()),
+        fuentes={"asistencias": indice.fuente, "pagos": fuente_pagos}
+    )
+
+
+_series = None
+_series_lock = threading.Lock()
+
+
+def obtener_series(indice) -> SeriesDiarias:
+    """Series del índice de asistencia y CSV de pagos vigentes (se reconstruyen si alguno cambia)"""
+    global _series
+    with _series_lock:
+        vigente = _series is not None and _series.version == (indice.version, huella_pagos())
+        registrar_cache("series_diarias", vigente)
+        if not vigente:
+            _series = construir_series(indice)
+            logger.debug("Series diarias construidas", extra={"dias": _series.n_dias, "gimnasios": len(_series.gimnasios)})
+        return _series
@@ -0,0 +1,217 @@
+"""
+Snapshot compartido de equipamiento y mantenimiento
+---------------------------------------------------
+
+Las tablas `equipamiento` y `mantenimiento` se descargan una sola vez y se
+reutilizan en todos los análisis de equipos (semáforo, costo-beneficio,
+ranking de fallos y clustering).
+
+Refresco:
+- Dentro de SNAPSHOT_TTL segundos se devuelve el snapshot en memoria.
+- Con varios workers (gunicorn) el snapshot se publica en el cache compartido
+  (utils/cache.py): el worker que lo refresca lo deja disponible para el resto,
+  que lo adoptan en vez de volver a descargarlo. Solo un worker a la vez refresca.
+- Vencido el TTL se hace un refresco incremental: `equipamiento` completo
+  (son pocas filas) y solo los mantenimientos con fecha >= la última ya
+  descargada, deduplicados por id.
+- Cada SNAPSHOT_REFRESCO_COMPLETO segundos se vuelve a descargar todo para
+  reflejar filas borradas.
+"""
+
+import os
+import hashlib
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from utils.logs import obtener_logger
+from utils.metricas import registrar_cache
+
+logger = obtener_logger(__name__)
+
+SNAPSHOT_TTL_SEGUNDOS = int(os.environ.get("SNAPSHOT_TTL", 300))
+SNAPSHOT_REFRESCO_COMPLETO_SEGUNDOS = int(os.environ.get("SNAPSHOT_REFRESCO_COMPLETO", 86400))
+
+VALOR_REPOSICION_DEFECTO = 1000
+
+# Clave del snapshot en el cache compartido entre workers
+CLAVE_CACHE = "snapshot_equipamiento"
+
+
+def preparar_equipos(df_equipos: pd.DataFrame) -> pd.DataFrame:
+    """Convierte las columnas de fecha y completa valor_reposicion"""
+    df_equipos = df_equipos.copy()
+    if 'id' not in df_equipos.columns:
+        df_equipos['id'] = np.nan
+    if 'nombre' not in df_equipos.columns:
+        df_equipos['nombre'] = None
+    for columna in ['fecha_adquisicion', 'ultima_revision', 'proxima_revision']:
+        if columna not in df_equipos.columns:
+            df_equipos[columna] = pd.NaT
+        df_equipos[columna] = pd.to_datetime(df_equipos[columna], errors='coerce')
+
+    if 'valor_reposicion' not in df_equipos.columns:
+        df_equipos['valor_reposicion'] = VALOR_REPOSICION_DEFECTO
+    df_equipos['valor_reposicion'] = pd.to_numeric(df_equipos['valor_reposicion'], errors='coerce').fillna(0)
+    return df_equipos
+
+
+def preparar_mantenimientos(df_mantenimientos: pd.DataFrame) -> pd.DataFrame:
+    """Convierte fecha y costo de los mantenimientos"""
+    df_mantenimientos = df_mantenimientos.copy()
+    for columna in ['id', 'id_equipamiento', 'fecha_mantenimiento', 'costo', 'tipo_mantenimiento']:
+        if columna not in df_mantenimientos.columns:
+            df_mantenimientos[columna] = np.nan
+    df_mantenimientos['fecha_mantenimiento'] = pd.to_datetime(df_mantenimientos['fecha_mantenimiento'], errors='coerce')
+    df_mantenimientos['costo'] = pd.to_numeric(df_mantenimientos['costo'], errors='coerce').fillna(0)
+    return df_mantenimientos
+
+
+class SnapshotEquipamiento:
+    """Copia en memoria de equipamiento + mantenimiento con refresco incremental"""
+
+    def __init__(self, ttl_segundos=SNAPSHOT_TTL_SEGUNDOS, refresco_completo_segundos=SNAPSHOT_REFRESCO_COMPLETO_SEGUNDOS,
+                 cache=None):
+        self.ttl_segundos = ttl_segundos
+        self.refresco_completo_segundos = refresco_completo_segundos
+        self._lock = threading.Lock()
+        self._datos = None
+        self._refrescado_en = 0.0
+        self._completo_en = 0.0
+        self._cache = cache
+        self.extracciones = 0
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            from utils.cache import obtener_cache
+            self._cache = obtener_cache()
+        return self._cache
+
+    def obtener(self, forzar=False) -> dict:
+        """
+        Devuelve {'equipos', 'mantenimientos', 'fuente', 'version', 'actualizado_en'}.
+        Los DataFrames son compartidos: los análisis no deben modificarlos in-place.
+        """
+        with self._lock:
+            ahora = time.time()
+            vigente = self._datos is not None and not forzar and ahora - self._refrescado_en < self.ttl_segundos
+            registrar_cache("snapshot_equipamiento", vigente)
+            if vigente:
+                return self._datos
+
+            if not forzar and self._adoptar_compartido(ahora):
+                return self._datos
+
+            with self.cache.bloqueo(CLAVE_CACHE):
+                # Mientras se esperaba el bloqueo otro worker pudo haberlo refrescado
+                ahora = time.time()
+                if not forzar and self._adoptar_compartido(ahora):
+                    return self._datos
+
+                completo = (
+                    forzar
+                    or self._datos is None
+                    or ahora - self._completo_en >= self.refresco_completo_segundos
+                )
+                self._datos = self._refrescar(completo)
+                self._refrescado_en = ahora
+                if completo:
+                    self._completo_en = ahora
+                self.cache.guardar(CLAVE_CACHE, {
+                    "datos": self._datos,
+                    "refrescado_en": self._refrescado_en,
+                    "completo_en": self._completo_en
+                }, ttl=self.refresco_completo_segundos)
+            return self._datos
+
+    def _adoptar_compartido(self, ahora) -> bool:
+        """
+        Toma el snapshot publicado por otro worker. True si está vigente; si está
+        vencido pero este proceso no tiene datos, igual se adopta como base para
+        que el refresco sea incremental y no una descarga completa.
+        """
+        entrada = self.cache.obtener(CLAVE_CACHE)
+        if entrada is None or entrada["refrescado_en"] < self._refrescado_en:
+            return False
+        vigente = ahora - entrada["refrescado_en"] < self.ttl_segundos
+        if vigente or self._datos is None:
+            self._datos = entrada["datos"]
+            self._refrescado_en = entrada["refrescado_en"]
+            self._completo_en = entrada["completo_en"]
+        return vigente
+
+    def invalidar(self):
+        """Fuerza una descarga completa en el próximo obtener()"""
+        with self._lock:
+            self._datos = None
+            self._refrescado_en = 0.0
+            self.cache.borrar(CLAVE_CACHE)
+
+    def _refrescar(self, completo: bool) -> dict:
+        from utils.db import get_supabase_client, get_simulated_equipamiento, get_simulated_mantenimiento
+
+        self.extracciones += 1
+        client = get_supabase_client()
+        if client is None:
+            return self._armar(
+                get_simulated_equipamiento(), preparar_mantenimientos(get_simulated_mantenimiento()),
+                "Datos simulados (fallback)"
+            )
+
+        try:
+            equipos = pd.DataFrame(client.table('equipamiento').select('*').execute().data)
+
+            marca_agua = None
+            if not completo:
+                marca_agua = self._datos["mantenimientos"]['fecha_mantenimiento'].max()
+
+            query = client.table('mantenimiento').select('*')
+            if marca_agua is not None and pd.notna(marca_agua):
+                # Se repite el último día para no perder mantenimientos cargados en esa misma fecha
+                query = query.gte('fecha_mantenimiento', marca_agua.strftime('%Y-%m-%d'))
+            nuevos = preparar_mantenimientos(pd.DataFrame(query.execute().data))
+
+            if marca_agua is not None and pd.notna(marca_agua):
+                mantenimientos = pd.concat([self._datos["mantenimientos"], nuevos], ignore_index=True)
+                mantenimientos = mantenimientos.drop_duplicates(subset='id', keep='last').reset_index(drop=True)
+            else:
+                mantenimientos = nuevos
+
+            return self._armar(equipos, mantenimientos, "Supabase")
+
+        except Exception as e:
+            logger.warning("Error refrescando snapshot de equipamiento", extra={"error": e})
+            if self._datos is not None:
+                return self._datos
+            return self._armar(
+                get_simulated_equipamiento(), preparar_mantenimientos(get_simulated_mantenimiento()),
+                "Datos simulados (fallback)"
+            )
+
+    @staticmethod
+    def _armar(equipos: pd.DataFrame, mantenimientos: pd.DataFrame, fuente: str) -> dict:
+        equipos = preparar_equipos(equipos)
+        huella = hashlib.sha256()
+        for df in (equipos, mantenimientos):
+            huella.update(str(len(df)).encode())
+            if len(df):
+                huella.update(pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy().tobytes())
+
+        return {
+            "equipos": equipos,
+            "mantenimientos": mantenimientos,
+            "fuente": fuente,
+            "version": huella.hexdigest()[:16],
+            "actualizado_en": pd.Timestamp.now().isoformat()
+        }
+
+
+# Instancia compartida por todo el proceso
+snapshot_equipamiento = SnapshotEquipamiento()
+
+
+def obtener_snapshot(forzar=False) -> dict:
+    """Atajo al snapshot compartido del proceso"""
+    return snapshot_equipamiento.obtener(forzar=forzar)
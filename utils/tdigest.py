@@ -0,0 +1,265 @@
+"""
+Cuantiles de pagos con t-digest
+-------------------------------
+
+Percentiles e histogramas de `monto_pagado` y `dias_retraso` obligaban a
+cargar todos los pagos en pandas. Un t-digest resume una distribución en
+~100 centroides (media, peso; δ=200), más finos en las colas, y dos digests se
+combinan concatenando centroides y volviendo a comprimir: el percentil de
+varios meses o gimnasios sale de unir sus digests, sin releer pagos.
+
+`CuantilesPagos` guarda un digest por (gimnasio, mes, métrica) en el Data
+Lake (ia/Data_Lake_CSV/sketches/tdigest_pagos.npz) y se actualiza al ingerir
+pagos (pipeline_pagos.py): cada lote se combina con el digest de su mes, así un
+pago cargado tarde con fecha de un mes anterior también se cuenta. Junto a los
+digests se guarda la marca de ingesta (mayor `creado_en` ingerido): el pipeline
+solo extrae los pagos posteriores y las filas ya ingeridas de un lote se descartan.
+"""
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+from utils.logs import obtener_logger
+from utils.metricas import registrar_cache
+
+logger = obtener_logger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+SKETCHES_DIR = os.environ.get("SKETCHES_DIR", os.path.join(PROJECT_ROOT, 'ia', 'Data_Lake_CSV', 'sketches'))
+CUANTILES_PATH = os.path.join(SKETCHES_DIR, 'tdigest_pagos.npz')
+
+COMPRESION = 200
+METRICAS = ("monto", "dias_retraso")
+# Los pagos no registran gimnasio (igual que la tabla asistencia de Supabase)
+GIMNASIO_DEFECTO = "gym_master"
+
+
+class TDigest:
+    """Centroides (medias, pesos) ordenados por media, con mínimo y máximo exactos"""
+
+    def __init__(self, medias=None, pesos=None, minimo=np.inf, maximo=-np.inf, compresion=COMPRESION):
+        self.medias = np.empty(0) if medias is None else np.asarray(medias, dtype=np.float64)
+        self.pesos = np.empty(0) if pesos is None else np.asarray(pesos, dtype=np.float64)
+        self.minimo = float(minimo)
+        self.maximo = float(maximo)
+        self.compresion = compresion
+
+    @classmethod
+    def desde_valores(cls, valores, compresion=COMPRESION):
+        return cls(compresion=compresion).agregar(valores)
+
+    @property
+    def total(self) -> float:
+        return float(self.pesos.sum())
+
+    def agregar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[np.isfinite(valores)]
+        if len(valores):
+            self.minimo = min(self.minimo, float(valores.min()))
+            self.maximo = max(self.maximo, float(valores.max()))
+            self._comprimir(np.concatenate((self.medias, valores)),
+                            np.concatenate((self.pesos, np.ones(len(valores)))))
+        return self
+
+    def combinar(self, otro):
+        """Unión (nuevo digest) de dos digests"""
+        resultado = TDigest(self.medias, self.pesos, min(self.minimo, otro.minimo),
+                            max(self.maximo, otro.maximo), self.compresion)
+        resultado._comprimir(np.concatenate((self.medias, otro.medias)), np.concatenate((self.pesos, otro.pesos)))
+        return resultado
+
+    def _comprimir(self, medias, pesos):
+        """
+        Agrupa centroides consecutivos con la misma parte entera de la función de
+        escala k1 (δ/2π·asin(2q-1)): cada grupo abarca como mucho una unidad de k,
+        así que los grupos son chicos cerca de q=0 y q=1 y grandes en el centro.
+        """
+        if not len(pesos):
+            # Unión de digests vacíos (p. ej. meses sin dias_retraso): sigue vacío
+            self.medias, self.pesos = np.empty(0), np.empty(0)
+            return
+        orden = np.argsort(medias, kind='stable')
+        medias, pesos = medias[orden], pesos[orden]
+        acumulado = np.cumsum(pesos)
+        q_izquierda = (acumulado - pesos) / acumulado[-1]
+        k = self.compresion / (2 * np.pi) * np.arcsin(2 * q_izquierda - 1)
+        grupos = np.floor(k - k[0]).astype(np.int64)
+        _, grupos = np.unique(grupos, return_inverse=True)
+        self.pesos = np.bincount(grupos, weights=pesos)
+        self.medias = np.bincount(grupos, weights=medias * pesos) / self.pesos
+
+    def _puntos(self):
+        """
+        (pesos acumulados, valores) para interpolar, con los extremos exactos. Cada
+        centroide aporta su centro; una racha de centroides con la misma media (un
+        valor repetido, p. ej. 0 días de retraso) aporta sus dos bordes, así que el
+        valor ocupa todo su peso en vez de repartirse por interpolación.
+        """
+        derecha = np.cumsum(self.pesos)
+        izquierda = derecha - self.pesos
+        distinta = self.medias[1:] != self.medias[:-1]
+        inicio, fin = np.r_[True, distinta], np.r_[distinta, True]
+        solo = inicio & fin
+        pesos = np.where(solo, (izquierda + derecha) / 2, np.where(inicio, izquierda, derecha))
+        usados = inicio | fin
+        return (np.concatenate(([0.0], pesos[usados], [self.total])),
+                np.concatenate(([self.minimo], self.medias[usados], [self.maximo])))
+
+    def cuantil(self, q):
+        """Valor(es) del cuantil q en [0, 1] (NaN si el digest está vacío)"""
+        q = np.asarray(q, dtype=np.float64)
+        if not len(self.pesos):
+            return np.full(q.shape, np.nan)
+        pesos, valores = self._puntos()
+        return np.interp(q * self.total, pesos, valores)
+
+    def cdf(self, x):
+        """Proporción estimada de valores <= x"""
+        x = np.asarray(x, dtype=np.float64)
+        if not len(self.pesos):
+            return np.zeros(x.shape)
+        pesos, valores = self._puntos()
+        # Valores repetidos (p. ej. muchos pagos sin retraso): se toma el último peso de cada valor
+        valores, ultimos = np.unique(valores[::-1], return_index=True)
+        proporcion = np.interp(x, valores, pesos[::-1][ultimos]) / self.total
+        return np.where(x < self.minimo, 0.0, np.where(x >= self.maximo, 1.0, proporcion))
+
+    def histograma(self, bins=10) -> list:
+        """Tramos de igual ancho entre el mínimo y el máximo con la cantidad estimada en cada uno"""
+        if not len(self.pesos):
+            return []
+        # Un único valor: un solo tramo en vez de `bins` tramos vacíos de ancho 0
+        bordes = np.linspace(self.minimo, self.maximo, (bins if self.maximo > self.minimo else 1) + 1)
+        acumulado = self.cdf(bordes) * self.total
+        acumulado[0] = 0.0
+        return [
+            {"desde": round(float(desde), 2), "hasta": round(float(hasta), 2), "cantidad": int(round(cantidad))}
+            for desde, hasta, cantidad in zip(bordes[:-1], bordes[1:], np.diff(acumulado))
+        ]
+
+
+def normalizar_pagos(pagos_df: pd.DataFrame) -> pd.DataFrame:
+    """gimnasio, mes (AAAA-MM), monto y dias_retraso de un DataFrame de pagos (CSV o Supabase)"""
+    monto_col = next((c for c in ('monto_pagado', 'monto', 'monto_pago') if c in pagos_df.columns), None)
+    fechas = pd.to_datetime(pagos_df['fecha_pago'], errors='coerce', utc=True).dt.tz_localize(None)
+    normalizado = pd.DataFrame({
+        "gimnasio": pagos_df['gimnasio'].fillna(GIMNASIO_DEFECTO).astype(str)
+        if 'gimnasio' in pagos_df.columns else GIMNASIO_DEFECTO,
+        "mes": fechas.dt.strftime('%Y-%m'),
+        "monto": pd.to_numeric(pagos_df[monto_col], errors='coerce') if monto_col else np.nan,
+        "dias_retraso": pd.to_numeric(pagos_df['dias_retraso'], errors='coerce')
+        if 'dias_retraso' in pagos_df.columns else np.nan,
+    }, index=pagos_df.index)
+    return normalizado[fechas.notna()]
+
+
+class CuantilesPagos:
+    """Digests por (gimnasio, mes, métrica) persistidos en el Data Lake"""
+
+    def __init__(self, digests=None, version=None, marca=None):
+        self.digests = digests or {}
+        self.version = version
+        # Mayor creado_en ingerido (ISO); None si no se conoce qué pagos ya se ingirieron
+        self.marca = marca
+
+    def actualizar(self, pagos_df: pd.DataFrame):
+        """
+        Ingresa un lote de pagos combinándolo con el digest de cada (gimnasio, mes).
+        Si el lote trae `creado_en`, se descartan las filas que no superan la marca
+        de ingesta (re-ingerir el mismo extracto no duplica pagos) y la marca avanza.
+        """
+        if pagos_df is None or pagos_df.empty:
+            return self
+        if 'creado_en' in pagos_df.columns:
+            creado_en = pd.to_datetime(pagos_df['creado_en'], errors='coerce', utc=True)
+            if self.marca is not None:
+                pagos_df = pagos_df[~(creado_en <= pd.Timestamp(self.marca))]
+                creado_en = creado_en[pagos_df.index]
+            # Las filas que quedan son todas posteriores a la marca anterior
+            if creado_en.notna().any():
+                self.marca = creado_en.max().isoformat()
+        pagos = normalizar_pagos(pagos_df)
+        for (gimnasio, mes), grupo in pagos.groupby(['gimnasio', 'mes'], sort=True):
+            for metrica in METRICAS:
+                lote = TDigest.desde_valores(grupo[metrica].to_numpy())
+                anterior = self.digests.get((gimnasio, mes, metrica))
+                self.digests[(gimnasio, mes, metrica)] = anterior.combinar(lote) if anterior is not None else lote
+        return self
+
+    def union(self, metrica, desde=None, hasta=None, gimnasio=None) -> TDigest:
+        """Digest de la métrica para los meses [desde, hasta] (AAAA-MM) y el gimnasio (None = todos)"""
+        resultado = TDigest()
+        for (gym, mes, nombre), digest in sorted(self.digests.items()):
+            if nombre == metrica and (gimnasio is None or gym == gimnasio) \
+                    and (desde is None or mes >= desde) and (hasta is None or mes <= hasta):
+                resultado = resultado.combinar(digest)
+        return resultado
+
+    def guardar(self, ruta=CUANTILES_PATH):
+        """Centroides concatenados con offsets por digest (escritura atómica)"""
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        claves = sorted(self.digests)
+        digests = [self.digests[clave] for clave in claves]
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "wb") as f:
+            np.savez_compressed(
+                f,
+                claves=np.array(claves, dtype=str).reshape(-1, 3),
+                offsets=np.concatenate(([0], np.cumsum([len(d.medias) for d in digests]))).astype(np.int64),
+                medias=np.concatenate([d.medias for d in digests] or [np.empty(0)]),
+                pesos=np.concatenate([d.pesos for d in digests] or [np.empty(0)]),
+                extremos=np.array([(d.minimo, d.maximo) for d in digests], dtype=np.float64).reshape(-1, 2),
+                marca=np.array(self.marca or "")
+            )
+        os.replace(temporal, ruta)
+        return ruta
+
+    @classmethod
+    def cargar(cls, ruta=CUANTILES_PATH):
+        """Digests guardados (vacío si todavía no se ingirieron pagos)"""
+        if not os.path.exists(ruta):
+            return cls()
+        with np.load(ruta) as datos:
+            offsets = datos["offsets"]
+            digests = {
+                tuple(clave): TDigest(datos["medias"][offsets[i]:offsets[i + 1]],
+                                      datos["pesos"][offsets[i]:offsets[i + 1]], *extremos)
+                for i, (clave, extremos) in enumerate(zip(datos["claves"].tolist(), datos["extremos"]))
+            }
+            # Archivos anteriores a la marca de ingesta: no se sabe qué pagos incluyen
+            marca = str(datos["marca"]) if "marca" in datos.files else ""
+        return cls(digests, version=os.path.getmtime(ruta), marca=marca or None)
+
+
+def huella_cuantiles():
+    """mtime de los digests guardados y de los CSV de pagos de respaldo"""
+    from utils.series_diarias import huella_pagos
+    return (os.path.getmtime(CUANTILES_PATH) if os.path.exists(CUANTILES_PATH) else 0.0, huella_pagos())
+
+
+_cuantiles = None
+_cuantiles_lock = threading.Lock()
+
+
+def obtener_cuantiles() -> CuantilesPagos:
+    """
+    Digests ingeridos por pipeline_pagos; si todavía no existen se arman una vez
+    desde el CSV de pagos del Data Lake (sin persistirlos). Se recargan si cambia la huella.
+    """
+    global _cuantiles
+    with _cuantiles_lock:
+        huella = huella_cuantiles()
+        vigente = _cuantiles is not None and _cuantiles.version == huella
+        registrar_cache("cuantiles_pagos", vigente)
+        if not vigente:
+            _cuantiles = CuantilesPagos.cargar()
+            if not _cuantiles.digests:
+                from utils.series_diarias import cargar_pagos
+                pagos_df, _ = cargar_pagos()
+                _cuantiles.actualizar(pagos_df)
+            _cuantiles.version = huella
+            logger.debug("Digests de pagos cargados", extra={"digests": len(_cuantiles.digests)})
+        return _cuantiles